@@ -0,0 +1,136 @@
+"""
+Backtest engine benchmark: a multi-year, many-ticker replay over synthetic cached bars.
+
+1. Writes N tickers x Y years of random-walk daily bars into a temp OHLCV cache.
+2. Runs the offline backtest (incremental indicators, vectorized pre-screen, indicator policy,
+   risk engine + OrderManager + MockBroker) and reports the time per phase.
+3. Replays a few tickers through the real analyst + PM nodes twice with a fake chat model:
+   the first pass records the answers, the second must be served entirely from the replay cache
+   (zero model calls, counted across all the worker processes).
+
+Usage: python benchmarks/bench_backtest.py [--tickers 100] [--years 5] [--processes 4] [--json out.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GOOGLE_API_KEY", "offline")
+
+import numpy as np
+import pandas as pd
+from benchmarks.fakes import FakeChatModel
+from src import backtest
+from src.data import ohlcv_cache
+from src.utils import llm_gateway
+
+
+class CountingChatModel(FakeChatModel):
+    """FakeChatModel whose call count lives in shared memory, so forked pool workers add to it too."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.shared_calls = multiprocessing.Value("i", 0)
+
+    def _delay(self, prompt: str) -> float:
+        with self.shared_calls.get_lock():
+            self.shared_calls.value += 1
+        return super()._delay(prompt)
+
+
+def write_bars(tickers, days, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp.now(tz="UTC").normalize(), periods=days)
+    for ticker in tickers:
+        close = 20 + 80 * rng.random() * np.exp(np.cumsum(rng.normal(0.0003, 0.02, days)))
+        # Overnight gap: the open is not the previous close
+        open_ = np.concatenate([[close[0]], close[:-1]]) * np.exp(rng.normal(0.0, 0.005, days))
+        frame = pd.DataFrame({"Open": open_, "High": np.maximum(open_, close) * 1.01,
+                              "Low": np.minimum(open_, close) * 0.99,
+                              "Close": close, "Volume": rng.integers(1e5, 1e7, days).astype(float)}, index=index)
+        ohlcv_cache.store_bars(ticker, "1d", frame, covered_from=int(index[0].timestamp()))
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--replay-tickers", type=int, default=3)
+    parser.add_argument("--replay-days", type=int, default=120)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    tickers = [f"SYN{i:03d}" for i in range(args.tickers)]
+    days = int(args.years * backtest.TRADING_DAYS) + backtest.WARMUP_BARS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        ohlcv_cache.CACHE_DB_PATH = os.path.join(tmp, "ohlcv.db")
+        ohlcv_cache.init_cache()
+        t0 = time.perf_counter()
+        index = write_bars(tickers, days)
+        setup_s = time.perf_counter() - t0
+        start = index[backtest.WARMUP_BARS].strftime("%Y-%m-%d")
+
+        # 1. Full offline replay
+        curve, stats = backtest.run_backtest(tickers, start, processes=args.processes,
+                                             llm_mode="offline", output=os.path.join(tmp, "equity.csv"))
+
+        # 2. Agent replay: record, then replay from cache
+        fake = CountingChatModel()
+        llm_gateway.set_llm(fake)   # inherited by the forked workers
+        replay_start = index[-args.replay_days].strftime("%Y-%m-%d")
+        replay = tickers[:args.replay_tickers]
+        runs = []
+        for _ in range(2):
+            calls_before = fake.shared_calls.value
+            t0 = time.perf_counter()
+            signals = backtest.generate_signals(replay, int(pd.Timestamp(replay_start, tz="UTC").timestamp()),
+                                                int(time.time()), "replay", processes=1)
+            runs.append({"seconds": time.perf_counter() - t0,
+                         "agent_days": sum(s["llm_days"] for s in signals),
+                         "model_calls": fake.shared_calls.value - calls_before,
+                         "actions": [s["action"].tolist() for s in signals]})
+
+    equity_ok = bool(np.allclose(curve["equity"], curve["cash"] + curve["invested"]))
+    results = {
+        "tickers": args.tickers,
+        "years": args.years,
+        "ticker_days": args.tickers * (days - backtest.WARMUP_BARS),
+        "bar_setup_s": setup_s,
+        "signal_s": stats["signal_seconds"],
+        "simulate_s": stats["simulate_seconds"],
+        "orders": stats["orders"],
+        "annual_turnover": stats["annual_turnover"],
+        "total_return": stats["total_return"],
+        "replay_record_s": runs[0]["seconds"],
+        "replay_cached_s": runs[1]["seconds"],
+        "replay_agent_days": runs[0]["agent_days"],
+        "replay_record_calls": runs[0]["model_calls"],
+        "replay_cached_calls": runs[1]["model_calls"],
+        "replay_deterministic": runs[0]["actions"] == runs[1]["actions"],
+    }
+    replay_ok = results["replay_deterministic"] and runs[0]["model_calls"] > 0 and runs[1]["model_calls"] == 0
+
+    backtest.print_backtest(stats)
+    print(f"\nReplay: {results['ticker_days']:,} ticker-days | signals {results['signal_s']:.1f}s | "
+          f"simulation {results['simulate_s']:.1f}s | {stats['orders']} orders")
+    print(f"Agent replay ({args.replay_tickers} tickers x {args.replay_days} days, {runs[0]['agent_days']} agent days): "
+          f"record {runs[0]['seconds']:.1f}s ({runs[0]['model_calls']} model calls), from cache {runs[1]['seconds']:.1f}s "
+          f"({runs[1]['model_calls']} model calls), identical: {results['replay_deterministic']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if equity_ok and replay_ok and len(curve) else 1)
+
+
+if __name__ == "__main__":
+    main()
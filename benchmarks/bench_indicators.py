@@ -0,0 +1,126 @@
+"""
+Indicator backend benchmark: pandas_ta vs pure NumPy.
+
+1. Equivalence check of every indicator column across both backends (exits 1 on mismatch).
+2. Import time of each backend in a fresh interpreter.
+3. Per-ticker latency, plus a whole-universe pass through calculate_latest_indicators_batch.
+
+Usage: python benchmarks/bench_indicators.py [--tickers 500] [--bars 125] [--json out.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+from src.utils.indicators import INDICATOR_COLUMNS, calculate_technical_indicators, calculate_latest_indicators_batch
+
+TOLERANCE = 1e-9
+
+
+def synthetic_frame(bars, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+    return pd.DataFrame({"Close": close, "Volume": rng.integers(1e5, 1e7, bars).astype(float)},
+                        index=pd.bdate_range(end="2026-01-02", periods=bars))
+
+
+def import_time(module):
+    """Seconds to import `module` in a fresh interpreter (median of 3)."""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    runs = []
+    for _ in range(3):
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+        if out.returncode != 0:
+            return None
+        runs.append(float(out.stdout.strip()))
+    return statistics.median(runs)
+
+
+def time_per_call(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def check_equivalence(frames):
+    """Max relative error between backends over every column of every frame."""
+    worst = 0.0
+    for frame in frames.values():
+        a = calculate_technical_indicators(frame.copy(), backend="pandas_ta")
+        b = calculate_technical_indicators(frame.copy(), backend="numpy")
+        for column in INDICATOR_COLUMNS:
+            err = np.abs(a[column].to_numpy() - b[column].to_numpy()) / np.maximum(1.0, np.abs(a[column].to_numpy()))
+            worst = max(worst, float(err.max()))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--bars", type=int, default=125)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    try:
+        import pandas_ta  # noqa: F401
+        has_pandas_ta = True
+    except ImportError:
+        has_pandas_ta = False
+        print("pandas_ta not installed: only the NumPy backend will be measured.")
+
+    frames = {f"T{i:04d}": synthetic_frame(args.bars + (i % 40), seed=i) for i in range(args.tickers)}
+    one = next(iter(frames.values()))
+    results = {"tickers": args.tickers, "bars": args.bars}
+
+    # 1. Equivalence
+    if has_pandas_ta:
+        sample = dict(list(frames.items())[:50])
+        worst = check_equivalence(sample)
+        results["max_relative_error"] = worst
+        print(f"Equivalence: max relative error {worst:.2e} (tolerance {TOLERANCE:.0e})")
+        if worst > TOLERANCE:
+            print("FAIL: backends disagree")
+            sys.exit(1)
+
+    # 2. Import time
+    results["import_s"] = {
+        "pandas_ta": import_time("pandas_ta") if has_pandas_ta else None,
+        "numpy": import_time("src.utils.indicators_numpy"),
+    }
+
+    # 3. Latency
+    backends = ["numpy"] + (["pandas_ta"] if has_pandas_ta else [])
+    results["per_ticker_ms"] = {}
+    results["universe_batch_ms"] = {}
+    for backend in backends:
+        per_ticker = time_per_call(lambda: calculate_technical_indicators(one.copy(), backend=backend), args.repeat)
+        batch = time_per_call(lambda: calculate_latest_indicators_batch(frames, backend=backend), 3)
+        results["per_ticker_ms"][backend] = per_ticker * 1000
+        results["universe_batch_ms"][backend] = batch * 1000
+
+    print(f"\n{'BACKEND':<10} {'IMPORT (ms)':>12} {'PER TICKER (ms)':>16} {'UNIVERSE (ms)':>14}")
+    for backend in backends:
+        imp = results["import_s"][backend]
+        imp = f"{imp * 1000:.1f}" if imp is not None else "-"
+        print(f"{backend:<10} {imp:>12} {results['per_ticker_ms'][backend]:>16.3f} "
+              f"{results['universe_batch_ms'][backend]:>14.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
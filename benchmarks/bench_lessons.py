@@ -0,0 +1,118 @@
+"""
+Lesson memory benchmark: PM-prompt lesson lookups against a large lessons table.
+
+1. Fills a temp journal with N synthetic lessons over 500 tickers / 11 sectors.
+2. Times the one-off index load, then k-lesson lookups with and without a TF-IDF query.
+3. Saves new lessons through storage.save_lesson and checks the next lookup returns them
+   without re-reading the table.
+
+Usage: python benchmarks/bench_lessons.py [--lessons 100000] [--lookups 2000] [--json out.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from src.data import storage
+from src.data import lesson_memory
+
+SECTORS = ["Technology", "Energy", "Financials", "Health Care", "Industrials", "Materials",
+           "Utilities", "Real Estate", "Consumer Staples", "Consumer Discretionary", "Communication"]
+PHRASES = ["Avoid buying when RSI is above 70 and volume is fading",
+           "Take profits early on momentum names after a MACD bearish cross",
+           "Earnings gaps in semiconductors tend to fill within a week",
+           "Do not fight the 50-day SMA trend on low conviction signals",
+           "Scale into positions when fundamentals and technicals agree",
+           "Cut losers quickly when the sector rotates out of favour"]
+
+QUERY = ("RSI is 74 which is overbought, MACD histogram is turning down while price sits above the "
+         "SMA_50. Strong revenue growth and margins but the valuation is stretched after earnings.")
+
+
+def percentiles(samples):
+    samples = np.array(samples) * 1000
+    return {"p50_ms": float(np.percentile(samples, 50)), "p99_ms": float(np.percentile(samples, 99))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lessons", type=int, default=100_000)
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+    lesson_memory.set_sectors({t: SECTORS[i % len(SECTORS)] for i, t in enumerate(tickers)})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.DB_PATH = os.path.join(tmp, "lessons.db")
+        conn = storage.get_connection()
+        start = datetime.now(timezone.utc) - timedelta(days=365)
+        rows = []
+        for i in range(args.lessons):
+            ticker = tickers[rng.integers(args.tickers)]
+            ts = (start + timedelta(seconds=int(i * 365 * 86400 / args.lessons))).strftime("%Y-%m-%d %H:%M:%S")
+            rows.append((ts, ticker, f"{PHRASES[i % len(PHRASES)]} ({i}).", lesson_memory.sector_of(ticker)))
+        with conn:
+            conn.executemany(storage.INSERT_LESSON, rows)
+
+        index = lesson_memory._index
+        load_start = time.perf_counter()
+        index.load()
+        load_s = time.perf_counter() - load_start
+
+        plain, tfidf = [], []
+        for i in range(args.lookups):
+            ticker = tickers[i % args.tickers]
+            t0 = time.perf_counter()
+            index.search(ticker)
+            t1 = time.perf_counter()
+            index.search(ticker, query=QUERY)
+            t2 = time.perf_counter()
+            plain.append(t1 - t0)
+            tfidf.append(t2 - t1)
+
+        # Incremental: a lesson saved now is the top hit for its ticker, with no table re-read
+        adds = []
+        for i in range(100):
+            t0 = time.perf_counter()
+            storage.save_lesson(tickers[0], f"Fresh lesson {i} about RSI overbought entries", lesson_memory.sector_of(tickers[0]))
+            adds.append(time.perf_counter() - t0)
+        fresh = index.search(tickers[0], query=QUERY)[0].text
+        storage.flush()
+        stored = conn.execute("SELECT COUNT(*) FROM lessons").fetchone()[0]
+
+    results = {
+        "lessons": args.lessons,
+        "index_load_s": load_s,
+        "lookup": percentiles(plain),
+        "lookup_tfidf": percentiles(tfidf),
+        "save_lesson": percentiles(adds),
+        "indexed": len(index),
+        "stored": stored,
+        "fresh_lesson_first": fresh.startswith("Fresh lesson 99"),
+    }
+
+    print(f"Lessons: {args.lessons}  Index load: {load_s:.2f}s")
+    print(f"Lookup (ticker/sector/recency): p50 {results['lookup']['p50_ms']:.3f} ms  p99 {results['lookup']['p99_ms']:.3f} ms")
+    print(f"Lookup (+ TF-IDF query):        p50 {results['lookup_tfidf']['p50_ms']:.3f} ms  p99 {results['lookup_tfidf']['p99_ms']:.3f} ms")
+    print(f"save_lesson (queue + index):    p50 {results['save_lesson']['p50_ms']:.3f} ms")
+    print(f"Indexed {results['indexed']} / stored {stored}  |  newest lesson returned first: {results['fresh_lesson_first']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if results["indexed"] == stored and results["fresh_lesson_first"] else 1)
+
+
+if __name__ == "__main__":
+    main()
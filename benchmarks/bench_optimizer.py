@@ -0,0 +1,104 @@
+"""
+Portfolio Optimizer benchmark: shrinkage covariance + solvers at universe scale.
+
+1. Ledoit-Wolf covariance of synthetic factor-model returns.
+2. Risk parity and mean-variance, cold start vs warm start (previous run's weights, slightly perturbed).
+3. Checks the solutions: weights sum to 1, caps hold, risk contributions are equal (uncapped risk parity).
+
+Usage: python benchmarks/bench_optimizer.py [--assets 500] [--window 126] [--json out.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from src.utils.optimizer import ledoit_wolf, risk_parity, mean_variance
+
+TARGET_SECONDS = 1.0
+
+
+def synthetic_returns(window, assets, seed=0):
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0, 0.01, (window, 5))
+    loadings = rng.normal(0, 1, (5, assets))
+    idio = rng.normal(0, 1, (window, assets)) * 0.015 * rng.uniform(0.5, 2, assets)
+    return factors @ loadings + idio
+
+
+def timed(fn, repeat):
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--assets", type=int, default=500)
+    parser.add_argument("--window", type=int, default=126)
+    parser.add_argument("--cap", type=float, default=0.01, help="Per-asset weight cap")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    returns = synthetic_returns(args.window, args.assets)
+    caps = np.full(args.assets, max(args.cap, 1.0 / args.assets))
+    expected = np.random.default_rng(1).uniform(0, 0.001, args.assets)
+    results = {"assets": args.assets, "window": args.window}
+
+    # 1. Covariance
+    t, (cov, shrinkage) = timed(lambda: ledoit_wolf(returns), args.repeat)
+    results["ledoit_wolf_s"] = t
+    results["shrinkage"] = shrinkage
+
+    # 2. Solvers, cold and warm (next run's universe has drifted a little)
+    jitter = np.random.default_rng(2).uniform(0.9, 1.1, args.assets)
+    for name, solve in [
+        ("risk_parity", lambda w0: risk_parity(cov, caps, w0=w0)),
+        ("mean_variance", lambda w0: mean_variance(cov, expected, caps, w0=w0)),
+    ]:
+        cold_t, (w, cold_iters) = timed(lambda: solve(None), args.repeat)
+        warm_t, (w_warm, warm_iters) = timed(lambda: solve(w * jitter), args.repeat)
+        results[name] = {
+            "cold_s": cold_t, "cold_iterations": cold_iters,
+            "warm_s": warm_t, "warm_iterations": warm_iters,
+            "weight_sum": float(w.sum()), "max_weight": float(w.max()),
+            "cap_ok": bool(np.all(w <= caps + 1e-9)),
+        }
+
+    # 3. Uncapped risk parity should give equal risk contributions
+    w, _ = risk_parity(cov, np.ones(args.assets))
+    contributions = w * (cov @ w)
+    results["risk_parity"]["rc_max_over_min"] = float(contributions.max() / contributions.min())
+
+    total = results["ledoit_wolf_s"] + max(results["risk_parity"]["cold_s"], results["mean_variance"]["cold_s"])
+    results["end_to_end_s"] = total
+
+    print(f"Assets: {args.assets}  Window: {args.window}  Shrinkage: {shrinkage:.3f}")
+    print(f"Ledoit-Wolf:    {results['ledoit_wolf_s'] * 1000:8.1f} ms")
+    for name in ("risk_parity", "mean_variance"):
+        r = results[name]
+        print(f"{name:<15} cold {r['cold_s'] * 1000:8.1f} ms ({r['cold_iterations']} it)  "
+              f"warm {r['warm_s'] * 1000:8.1f} ms ({r['warm_iterations']} it)  "
+              f"sum={r['weight_sum']:.6f} caps={'ok' if r['cap_ok'] else 'BROKEN'}")
+    print(f"Risk contribution spread (uncapped RP): {results['risk_parity']['rc_max_over_min']:.6f}")
+    print(f"End to end (covariance + slowest cold solve): {total * 1000:.1f} ms (target < {TARGET_SECONDS * 1000:.0f} ms)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    ok = total < TARGET_SECONDS and all(results[n]["cap_ok"] for n in ("risk_parity", "mean_variance"))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
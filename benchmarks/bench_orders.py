@@ -0,0 +1,89 @@
+"""
+Order execution load test against the in-process MockBroker.
+
+1. Submits a basket of N orders concurrently through the pooled AlpacaClient + OrderManager.
+2. Tracks them to completion by polling (with partial fills mixed in).
+3. Checks that every order's recorded fill matches the broker's ledger.
+
+--latency adds a simulated round trip per REST call; --rpm sets the client's request budget
+(Alpaca's real limit is 200/min, which caps a basket at roughly 100 orders/min with polling).
+
+Usage: python benchmarks/bench_orders.py [--orders 2000] [--latency 0.005] [--rpm 1000000] [--json out.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from src.utils.mock_broker import MockBroker
+from src.utils.order_manager import OrderManager, OrderTicket
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.005, help="Simulated seconds per REST call")
+    parser.add_argument("--fill-delay", type=float, default=0.2, help="Seconds from accept to fill")
+    parser.add_argument("--partial", type=float, default=0.2, help="Share of orders that fill in two parts")
+    parser.add_argument("--rpm", type=int, default=1_000_000, help="Client request budget per minute")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    symbols = [f"SYM{i:04d}" for i in range(args.symbols)]
+    prices = dict(zip(symbols, rng.uniform(5, 500, args.symbols).round(2)))
+    broker = MockBroker(cash=1e12, prices=prices, fill_delay=args.fill_delay, partial_fill_prob=args.partial,
+                        latency=args.latency, seed=0)
+    client = broker.client(requests_per_minute=args.rpm)
+    manager = OrderManager(client=client, submit_workers=args.workers, fill_timeout=300)
+
+    tickets = [OrderTicket(symbols[i % args.symbols], "buy", int(rng.integers(1, 100))) for i in range(args.orders)]
+
+    start = time.perf_counter()
+    manager.submit(tickets)
+    submitted = time.perf_counter()
+    manager.track(tickets)
+    tracked = time.perf_counter()
+
+    # Every fill we recorded must match the broker's own ledger
+    mismatches = 0
+    for t in tickets:
+        order = broker.orders.get(t.order_id)
+        if order is None or t.status != order["status"] or t.filled_qty != order["filled_qty"] \
+                or abs((t.filled_avg_price or 0) - order["filled_avg_price"]) > 1e-9:
+            mismatches += 1
+
+    results = {
+        "orders": args.orders,
+        "latency_s": args.latency,
+        "rpm": args.rpm,
+        "submit_s": submitted - start,
+        "submit_orders_per_s": args.orders / (submitted - start),
+        "all_final_s": tracked - start,
+        "filled": sum(t.status == "filled" for t in tickets),
+        "failed": sum(t.status == "failed" for t in tickets),
+        "polls": manager.stats["polls"],
+        "broker_requests": broker.stats["requests"],
+        "mismatches": mismatches,
+    }
+
+    print(f"Orders: {args.orders}  Latency: {args.latency * 1000:.1f} ms  Workers: {args.workers}")
+    print(f"Submit:    {results['submit_s']:.2f}s ({results['submit_orders_per_s']:.0f} orders/s)")
+    print(f"All final: {results['all_final_s']:.2f}s  filled={results['filled']} failed={results['failed']}")
+    print(f"REST calls: {results['broker_requests']} ({results['polls']} polls)  Ledger mismatches: {mismatches}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if mismatches == 0 and results["filled"] == args.orders else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+End-to-end pipeline benchmark, fully offline: the real universe run and agent nodes, with local stand-ins
+for Gemini (FakeChatModel), Yahoo (SyntheticMarket) and Alpaca (MockBroker served over localhost HTTP).
+
+1. Each universe size runs in its own process, in a fresh temp directory (journal, caches, metrics),
+   so peak RSS and the on-disk caches belong to that size alone.
+2. Reports per-stage p50/p99 latency (from the telemetry spans), tickers/s, LLM and HTTP calls and peak RSS.
+3. With --baseline, compares against an earlier --json file and fails on a tickers/s regression
+   larger than --tolerance.
+
+Usage: python benchmarks/bench_pipeline.py [--sizes 1,50,500] [--llm-latency 0.05] [--indicators numpy] [--json out.json]
+                                           [--baseline old.json] [--tolerance 0.2]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GOOGLE_API_KEY", "offline")
+# The fake model has no quota: keep the gateway's own request/token budget out of the measurement
+os.environ.setdefault("LLM_MAX_RPM", "100000000")
+os.environ.setdefault("LLM_MAX_TPM", "100000000000")
+
+import numpy as np
+from benchmarks.fakes import FakeChatModel, SyntheticMarket
+from src.data import ohlcv_cache
+from src.data.storage import init_db
+from src.universe import run_universe
+from src.utils import llm_gateway, telemetry
+from src.utils.alpaca_client import set_client
+from src.utils.mock_broker import MockBroker, MockBrokerServer
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def stage_latency(spans) -> dict:
+    stages = {}
+    for s in spans:
+        stages.setdefault(s.node, []).append(s.wall_s)
+    return {node: {"calls": len(wall), "p50_s": float(np.percentile(wall, 50)),
+                   "p99_s": float(np.percentile(wall, 99)), "total_s": float(np.sum(wall))}
+            for node, wall in stages.items()}
+
+
+def run_size(args) -> dict:
+    """One universe run of `args.run_size` tickers in this process (cwd is its temp directory)."""
+    tickers = [f"SYN{i:04d}" for i in range(args.run_size)]
+    market = SyntheticMarket(seed=args.seed, latency=args.data_latency)
+    ohlcv_cache.set_downloader(market.download)
+    fake = FakeChatModel(latency=args.llm_latency, jitter=args.llm_jitter, seed=args.seed)
+    llm_gateway.set_llm(fake)
+    broker = MockBroker(cash=args.cash, prices=market.last_close(tickers), fill_delay=args.fill_delay,
+                        latency=args.broker_latency, seed=args.seed)
+
+    with MockBrokerServer(broker) as server:
+        set_client(server.client())
+        init_db()
+        start = time.perf_counter()
+        rows = run_universe(tickers, prescreen=not args.no_prescreen)
+        seconds = time.perf_counter() - start
+
+    return {
+        "tickers": len(tickers),
+        "seconds": seconds,
+        "tickers_per_s": len(tickers) / seconds,
+        "peak_rss_mb": peak_rss_mb(),
+        "errors": sum(1 for r in rows if r["status"] == "error"),
+        "llm_calls": fake.calls,
+        "downloads": market.downloads,
+        "http_requests": broker.stats["requests"],
+        "orders": broker.stats["orders"],
+        "fills": broker.stats["fills"],
+        "stages": stage_latency(telemetry.spans()),
+    }
+
+
+def spawn(size, args) -> dict:
+    """Runs one size in a child process; its console output goes to run.log in its temp dir."""
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "result.json")
+        cmd = [sys.executable, os.path.abspath(__file__), "--run-size", str(size), "--json", out,
+               "--seed", str(args.seed), "--llm-latency", str(args.llm_latency), "--llm-jitter", str(args.llm_jitter),
+               "--data-latency", str(args.data_latency), "--broker-latency", str(args.broker_latency),
+               "--fill-delay", str(args.fill_delay), "--cash", str(args.cash)]
+        if args.no_prescreen:
+            cmd.append("--no-prescreen")
+        env = dict(os.environ, PORTFOLIO_DB_PATH=os.path.join(tmp, "portfolio.db"), INDICATOR_BACKEND=args.indicators)
+        with open(os.path.join(tmp, "run.log"), "w") as log:
+            code = subprocess.run(cmd, cwd=tmp, env=env, stdout=None if args.verbose else log,
+                                  stderr=subprocess.STDOUT).returncode
+        if code != 0 or not os.path.exists(out):
+            with open(os.path.join(tmp, "run.log")) as log:
+                tail = log.read()[-2000:]
+            raise RuntimeError(f"{size}-ticker run failed (exit {code}):\n{tail}")
+        with open(out) as f:
+            return json.load(f)
+
+
+def compare(results, baseline, tolerance) -> bool:
+    """Prints tickers/s against the baseline per size. False if any size regressed beyond `tolerance`."""
+    ok = True
+    old = {str(r["tickers"]): r for r in baseline.get("runs", [])}
+    print("\nAgainst baseline:")
+    for run in results["runs"]:
+        before = old.get(str(run["tickers"]))
+        if before is None:
+            print(f"  {run['tickers']:>5} tickers: no baseline")
+            continue
+        change = run["tickers_per_s"] / before["tickers_per_s"] - 1
+        regressed = change < -tolerance
+        ok &= not regressed
+        print(f"  {run['tickers']:>5} tickers: {before['tickers_per_s']:.2f} -> {run['tickers_per_s']:.2f} "
+              f"tickers/s ({change:+.0%}){'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def print_run(run):
+    print(f"\n{run['tickers']} tickers: {run['seconds']:.2f}s, {run['tickers_per_s']:.2f} tickers/s, "
+          f"peak RSS {run['peak_rss_mb']:.0f} MB, {run['llm_calls']} LLM calls, {run['http_requests']} HTTP requests, "
+          f"{run['orders']} orders, {run['errors']} errors")
+    print(f"  {'Stage':<26}{'Calls':>7}{'p50 ms':>10}{'p99 ms':>10}{'Total s':>9}")
+    for node, s in run["stages"].items():
+        print(f"  {node:<26}{s['calls']:>7}{s['p50_s'] * 1000:>10.1f}{s['p99_s'] * 1000:>10.1f}{s['total_s']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,50,500", help="Comma-separated universe sizes")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake LLM call")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="Extra random seconds per LLM call, up to")
+    parser.add_argument("--data-latency", type=float, default=0.2, help="Seconds per synthetic bulk download")
+    parser.add_argument("--broker-latency", type=float, default=0.0, help="Seconds per broker REST call")
+    parser.add_argument("--fill-delay", type=float, default=0.05, help="Seconds from order accept to fill")
+    parser.add_argument("--cash", type=float, default=10_000_000.0)
+    parser.add_argument("--indicators", choices=["pandas_ta", "numpy"], default=os.getenv("INDICATOR_BACKEND", "numpy"),
+                        help="Indicator backend (pandas_ta must be installed)")
+    parser.add_argument("--no-prescreen", action="store_true", help="Send every ticker through the LLM nodes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    parser.add_argument("--baseline", help="Earlier --json results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed tickers/s drop vs the baseline")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--run-size", type=int, help=argparse.SUPPRESS)   # child process: run one size
+    args = parser.parse_args()
+
+    if args.run_size:
+        result = run_size(args)
+        with open(args.json, "w") as f:
+            json.dump(result, f)
+        return
+
+    if args.indicators == "pandas_ta":
+        try:
+            import pandas_ta  # noqa: F401
+        except ImportError as e:
+            # Every child would fail each ticker on the same import
+            parser.error(f"--indicators pandas_ta needs pandas_ta installed ({e}); use --indicators numpy")
+
+    config = {k: getattr(args, k) for k in ("llm_latency", "llm_jitter", "data_latency", "broker_latency",
+                                            "fill_delay", "indicators", "no_prescreen", "seed")}
+    results = {"config": config, "python": sys.version.split()[0], "cpus": os.cpu_count(), "runs": []}
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        run = spawn(size, args)
+        results["runs"].append(run)
+        print_run(run)
+
+    ok = all(run["errors"] == 0 for run in results["runs"])
+    if args.baseline:
+        with open(args.baseline) as f:
+            ok &= compare(results, json.load(f), args.tolerance)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
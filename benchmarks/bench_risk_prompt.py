@@ -0,0 +1,158 @@
+"""
+Risk Board prompt benchmark, fully offline: the raw positions list ("full") against the compact
+portfolio context ("compact", src/utils/portfolio_context.py) in the Chief Risk Officer prompt.
+
+1. For each book size, seeds a MockBroker with that many positions (synthetic sectors) and reads
+   it through the real Alpaca client snapshot, like risk_management_node does.
+2. Builds the prompt for --tickers borderline proposals (half already held) in both modes:
+   prompt tokens, build time per prompt, and how often the compact context was rebuilt.
+3. Sends --calls of those prompts through the LLM gateway to a FakeChatModel whose latency grows
+   with the prompt (--prefill-per-1k), and reports p50/p99 call latency per mode.
+4. Fails if a compact portfolio block goes over --budget tokens or leaves out the ticker's weight.
+
+Usage: python benchmarks/bench_risk_prompt.py [--positions 10,100,500] [--tickers 200] [--budget 250]
+                                              [--llm-latency 0.2] [--prefill-per-1k 0.05] [--json out.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GOOGLE_API_KEY", "offline")
+os.environ.setdefault("LLM_MAX_RPM", "100000000")
+os.environ.setdefault("LLM_MAX_TPM", "100000000000")
+
+import numpy as np
+from benchmarks.fakes import FakeChatModel
+from src.agents import risk_manager
+from src.agents.risk_manager import get_alpaca_portfolio, portfolio_lines, risk_prompt
+from src.data.lesson_memory import set_sectors
+from src.utils import llm_gateway, portfolio_context
+from src.utils.alpaca_client import set_client
+from src.utils.decisions import RiskVerdictSchema, TradeDecision
+from src.utils.llm_cache import NullCache, set_response_cache
+from src.utils.mock_broker import MockBroker
+from src.utils.risk_engine import evaluate_trades
+
+MODES = ["full", "compact"]
+SECTORS = ["Technology", "Healthcare", "Financials", "Consumer Discretionary", "Industrials", "Energy",
+           "Communication Services", "Consumer Staples", "Utilities", "Real Estate", "Materials"]
+
+
+def seed_book(n_positions: int, rng: random.Random) -> list:
+    """Puts `n_positions` holdings on a fresh MockBroker, makes it the Alpaca client. Returns the symbols."""
+    symbols = [f"P{i:04d}" for i in range(n_positions)]
+    broker = MockBroker(cash=1_000_000.0)
+    for symbol in symbols:
+        price = rng.uniform(10, 500)
+        qty = rng.randint(1, 400)
+        broker.prices[symbol] = price
+        broker.positions[symbol] = {"qty": float(qty), "cost": qty * price * rng.uniform(0.8, 1.2)}
+    set_client(broker.client())
+    set_sectors({s: rng.choice(SECTORS) for s in symbols})
+    return symbols
+
+
+def review_cases(symbols, n_tickers: int, portfolio, rng: random.Random) -> list:
+    """(state, engine result) for borderline BUY proposals, half of them on tickers we already hold."""
+    cases = []
+    for i in range(n_tickers):
+        ticker = rng.choice(symbols) if symbols and i % 2 == 0 else f"NEW{i:04d}"
+        price = rng.uniform(10, 500)
+        state = {
+            "ticker": ticker,
+            "portfolio_decision": TradeDecision(ticker, "BUY", 0.6, "Synthetic proposal.").text(),
+            "data": {"price": price, "rsi": rng.uniform(20, 80)},
+        }
+        proposal = {"ticker": ticker, "side": "buy", "qty": 10, "price": price, "rsi": state["data"]["rsi"]}
+        cases.append((state, evaluate_trades([proposal], portfolio)[0]))
+    return cases
+
+
+def measure(cases, portfolio, mode: str, calls: int, budget: int) -> dict:
+    before = dict(portfolio_context.stats)
+    prompts, build_us, invalid = [], [], 0
+    for state, engine_result in cases:
+        start = time.perf_counter()
+        prompt = risk_prompt(state, engine_result, portfolio, mode=mode)
+        build_us.append((time.perf_counter() - start) * 1e6)
+        prompts.append(prompt)
+        if mode == "compact":
+            block = portfolio_lines(state["ticker"], portfolio, mode)
+            invalid += len(block) / llm_gateway.CHARS_PER_TOKEN > budget or f"- {state['ticker']}:" not in block
+
+    latency = []
+    for prompt in prompts[:calls]:
+        start = time.perf_counter()
+        llm_gateway.invoke_structured("risk_manager", prompt, RiskVerdictSchema)
+        latency.append(time.perf_counter() - start)
+
+    tokens = np.array([len(p) / llm_gateway.CHARS_PER_TOKEN for p in prompts])
+    return {
+        "mode": mode,
+        "prompt_tokens_p50": float(np.percentile(tokens, 50)),
+        "prompt_tokens_max": float(tokens.max()),
+        "build_us_p50": float(np.percentile(build_us, 50)),
+        "llm_p50_s": float(np.percentile(latency, 50)) if latency else 0.0,
+        "llm_p99_s": float(np.percentile(latency, 99)) if latency else 0.0,
+        "context_builds": portfolio_context.stats["builds"] - before["builds"],
+        "over_budget": int(invalid),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--positions", default="10,100,500", help="Comma-separated book sizes")
+    parser.add_argument("--tickers", type=int, default=200, help="Proposals reviewed per book")
+    parser.add_argument("--calls", type=int, default=20, help="Prompts per mode sent to the fake LLM")
+    parser.add_argument("--budget", type=int, default=portfolio_context.CONTEXT_TOKEN_BUDGET,
+                        help="Token budget of the compact portfolio block")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per fake LLM call")
+    parser.add_argument("--prefill-per-1k", type=float, default=0.05, help="Extra seconds per 1000 prompt tokens")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    portfolio_context.CONTEXT_TOKEN_BUDGET = args.budget
+    set_response_cache(NullCache())
+    llm_gateway.set_llm(FakeChatModel(latency=args.llm_latency, seed=args.seed,
+                                      prefill_per_1k_tokens=args.prefill_per_1k))
+
+    results = {"config": {k: getattr(args, k) for k in ("tickers", "calls", "budget", "llm_latency",
+                                                        "prefill_per_1k", "seed")}, "books": []}
+    ok = True
+    print(f"{'Positions':>10}  {'Mode':<8}{'Tokens p50':>11}{'Tokens max':>11}{'Build us':>10}"
+          f"{'LLM p50 s':>11}{'LLM p99 s':>11}{'Builds':>8}")
+    for n_positions in [int(s) for s in args.positions.split(",") if s.strip()]:
+        rng = random.Random(args.seed + n_positions)
+        symbols = seed_book(n_positions, rng)
+        portfolio = get_alpaca_portfolio()
+        cases = review_cases(symbols, args.tickers, portfolio, rng)
+
+        book = {"positions": n_positions, "modes": {}}
+        for mode in MODES:
+            run = measure(cases, portfolio, mode, args.calls, args.budget)
+            book["modes"][mode] = run
+            ok &= run["over_budget"] == 0
+            print(f"{n_positions:>10}  {mode:<8}{run['prompt_tokens_p50']:>11,.0f}{run['prompt_tokens_max']:>11,.0f}"
+                  f"{run['build_us_p50']:>10,.0f}{run['llm_p50_s']:>11.3f}{run['llm_p99_s']:>11.3f}{run['context_builds']:>8}")
+        full, compact = book["modes"]["full"], book["modes"]["compact"]
+        book["token_reduction"] = 1 - compact["prompt_tokens_p50"] / full["prompt_tokens_p50"]
+        book["latency_reduction"] = 1 - compact["llm_p50_s"] / full["llm_p50_s"] if full["llm_p50_s"] else 0.0
+        print(f"{'':>10}  compact vs full: prompt tokens {-book['token_reduction']:+.0%}, "
+              f"LLM p50 latency {-book['latency_reduction']:+.0%}")
+        results["books"].append(book)
+
+    print(f"\nRisk prompt default mode: {risk_manager.RISK_PORTFOLIO_CONTEXT}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+CLI startup benchmark: how long a fresh interpreter takes to become useful, per entry point.
+
+1. Runs each scenario in a new `python -X importtime` process, --repeat times, and reports the median
+   wall time and the import time the interpreter itself measured.
+2. Lists the slowest modules (self time) of the heaviest scenario.
+3. Fails if a light scenario loads a module it should not (e.g. LangGraph for --help or --reflect-only).
+
+Scenarios run in a temp directory with their own journal, so nothing touches the real databases.
+
+Usage: python benchmarks/bench_startup.py [--repeat 5] [--top 15] [--json out.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+MAIN = os.path.join(ROOT, "main.py")
+
+HEAVY = ["langgraph", "langchain_core", "langchain_google_genai", "yfinance", "pandas", "pandas_ta"]
+
+# (name, argv after `python -X importtime`, modules that must NOT be imported)
+SCENARIOS = [
+    ("import main", ["-c", f"import sys; sys.path.insert(0, {ROOT!r}); import main"], HEAVY),
+    ("main.py --help", [MAIN, "--help"], HEAVY),
+    ("main.py --reflect-only", [MAIN, "--reflect-only"],
+     ["langgraph", "langchain_google_genai", "yfinance", "pandas", "pandas_ta"]),
+    ("import src.universe (full pipeline)", ["-c", f"import sys; sys.path.insert(0, {ROOT!r}); import src.universe"], []),
+]
+
+
+def parse_importtime(stderr: str):
+    """({module: (self us, cumulative us)}, total us of the top-level imports) from -X importtime output."""
+    modules, total = {}, 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = (self_us, cumulative_us)
+        if depth == 0:
+            total += cumulative_us
+    return modules, total
+
+
+def run_scenario(argv, repeat, cwd, env):
+    walls, imports, modules = [], [], {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", *argv], cwd=cwd, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        walls.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(argv)} exited {proc.returncode}:\n{proc.stderr[-2000:]}")
+        modules, total = parse_importtime(proc.stderr)
+        imports.append(total / 1e6)
+    return statistics.median(walls), statistics.median(imports), modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = {"python": sys.version.split()[0], "scenarios": []}
+    ok = True
+    heaviest = None
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PORTFOLIO_DB_PATH=os.path.join(tmp, "portfolio.db"),
+                   GOOGLE_API_KEY=os.getenv("GOOGLE_API_KEY", "offline"))
+        print(f"{'Scenario':<38}{'Wall s':>8}{'Imports s':>11}{'Modules':>9}  Unwanted imports")
+        for name, argv, forbidden in SCENARIOS:
+            wall, imports, modules = run_scenario(argv, args.repeat, tmp, env)
+            unwanted = [m for m in forbidden if m in modules]
+            ok &= not unwanted
+            print(f"{name:<38}{wall:>8.3f}{imports:>11.3f}{len(modules):>9}  {', '.join(unwanted) or '-'}")
+            results["scenarios"].append({"name": name, "wall_s": wall, "import_s": imports,
+                                         "modules": len(modules), "unwanted": unwanted})
+            if heaviest is None or imports > heaviest[1]:
+                heaviest = (name, imports, modules)
+
+    name, _, modules = heaviest
+    slowest = sorted(modules.items(), key=lambda kv: -kv[1][0])[:args.top]
+    print(f"\nSlowest modules (self time) in '{name}':")
+    for module, (self_us, cumulative_us) in slowest:
+        print(f"  {module:<50}{self_us / 1000:>9.1f} ms  (with imports {cumulative_us / 1000:.1f} ms)")
+    results["slowest_modules"] = [{"module": m, "self_ms": s / 1000, "cumulative_ms": c / 1000}
+                                  for m, (s, c) in slowest]
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Trade journal write benchmark: connection-per-insert vs the storage engine.
+
+legacy: what storage.py used to do: sqlite3.connect + INSERT + commit + close per trade
+        (rollback journal), from every writer thread at once.
+engine: src/data/storage.py: writers enqueue, one writer thread commits executemany batches
+        on a thread-local WAL connection.
+
+Reports sustained rows/s (enqueue -> durable commit) and per-call latency seen by the writers.
+
+Usage: python benchmarks/bench_storage.py [--writers 8] [--rows 2000] [--json out.json]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.data import storage
+from src.utils.decisions import TradeRecord
+
+
+def legacy_insert(path, record):
+    conn = sqlite3.connect(path, timeout=60)
+    conn.execute(storage.INSERT_TRADE, record.as_row())
+    conn.commit()
+    conn.close()
+
+
+def run(writers, rows, write_one):
+    """Starts `writers` threads that each write `rows` trades. Returns (seconds, per-call latencies)."""
+    latencies = [[] for _ in range(writers)]
+    barrier = threading.Barrier(writers + 1)
+
+    def writer(i):
+        barrier.wait()
+        for n in range(rows):
+            record = TradeRecord(f"T{i:03d}", "buy", n + 1, 100.0 + n, "bench", 0.5, f"{i}-{n}")
+            start = time.perf_counter()
+            write_one(record)
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    storage.flush()
+    return time.perf_counter() - start, [x for per in latencies for x in per]
+
+
+def summarize(name, seconds, latencies, total):
+    latencies.sort()
+    return {
+        "mode": name,
+        "rows": total,
+        "seconds": seconds,
+        "rows_per_s": total / seconds,
+        "call_p50_ms": statistics.median(latencies) * 1000,
+        "call_p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=2000, help="Rows per writer")
+    parser.add_argument("--legacy-rows", type=int, default=None, help="Rows per writer for the slow legacy mode")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+    legacy_rows = args.legacy_rows or max(1, args.rows // 10)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Legacy: new connection per insert, default rollback journal
+        legacy_path = os.path.join(tmp, "legacy.db")
+        conn = sqlite3.connect(legacy_path)
+        for steps in storage.MIGRATIONS:
+            for step in steps:
+                step(conn) if callable(step) else conn.execute(step)
+        conn.commit()
+        conn.close()
+        seconds, lat = run(args.writers, legacy_rows, lambda r: legacy_insert(legacy_path, r))
+        results.append(summarize("legacy", seconds, lat, args.writers * legacy_rows))
+
+        # Engine: write queue + executemany on WAL
+        storage.DB_PATH = os.path.join(tmp, "engine.db")
+        storage.init_db()
+        seconds, lat = run(args.writers, args.rows, lambda r: storage._writer.put(storage.INSERT_TRADE, r.as_row()))
+        results.append(summarize("engine", seconds, lat, args.writers * args.rows))
+
+        stored = storage.get_connection().execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+        plan = storage.get_connection().execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM trades WHERE ticker = ? ORDER BY timestamp DESC LIMIT 5", ("T001",)
+        ).fetchall()
+
+    print(f"Writers: {args.writers}")
+    for r in results:
+        print(f"{r['mode']:<7} {r['rows']:>7} rows  {r['rows_per_s']:>10,.0f} rows/s  "
+              f"call p50 {r['call_p50_ms']:.3f} ms  p99 {r['call_p99_ms']:.3f} ms")
+    print(f"Speedup: {results[1]['rows_per_s'] / results[0]['rows_per_s']:.1f}x  |  "
+          f"rows stored: {stored}  |  ticker lookup: {plan[0][-1]}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"writers": args.writers, "results": results, "stored": stored}, f, indent=2)
+    sys.exit(0 if stored == args.writers * args.rows else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Streaming benchmark, fully offline: a recorded minute-bar session replayed through FileReplayFeed into
+StreamRunner, with the real agent nodes behind it and local stand-ins for Gemini (FakeChatModel) and
+Alpaca (MockBroker). The journal and caches live in a temp directory.
+
+1. Writes --tickers x --bars synthetic minute bars (random walk, a volume spike every --spike-every bars)
+   as a CSV, interleaved by timestamp like a live feed.
+2. Replays it (as fast as possible, or --speed x bar time): every bar updates its ticker's indicators,
+   triggers start pipeline runs (cooldown in bar time), and the runner waits for the runs still in flight.
+3. Reports bars/s (runs included), triggers, runs, reaction p50/p99 (bar received -> order done),
+   LLM calls and orders.
+4. Fails if a run crashed, a bar went missing, or no trigger ever started a run.
+
+Usage: python benchmarks/bench_streaming.py [--tickers 4] [--bars 300] [--speed 0] [--llm-latency 0.05]
+                                            [--json out.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+_TMP = tempfile.mkdtemp(prefix="bench-streaming-")
+os.environ.setdefault("GOOGLE_API_KEY", "offline")
+os.environ.setdefault("PORTFOLIO_DB_PATH", os.path.join(_TMP, "portfolio.db"))
+os.environ.setdefault("LLM_CACHE", "off")
+os.environ.setdefault("LLM_MAX_RPM", "100000000")
+os.environ.setdefault("LLM_MAX_TPM", "100000000000")
+
+from benchmarks.fakes import FakeChatModel, write_minute_session
+from src.data.storage import init_db
+from src.streaming import COOLDOWN_SECONDS, FileReplayFeed, StreamRunner, print_stream_stats
+from src.utils import llm_gateway
+from src.utils.alpaca_client import set_client
+from src.utils.mock_broker import MockBroker
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=4)
+    parser.add_argument("--bars", type=int, default=300, help="Minute bars per ticker")
+    parser.add_argument("--spike-every", type=int, default=40, help="Bars between volume spikes (0 = none)")
+    parser.add_argument("--speed", type=float, default=0.0, help="Replay speed vs bar time (0 = as fast as possible)")
+    parser.add_argument("--cooldown", type=float, default=COOLDOWN_SECONDS, help="Seconds of bar time")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake LLM call")
+    parser.add_argument("--fill-delay", type=float, default=0.01, help="Seconds from order accept to fill")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    os.chdir(_TMP)
+    try:
+        path = os.path.join(_TMP, "session.csv")
+        prices = write_minute_session(path, args.tickers, args.bars, args.spike_every, args.seed)
+
+        fake = FakeChatModel(latency=args.llm_latency, seed=args.seed)
+        llm_gateway.set_llm(fake)
+        broker = MockBroker(cash=10_000_000.0, prices=prices, fill_delay=args.fill_delay, seed=args.seed)
+        set_client(broker.client())
+        init_db()
+
+        feed = FileReplayFeed(path, speed=args.speed)
+        runner = StreamRunner(feed, feed.symbols(), cooldown=args.cooldown, workers=args.workers, warm_up=False)
+        start = time.perf_counter()
+        stats = runner.run()
+        seconds = time.perf_counter() - start
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(_TMP, ignore_errors=True)
+
+    expected = args.tickers * args.bars
+    results = {
+        "config": {k: getattr(args, k) for k in ("tickers", "bars", "spike_every", "speed", "cooldown", "workers",
+                                                "llm_latency", "fill_delay", "seed")},
+        **stats,
+        "seconds": seconds,
+        "bars_per_s": stats["bars"] / seconds if seconds else 0.0,
+        "llm_calls": fake.calls,
+        "orders": broker.stats["orders"],
+        "fills": broker.stats["fills"],
+    }
+
+    print_stream_stats(stats)
+    print(f"Replay: {stats['bars']:,}/{expected:,} bars in {seconds:.2f}s ({results['bars_per_s']:,.0f} bars/s, "
+          f"runs included) | {fake.calls} LLM calls | {broker.stats['orders']} orders, {broker.stats['fills']} fills")
+
+    ok = stats["errors"] == 0 and stats["bars"] == expected and stats["out_of_order"] == 0 and stats["runs"] > 0
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
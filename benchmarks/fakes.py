@@ -0,0 +1,185 @@
+"""
+Deterministic local stand-ins for the three services the pipeline talks to, shared by the benchmarks.
+
+- FakeChatModel: answers every agent prompt in place of Gemini, with a configurable latency.
+- SyntheticMarket: a yf.download-compatible random walk in place of Yahoo
+  (install it with ohlcv_cache.set_downloader(market.download)).
+- Alpaca: MockBrokerServer in src/utils/mock_broker.py serves a MockBroker over localhost HTTP.
+- write_minute_session: a recorded minute-bar session for FileReplayFeed in place of Alpaca's stream.
+
+The same prompt always gets the same answer and the same ticker always gets the same bars,
+so two runs of a benchmark do identical work.
+"""
+import asyncio
+import csv
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+from langchain_core.messages import AIMessage
+
+CHARS_PER_TOKEN = 4
+
+
+def _digest(text: str) -> int:
+    return int(hashlib.sha256(text.encode()).hexdigest(), 16)
+
+
+class FakeChatModel:
+    """
+    Stand-in for ChatGoogleGenerativeAI. Recognizes each agent's prompt and returns a canned,
+    well-formed answer picked by the prompt's hash. Every call sleeps `latency` seconds
+    (plus up to `jitter` more, plus `prefill_per_1k_tokens` per 1000 prompt tokens, like
+    time-to-first-token grows with the prompt) and reports token usage like Gemini does.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0, prefill_per_1k_tokens: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.prefill_per_1k_tokens = prefill_per_1k_tokens
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay(self, prompt: str) -> float:
+        prefill = self.prefill_per_1k_tokens * len(prompt) / CHARS_PER_TOKEN / 1000
+        with self._lock:
+            self.calls += 1
+            return self.latency + prefill + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def answer(self, prompt: str) -> str:
+        digest = _digest(prompt)
+        if "Head Portfolio Manager" in prompt:
+            action = ["BUY", "SELL", "HOLD"][digest % 3]
+            return json.dumps({"action": action, "confidence": 40 + digest % 61, "reason": "Synthetic decision."})
+        if "Chief Risk Officer" in prompt:
+            verdict = "APPROVED" if digest % 2 else "REJECTED"
+            return json.dumps({"risk_score": digest % 101, "verdict": verdict, "reason": "Synthetic review."})
+        if "Trading Coach" in prompt:
+            ids = re.findall(r'"trade_id": (\d+)', prompt)
+            return json.dumps({"lessons": [{"trade_id": int(i), "lesson": f"Synthetic rule {int(i) % 7}."}
+                                           for i in ids]})
+        if "Technical Trading Expert" in prompt:
+            tickers = re.findall(r'"ticker": "([^"<]+)"', prompt)
+            signals = ["BUY", "SELL", "WAIT"]
+            if tickers:
+                return json.dumps([{"ticker": t, "signal": signals[_digest(prompt + t) % 3], "reason": "Synthetic."}
+                                   for t in tickers])
+            return f"SIGNAL: {signals[digest % 3]}\nReason: Synthetic."
+        return f"Synthetic report. Valuation Score: {digest % 101}."
+
+    def _message(self, prompt: str) -> AIMessage:
+        content = self.answer(prompt)
+        usage = {"input_tokens": len(prompt) // CHARS_PER_TOKEN, "output_tokens": len(content) // CHARS_PER_TOKEN}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return AIMessage(content=content, usage_metadata=usage)
+
+    @staticmethod
+    def _prompt(messages) -> str:
+        return messages[-1].content if isinstance(messages, list) else str(messages)
+
+    def invoke(self, messages, **kwargs):
+        prompt = self._prompt(messages)
+        delay = self._delay(prompt)
+        if delay:
+            time.sleep(delay)
+        return self._message(prompt)
+
+    async def ainvoke(self, messages, **kwargs):
+        prompt = self._prompt(messages)
+        delay = self._delay(prompt)
+        if delay:
+            await asyncio.sleep(delay)
+        return self._message(prompt)
+
+
+class SyntheticMarket:
+    """
+    Random-walk daily bars, seeded per ticker, ending at `end` (default: today).
+    download() takes the yf.download arguments the OHLCV cache uses (period or start, group_by="ticker")
+    and returns the same (ticker, field) column layout. `latency` is slept once per download.
+    """
+
+    PERIOD_DAYS = {"d": 1, "wk": 7, "mo": 31, "y": 366}
+
+    def __init__(self, seed: int = 0, history_days: int = 2 * 252, latency: float = 0.0, end=None):
+        self.seed = seed
+        self.latency = latency
+        self.index = pd.bdate_range(end=pd.Timestamp(end or pd.Timestamp.now()).normalize(), periods=history_days)
+        self.downloads = 0
+        self._bars = {}
+        self._lock = threading.Lock()
+
+    def bars(self, ticker: str) -> pd.DataFrame:
+        with self._lock:
+            frame = self._bars.get(ticker)
+            if frame is None:
+                rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode())])
+                days = len(self.index)
+                close = (20 + 280 * rng.random()) * np.exp(np.cumsum(rng.normal(0.0003, 0.02, days)))
+                spread = np.abs(rng.normal(0, 0.01, days))
+                frame = self._bars[ticker] = pd.DataFrame({
+                    "Open": close * (1 + rng.normal(0, 0.005, days)),
+                    "High": close * (1 + spread),
+                    "Low": close * (1 - spread),
+                    "Close": close,
+                    "Volume": rng.integers(100_000, 10_000_000, days).astype(float),
+                }, index=self.index)
+            return frame
+
+    def last_close(self, tickers) -> dict:
+        return {t: round(float(self.bars(t)["Close"].iloc[-1]), 2) for t in tickers}
+
+    def _window_start(self, period=None, start=None) -> pd.Timestamp:
+        if start is not None:
+            return pd.Timestamp(start)
+        match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period or "6mo")
+        if not match:
+            return self.index[0]
+        return self.index[-1] - pd.Timedelta(days=int(match.group(1)) * self.PERIOD_DAYS[match.group(2)])
+
+    def download(self, tickers, period=None, start=None, interval="1d", **kwargs) -> pd.DataFrame:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.downloads += 1
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        window_start = self._window_start(period, start)
+        frames = [self.bars(t).loc[window_start:] for t in tickers]
+        return pd.concat(frames, axis=1, keys=tickers)
+
+
+SESSION_START = 1_772_461_800   # 2026-03-02 14:30 UTC, a regular-session open
+
+
+def write_minute_session(path: str, n_tickers: int, n_bars: int, spike_every: int = 40, seed: int = 0) -> dict:
+    """
+    Writes a FileReplayFeed CSV of `n_bars` random-walk minute bars for SYN000.. tickers, interleaved
+    by timestamp like a live feed, with a 6x volume spike every `spike_every` bars (0 = none).
+    Returns {ticker: last close}.
+    """
+    rng = np.random.default_rng(seed)
+    tickers = [f"SYN{i:03d}" for i in range(n_tickers)]
+    closes, volumes = {}, {}
+    for ticker in tickers:
+        closes[ticker] = (20 + 200 * rng.random()) * np.exp(np.cumsum(rng.normal(0, 0.002, n_bars)))
+        volume = rng.lognormal(8, 0.3, n_bars)
+        if spike_every:
+            volume[spike_every::spike_every] *= 6
+        volumes[ticker] = volume
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ticker", "timestamp", "open", "high", "low", "close", "volume"])
+        for i in range(n_bars):
+            for ticker in tickers:
+                close = closes[ticker][i]
+                writer.writerow([ticker, SESSION_START + 60 * i, close, close * 1.001, close * 0.999,
+                                 close, round(volumes[ticker][i])])
+    return {t: float(c[-1]) for t, c in closes.items()}
@@ -1,95 +1,199 @@
 from dotenv import load_dotenv
-from src.state import AgentState
-from src.agents.data_collector import data_collection_node
-from src.agents.analysts import fundamental_analyst, technical_analyst
-from src.agents.portfolio_manager import portfolio_manager
-from src.agents.risk_manager import risk_management_node
-from src.agents.execution import execute_trade_node
-from src.agents.reflector import reflector_node  # <--- New Import
-from src.data.storage import init_db, log_trade
+from src.stage_limits import DEFAULT_STAGE_LIMITS
+import argparse
 import sys
 from termcolor import colored
 
+# Startup: only what argparse needs is imported here. Each mode imports its own modules
+# (LangGraph, pandas, yfinance, the agents) when it runs, so --help, cron jobs and
+# per-ticker wrappers don't pay for the ones they never use.
+
 # Load environment variables
 load_dotenv()
 
-if __name__ == "__main__":
-    print(colored("--- 🚀 Starting Hedge Fund System (Sprint 6 Complete) ---", "cyan"))
-    
-    # 0. Initialize Database
-    init_db()
-    
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-Agent Hedge Fund System")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols to run (default: MU)")
+    parser.add_argument("--universe", help="File with one ticker per line (or a CSV with a 'ticker' column, optional 'sector')")
+    parser.add_argument("--output", default="universe_results.csv", help="Where to write the universe results table")
+    parser.add_argument("--no-batch-data", action="store_true", help="Fetch market data per ticker instead of in bulk")
+    parser.add_argument("--no-batch-technical", action="store_true", help="One Technical Analyst prompt per ticker")
+    parser.add_argument("--technical-batch-size", type=int, default=None,
+                        help="Tickers per batched Technical Analyst prompt (default: TECH_BATCH_SIZE in src/agents/analysts.py)")
+    parser.add_argument("--no-prescreen", action="store_true", help="Send every ticker to the LLM agents")
+    parser.add_argument("--no-optimizer", action="store_true", help="Size and send each order on its own instead of as one basket")
+    parser.add_argument("--optimizer-method", choices=["risk_parity", "mean_variance"], default=None,
+                        help="Portfolio Optimizer solver (default: OPTIMIZER_METHOD env or risk_parity)")
+    parser.add_argument("--no-batch-reflection", action="store_true", help="Let each ticker's Reflector node review its own trades")
+    parser.add_argument("--backtest", metavar="START", help="Replay the tickers over cached bars from START (YYYY-MM-DD) instead of trading")
+    parser.add_argument("--backtest-end", metavar="END", default=None, help="Last backtest day (default: today)")
+    parser.add_argument("--backtest-llm", choices=["offline", "replay"], default=None,
+                        help="Backtest decisions: indicator policy, or the agents with replayed LLM answers (default: BACKTEST_LLM env or offline)")
+    parser.add_argument("--backtest-cash", type=float, default=None,
+                        help="Starting cash for the backtest (default: BACKTEST_START_CASH in src/backtest.py)")
+    parser.add_argument("--processes", type=int, default=None, help="Backtest worker processes (default: CPU count)")
+    parser.add_argument("--equity-output", default="backtest_equity.csv", help="Where to write the backtest equity curve")
+    parser.add_argument("--stream", action="store_true",
+                        help="Long-running intraday mode: minute bars from Alpaca's websocket, agents run only when a trigger fires")
+    parser.add_argument("--stream-replay", metavar="FILE", default=None,
+                        help="Stream from a recorded file (CSV or Alpaca JSONL) instead of the websocket")
+    parser.add_argument("--stream-speed", type=float, default=0.0,
+                        help="Replay speed-up over real time (default: 0 = as fast as possible)")
+    parser.add_argument("--stream-record", metavar="FILE", default=None, help="Append live bars to this JSONL file")
+    parser.add_argument("--stream-cooldown", type=float, default=None,
+                        help="Seconds before a ticker can trigger again (default: COOLDOWN_SECONDS in src/streaming.py)")
+    parser.add_argument("--run-id", default=None,
+                        help="Checkpoint the run under this ID; running again with the same ID resumes it, skipping finished nodes")
+    parser.add_argument("--checkpoint", action="store_true", help="Checkpoint the run under a new run ID (printed, for --run-id)")
+    parser.add_argument("--list-checkpoints", action="store_true", help="List checkpointed runs and exit")
+    parser.add_argument("--prune-checkpoints", metavar="DAYS", type=float, default=None,
+                        help="Delete checkpoints of runs last saved more than DAYS ago (0 = all) and exit")
+    parser.add_argument("--prune-run", metavar="RUN_ID", action="append", default=[],
+                        help="Delete one run's checkpoints and exit (repeatable)")
+    parser.add_argument("--reflect-only", action="store_true",
+                        help="Only review unreviewed trades (of the given tickers, or all) with the batched Reflector")
+    parser.add_argument("--metrics", choices=["jsonl", "prometheus", "off"], default=None,
+                        help="Per-node metrics output (default: METRICS_FORMAT env or jsonl)")
+    parser.add_argument("--metrics-path", default=None, help="Metrics file (default: metrics.jsonl / metrics.prom)")
+    parser.add_argument("--profile-ticker", default=None, help="cProfile every node call for this ticker (saved under profiles/)")
+    parser.add_argument("--workers", type=int, default=None, help="Thread pool size (default: sum of stage limits)")
+    for stage, cap in DEFAULT_STAGE_LIMITS.items():
+        parser.add_argument(f"--{stage.replace('_', '-')}-limit", type=int, default=cap,
+                            help=f"Max concurrent tickers in the {stage} stage (default: {cap})")
+    return parser.parse_args(argv)
+
+
+def limits_from(args) -> dict:
+    return {stage: getattr(args, f"{stage}_limit") for stage in DEFAULT_STAGE_LIMITS}
+
+
+def run_single(ticker, run_id=None):
+    from src.pipeline import new_state, run_pipeline
+    from src.utils import telemetry
+
     # 1. Initialize State
-    # Use 'MU' since you just bought it, so we can reflect on it!
-    # Or change back to 'AAPL' or any other ticker.
-    state: AgentState = {
-        "ticker": "MU", 
-        "data": {},
-        "metadata": {},
-        "fundamental_analysis": "",
-        "technical_analysis": "",
-        "sentiment_analysis": "",
-        "portfolio_decision": "",
-        "risk_score": 0,
-        "risk_analysis": "",
-        "trade_approved": False,
-        "execution_status": "",
-        "revision_count": 0
-    }
-
-    # 2. Run Data Collection
-    print(f"--- 1. Fetching Data for {state['ticker']} ---")
-    node1_result = data_collection_node(state)
-    state.update(node1_result)
-    
-    if "error" in state["metadata"] or not state["data"]:
+    state = new_state(ticker)
+    graph = None
+    if run_id:
+        from src.data.checkpoints import Checkpointer
+        from src.graph import build_graph
+        graph = build_graph(checkpointer=Checkpointer(run_id))
+        state["metadata"]["run_id"] = run_id
+
+    # 2. Run every node (Data -> Analysts -> PM -> Risk -> Execution -> Log -> Reflector)
+    telemetry.new_run(run_id)
+    run_pipeline(state, graph=graph)
+    telemetry.finish_run()
+
+    if state["metadata"].get("status") == "error" or not state["data"]:
         print(colored(f"❌ System Halted: {state['metadata'].get('error_msg', 'No Data')}", "red"))
         sys.exit(1)
 
-    # 3. Run Analysts
-    state.update(fundamental_analyst(state))
-    state.update(technical_analyst(state))
-
-    # 4. Run Portfolio Manager
-    state.update(portfolio_manager(state))
     print(colored(f"\n👨‍💼 PM PROPOSAL: {state['portfolio_decision']}", "magenta"))
-
-    # 5. Run Risk Veto Board
-    state.update(risk_management_node(state))
     print("\n" + "="*50)
     print(f"🛡️ RISK BOARD VERDICT")
     print(state["risk_analysis"])
     print("="*50)
 
-    # 6. Run Execution Agent
-    node6_result = execute_trade_node(state)
-    state.update(node6_result)
-
-    # 7. LOGGING
-    exec_status = state.get('execution_status', '')
-    if "Filled" in exec_status:
-        try:
-            parts = exec_status.split(" ")
-            action = parts[1]
-            qty = float(parts[2])
-            ticker = parts[3]
-            price = state['data']['price']
-            log_trade(ticker, action, qty, price, state['portfolio_decision'])
-        except Exception as e:
-            print(colored(f"⚠️ Error logging: {e}", "yellow"))
-
-    # 8. REFLECTOR AGENT (The Learning Step)
-    # It looks at the LAST trade (which might be the one we just did) and comments on it.
-    reflector_node(state)
-
     # --- FINAL REPORT ---
+    exec_status = state.get('execution_status', '')
     print("\n" + "="*50)
     print(f"📜 FINAL EXECUTION LOG")
     print("="*50)
-    
+
     if "Filled" in exec_status:
         print(colored(f"SUCCESS: {exec_status}", "green", attrs=['bold']))
     else:
         print(exec_status)
-        
-    print("="*50)
\ No newline at end of file
+
+    print("="*50)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(colored("--- 🚀 Starting Hedge Fund System (Sprint 6 Complete) ---", "cyan"))
+
+    # 0. Initialize Database + telemetry
+    from src.data.storage import init_db
+    from src.utils import telemetry
+    init_db()
+    if args.metrics:
+        telemetry.METRICS_FORMAT = args.metrics
+    if args.metrics_path:
+        telemetry.METRICS_PATH = args.metrics_path
+    if args.profile_ticker:
+        telemetry.PROFILE_TICKER = args.profile_ticker.upper()
+
+    tickers = [t.upper() for t in args.tickers]
+    if args.universe:
+        from src.data.lesson_memory import set_sectors
+        from src.universe import load_universe, load_sectors
+        tickers += load_universe(args.universe)
+        set_sectors(load_sectors(args.universe))
+    tickers = list(dict.fromkeys(tickers))
+
+    if args.list_checkpoints or args.prune_checkpoints is not None or args.prune_run:
+        # Checkpoint housekeeping only
+        from src.data import checkpoints
+        if args.prune_checkpoints is not None or args.prune_run:
+            runs, rows = checkpoints.prune(args.prune_checkpoints, args.prune_run)
+            print(colored(f"🧹 Pruned {runs} runs ({rows} checkpoints)", "cyan"))
+        if args.list_checkpoints:
+            checkpoints.print_runs()
+        sys.exit(0)
+
+    run_id = args.run_id
+    if args.checkpoint and not run_id:
+        from src.data.checkpoints import new_run_id
+        run_id = new_run_id()
+
+    if args.reflect_only:
+        # Reflector only: no market data, graph or orders (prices come from the OHLCV cache)
+        from src.agents.reflector import reflect_trades
+        telemetry.new_run()
+        with telemetry.span("batch_reflector"):
+            reflect_trades(tickers=tickers or None)
+        telemetry.finish_run()
+        sys.exit(0)
+
+    if args.stream or args.stream_replay:
+        # Streaming mode: react to each new minute bar instead of one batch pass
+        from src.streaming import (COOLDOWN_SECONDS, AlpacaBarFeed, FileReplayFeed, StreamRunner,
+                                   print_stream_stats)
+        if args.stream_replay:
+            feed = FileReplayFeed(args.stream_replay, speed=args.stream_speed, tickers=tickers)
+            tickers = tickers or feed.symbols()
+        else:
+            tickers = tickers or ["MU"]
+            feed = AlpacaBarFeed(tickers, record_path=args.stream_record)
+        cooldown = COOLDOWN_SECONDS if args.stream_cooldown is None else args.stream_cooldown
+        runner = StreamRunner(feed, tickers, cooldown=cooldown, stage_limits=limits_from(args),
+                              warm_up=not args.stream_replay)
+        print_stream_stats(runner.run())
+        sys.exit(0)
+
+    tickers = tickers or ["MU"]
+    if args.backtest:
+        # Backtest mode: replay the pipeline over cached bars, no live LLM or orders
+        from src.backtest import BACKTEST_START_CASH, run_backtest, print_backtest
+        _, stats = run_backtest(tickers, args.backtest, args.backtest_end, cash=args.backtest_cash or BACKTEST_START_CASH,
+                                llm_mode=args.backtest_llm, processes=args.processes, output=args.equity_output)
+        print_backtest(stats)
+    elif len(tickers) == 1 and not args.universe:
+        run_single(tickers[0], run_id)
+    else:
+        # Universe mode: many AgentState pipelines at once, one results table at the end
+        from src.agents.analysts import TECH_BATCH_SIZE
+        from src.universe import run_universe, write_results, print_results
+        results = run_universe(tickers, stage_limits=limits_from(args), max_workers=args.workers,
+                               batch_data=not args.no_batch_data,
+                               batch_technical=not args.no_batch_technical,
+                               technical_batch_size=args.technical_batch_size or TECH_BATCH_SIZE,
+                               prescreen=not args.no_prescreen,
+                               optimize=not args.no_optimizer,
+                               optimizer_method=args.optimizer_method,
+                               batch_reflection=not args.no_batch_reflection,
+                               run_id=run_id)
+        print_results(results)
+        write_results(results, args.output)
@@ -1,27 +1,16 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
 from src.state import AgentState
+from src.utils import llm_gateway, telemetry
 from termcolor import colored
-import os
-from dotenv import load_dotenv
 
-# Load Environment Variables
-load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
+# Gemini is reached through the shared gateway (src/utils/llm_gateway.py)
 
-# --- CONFIGURATION ---
-# Now that you have billing enabled, this model will fly! 🚀
-MODEL_NAME = "gemini-2.0-flash" 
-
-if not api_key:
-    print(colored("CRITICAL ERROR: GOOGLE_API_KEY not found", "red"))
-
-# Initialize Gemini
-llm = ChatGoogleGenerativeAI(
-    model=MODEL_NAME, 
-    temperature=0,
-    google_api_key=api_key
-)
+# CONFIG: Tickers packed into one batched Technical Analyst prompt
+TECH_BATCH_SIZE = 25
+TECH_BATCH_WORKERS = 4
+VALID_SIGNALS = {"BUY", "SELL", "WAIT"}
 
 def fundamental_analyst(state: AgentState) -> AgentState:
     """
@@ -45,8 +34,7 @@ def fundamental_analyst(state: AgentState) -> AgentState:
     """
     
     try:
-        response = llm.invoke([HumanMessage(content=msg)])
-        result = response.content
+        result = llm_gateway.invoke("fundamental_analyst", msg)
     except Exception as e:
         print(colored(f"Error in Fundamental Analyst: {e}", "red"))
         result = f"Error: {str(e)}"
@@ -78,12 +66,91 @@ def technical_analyst(state: AgentState) -> AgentState:
     """
     
     try:
-        response = llm.invoke([HumanMessage(content=msg)])
-        result = response.content
+        result = llm_gateway.invoke("technical_analyst", msg)
     except Exception as e:
         print(colored(f"Error in Technical Analyst: {e}", "red"))
         result = f"Error: {str(e)}"
     
     return {
         "technical_analysis": result
-    }
\ No newline at end of file
+    }
+
+def parse_signal_batch(text: str, tickers) -> dict:
+    """
+    Parses the batched Technical Analyst reply: a JSON array of {ticker, signal, reason}.
+    Returns {ticker: technical_analysis text} for every well-formed entry of a requested ticker.
+    """
+    # Models like to wrap JSON in ```json fences or add a preamble
+    match = re.search(r"\[.*\]", text, re.DOTALL)
+    if not match:
+        return {}
+    try:
+        rows = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+
+    wanted = set(tickers)
+    parsed = {}
+    for row in rows if isinstance(rows, list) else []:
+        if not isinstance(row, dict):
+            continue
+        ticker = str(row.get("ticker", "")).upper()
+        signal = str(row.get("signal", "")).upper()
+        if ticker in wanted and signal in VALID_SIGNALS:
+            parsed[ticker] = f"SIGNAL: {signal}\nReason: {row.get('reason', '').strip()}"
+    return parsed
+
+def _technical_batch_prompt(states) -> str:
+    rows = [
+        {
+            "ticker": s['ticker'],
+            "price": round(float(s['data'].get('price', 0.0)), 2),
+            "rsi": round(float(s['data'].get('rsi', 0.0)), 2),
+            "macd": round(float(s['data'].get('macd', 0.0)), 2),
+        }
+        for s in states
+    ]
+    return f"""
+    You are a Technical Trading Expert. Analyze these indicators for {len(rows)} tickers.
+    RSI: Over 70=Overbought, Under 30=Oversold.
+
+    {json.dumps(rows)}
+
+    For EACH ticker give a clear signal: BUY, SELL, or WAIT based purely on its numbers.
+    Reply with ONLY a JSON array, one object per ticker, in the same order:
+    [{{"ticker": "<TICKER>", "signal": "BUY|SELL|WAIT", "reason": "<one sentence>"}}]
+    """
+
+def _run_technical_batch(states) -> dict:
+    tickers = [s['ticker'] for s in states]
+    try:
+        reply = llm_gateway.invoke("technical_analyst", _technical_batch_prompt(states))
+        parsed = parse_signal_batch(reply, tickers)
+    except Exception as e:
+        print(colored(f"Error in Batched Technical Analyst: {e}", "red"))
+        parsed = {}
+
+    # Anything the batch reply didn't cover goes through the regular per-ticker node
+    missing = [s for s in states if s['ticker'] not in parsed]
+    if missing:
+        print(colored(f"⚠️ Batch reply missed {len(missing)}/{len(states)} tickers, falling back per ticker", "yellow"))
+    for s in missing:
+        parsed[s['ticker']] = technical_analyst(s)["technical_analysis"]
+    return parsed
+
+def technical_analyst_batch(states, batch_size: int = TECH_BATCH_SIZE) -> dict:
+    """
+    Node 3 (Batch Mode): Technical Analyst for a whole universe.
+    Packs `batch_size` tickers' indicator rows into one prompt and parses a JSON array of signals.
+    Returns {ticker: {"technical_analysis": text}}, same shape as technical_analyst per ticker.
+    """
+    states = [s for s in states if s.get('data')]
+    batches = [states[i:i + batch_size] for i in range(0, len(states), batch_size)]
+    print(colored(f"--- [Node 3] Batched Technical Analyst: {len(states)} tickers in {len(batches)} prompts ---", "yellow"))
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=TECH_BATCH_WORKERS) as pool:
+        for parsed in pool.map(telemetry.bind(_run_technical_batch), batches):
+            results.update(parsed)
+
+    return {ticker: {"technical_analysis": text} for ticker, text in results.items()}
@@ -1,9 +1,28 @@
-import yfinance as yf
 from datetime import datetime
 from src.state import AgentState
-from src.utils.indicators import calculate_technical_indicators
+from src.data.ohlcv_cache import get_history, get_history_batch
+from src.utils.indicators import calculate_technical_indicators, calculate_latest_indicators_batch
 from termcolor import colored
 
+# CONFIG: How much history to pull (needs >= 50 bars for SMA_50)
+HISTORY_PERIOD = "6mo"
+
+# CONFIG: Max symbols per bulk cache/yfinance request
+BATCH_CHUNK_SIZE = 100
+
+def build_market_data(latest) -> dict:
+    """Maps the latest indicator row onto the state's `data` dict."""
+    return {
+        "price": latest["Close"],
+        "volume": latest["Volume"],
+        "rsi": latest["RSI"],
+        "macd": latest["MACD_12_26_9"],
+        "signal": latest["MACDs_12_26_9"],
+        "sma_20": latest["SMA_20"],
+        "sma_50": latest["SMA_50"],
+        "last_updated": datetime.now().isoformat()
+    }
+
 def data_collection_node(state: AgentState) -> AgentState:
     """
     Node 1: Data Collection
@@ -13,31 +32,21 @@ def data_collection_node(state: AgentState) -> AgentState:
     print(colored(f"--- [Node 1] Data Collector Activated for {ticker} ---", "cyan"))
 
     try:
-        # 1. Fetch Data via yfinance
-        stock = yf.Ticker(ticker)
+        # 1. Fetch Data via the local OHLCV cache (yfinance only for missing bars)
         # Fetch 6 months of data to ensure enough history for indicators
-        hist = stock.history(period="6mo")
-        
+        hist = get_history(ticker, period=HISTORY_PERIOD)
+
         if hist.empty:
             raise ValueError(f"No data found for {ticker}")
 
         # 2. Calculate Indicators (pandas-ta)
         hist_processed = calculate_technical_indicators(hist)
-        
+
         # Get the most recent row of data (Today's state)
         latest = hist_processed.iloc[-1]
 
         # 3. Structure the data for the State
-        market_data = {
-            "price": latest["Close"],
-            "volume": latest["Volume"],
-            "rsi": latest["RSI"],
-            "macd": latest["MACD_12_26_9"],
-            "signal": latest["MACDs_12_26_9"],
-            "sma_20": latest["SMA_20"],
-            "sma_50": latest["SMA_50"],
-            "last_updated": datetime.now().isoformat()
-        }
+        market_data = build_market_data(latest)
 
         print(colored(f"Successfully fetched data: Price=${latest['Close']:.2f}, RSI={latest['RSI']:.2f}", "green"))
 
@@ -53,4 +62,47 @@ def data_collection_node(state: AgentState) -> AgentState:
         return {
             "data": {},
             "metadata": {"status": "error", "error_msg": str(e)}
-        }
\ No newline at end of file
+        }
+
+def batch_data_collection(tickers) -> dict:
+    """
+    Node 1 (Batch Mode): Data Collection for a whole universe.
+    Pulls OHLCV for many tickers per bulk cache/yfinance request, runs one shared indicator pass,
+    and returns {ticker: node result} in the same shape as data_collection_node.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    print(colored(f"--- [Node 1] Batch Data Collector Activated for {len(tickers)} tickers ---", "cyan"))
+
+    results = {}
+    for i in range(0, len(tickers), BATCH_CHUNK_SIZE):
+        chunk = tickers[i:i + BATCH_CHUNK_SIZE]
+        try:
+            # 1. One bulk request for the whole chunk (only missing bars hit the network)
+            frames = get_history_batch(chunk, period=HISTORY_PERIOD)
+
+            # 2. Shared indicator pass over every frame
+            latest_rows = calculate_latest_indicators_batch(frames)
+        except Exception as e:
+            print(colored(f"Error in Batch Data Collection: {str(e)}", "red"))
+            latest_rows = {}
+            chunk_error = str(e)
+        else:
+            chunk_error = None
+
+        # 3. Fan the latest row out to each ticker's `data` dict
+        for ticker in chunk:
+            latest = latest_rows.get(ticker)
+            if latest is None:
+                results[ticker] = {
+                    "data": {},
+                    "metadata": {"status": "error", "error_msg": chunk_error or f"No data found for {ticker}"}
+                }
+                continue
+            results[ticker] = {
+                "data": build_market_data(latest),
+                "metadata": {"status": "success"}
+            }
+
+    ok = sum(1 for r in results.values() if r["data"])
+    print(colored(f"Successfully fetched data for {ok}/{len(tickers)} tickers", "green"))
+    return results
@@ -1,32 +1,41 @@
-import os
-import requests
-import re
 import math
-from dotenv import load_dotenv
 from src.state import AgentState
+from src.utils.alpaca_client import get_client
+from src.utils.decisions import get_decision
+from src.utils.order_manager import OrderTicket, get_order_manager, stable_client_order_id
 from termcolor import colored
 
-load_dotenv()
-
-# Load Alpaca Keys
-ALPACA_KEY = os.getenv("ALPACA_API_KEY")
-ALPACA_SECRET = os.getenv("ALPACA_SECRET_KEY")
-BASE_URL = os.getenv("ALPACA_BASE_URL", "https://paper-api.alpaca.markets")
-
-HEADERS = {
-    "APCA-API-KEY-ID": ALPACA_KEY,
-    "APCA-API-SECRET-KEY": ALPACA_SECRET,
-    "Content-Type": "application/json"
-}
-
 # CONFIG: Position Sizing
 # How much money (in USD) do you want to allocate per trade?
 POSITION_SIZE_USD = 5000.0 
 
+def size_order(price: float) -> int:
+    """Qty = Target Amount / Current Price (Rounded down), at least 1 share."""
+    return max(1, math.floor(POSITION_SIZE_USD / price))
+
+def held_shares(portfolio: dict, ticker: str) -> float:
+    """Shares of `ticker` in a portfolio snapshot (0 if not held)."""
+    return next((float(p["qty"]) for p in portfolio.get("positions", []) if p["symbol"] == ticker), 0.0)
+
+def size_sell(price: float, held: float) -> int:
+    """A SELL is sized like a BUY but never past the whole shares we hold."""
+    return max(0, min(math.floor(held), size_order(price)))
+
+def new_ticket(state: AgentState, side: str, qty: int) -> OrderTicket:
+    """
+    The order for this state. In a checkpointed run the client_order_id is fixed by the run,
+    ticker and side, so a resumed run re-sending it gets the existing order back instead of a second one.
+    """
+    run_id = state.get("metadata", {}).get("run_id")
+    if not run_id:
+        return OrderTicket(state["ticker"], side, qty)
+    return OrderTicket(state["ticker"], side, qty, client_order_id=stable_client_order_id(run_id, state["ticker"], side))
+
 def execute_trade_node(state: AgentState) -> AgentState:
     """
     Node 5: Execution Agent
-    Calculates dynamic quantity based on price and sends order to Alpaca.
+    Calculates dynamic quantity based on price (or takes the optimizer's), sends the order
+    to Alpaca and waits for the fill.
     """
     print(colored("--- [Node 5] Execution Agent Activated ---", "cyan"))
 
@@ -35,8 +44,7 @@ def execute_trade_node(state: AgentState) -> AgentState:
         print(colored("❌ Trade NOT Approved. Skipping execution.", "yellow"))
         return {"execution_status": "Skipped (Risk Veto)"}
 
-    # 2. Parse the Decision using Regex
-    decision_text = state["portfolio_decision"].upper()
+    # 2. Read the PM's structured decision
     ticker = state["ticker"]
     
     # Ensure we have a valid price to calculate quantity
@@ -45,67 +53,64 @@ def execute_trade_node(state: AgentState) -> AgentState:
         print(colored("❌ Error: Invalid price data. Cannot calculate quantity.", "red"))
         return {"execution_status": "Failed (Invalid Price)"}
 
-    # Regex patterns to capture the specific action
-    buy_pattern = r"ACTION:\s*BUY"
-    sell_pattern = r"ACTION:\s*SELL"
-
-    side = None
-    if re.search(buy_pattern, decision_text):
-        side = "buy"
-    elif re.search(sell_pattern, decision_text):
-        side = "sell"
+    side = get_decision(state).side
     
     if not side:
         print(colored(f"⚠️ Decision is HOLD or unclear. No order sent.", "yellow"))
         return {"execution_status": "Skipped (Hold)"}
 
-    # 3. Dynamic Sizing Calculation
-    # Qty = Target Amount / Current Price (Rounded down)
-    qty = math.floor(POSITION_SIZE_USD / current_price)
-    
-    # Safety: Always buy at least 1 share if price > 0
-    if qty < 1:
-        qty = 1
-        
-    print(colored(f"💰 Sizing Calculation: ${POSITION_SIZE_USD} / ${current_price:.2f} = {qty} shares", "cyan"))
-
-    # 4. Construct the Order Payload
-    order_data = {
-        "symbol": ticker,
-        "qty": qty,
-        "side": side,
-        "type": "market",
-        "time_in_force": "day"
-    }
+    # 3. Sizing: the Portfolio Optimizer's basket quantity if there is one, else Target Amount / Price
+    if state.get("target_qty", 0) > 0:
+        qty = int(state["target_qty"])
+        print(colored(f"💰 Optimizer Sizing: {qty} shares", "cyan"))
+    elif state.get("metadata", {}).get("defer_execution"):
+        # Universe runs size all approved trades jointly once every ticker has been decided
+        return {"execution_status": "Pending (Optimizer)"}
+    else:
+        qty = size_order(current_price)
+        print(colored(f"💰 Sizing Calculation: ${POSITION_SIZE_USD} / ${current_price:.2f} = {qty} shares", "cyan"))
+        if side == "sell":
+            try:
+                held = held_shares(get_client().portfolio_snapshot(), ticker)
+            except Exception as e:
+                print(colored(f"❌ Error: Could not read holdings for the SELL: {e}", "red"))
+                return {"execution_status": f"Failed (Portfolio unavailable: {e})"}
+            qty = size_sell(current_price, held)
+            if qty <= 0:
+                print(colored(f"⚠️ No {ticker} shares held. No order sent.", "yellow"))
+                return {"execution_status": "Skipped (Nothing to sell)"}
+            print(colored(f"💰 Capped at shares held ({held:g}): {qty} shares", "cyan"))
 
+    # 4. Submit through the order manager and wait for the broker to confirm the fill
     print(colored(f"🚀 Sending Order to Alpaca: {side.upper()} {qty} {ticker}...", "cyan", attrs=['bold']))
+    ticket = get_order_manager().execute([new_ticket(state, side, qty)])[0]
+    return fill_update(ticket)
 
-    # 5. Send to Alpaca API
-    try:
-        # We append /v2/orders to the base URL
-        api_url = f"{BASE_URL}/v2/orders"
-        
-        response = requests.post(api_url, json=order_data, headers=HEADERS)
-        
-        if response.status_code == 200:
-            data = response.json()
-            print(colored(f"✅ ORDER EXECUTED! ID: {data['id']}", "green", attrs=['bold']))
-            status = f"Filled: {side} {qty} {ticker}"
-        else:
-            # Parse error message from Alpaca
-            try:
-                error_data = response.json()
-                error_msg = error_data.get('message', response.text)
-            except:
-                error_msg = response.text
-                
-            print(colored(f"❌ Order Failed: {error_msg}", "red"))
-            status = f"Failed: {error_msg}"
+def fill_update(ticket: OrderTicket) -> AgentState:
+    """State update for a tracked order: the status line plus the real fill for the trade journal."""
+    status = ticket.describe()
+    if ticket.filled_qty > 0:
+        print(colored(f"✅ ORDER {ticket.status.upper()}! ID: {ticket.order_id} | {status}", "green", attrs=['bold']))
+    elif ticket.is_final:
+        print(colored(f"❌ Order Failed: {ticket.error or ticket.status}", "red"))
+    else:
+        print(colored(f"⏳ {status}", "yellow"))
+    return {
+        "execution_status": status,
+        "metadata": {"fill": ticket.to_dict()}
+    }
 
-    except Exception as e:
-        print(colored(f"❌ API Connection Error: {str(e)}", "red"))
-        status = f"Error: {str(e)}"
+def execute_orders(states) -> dict:
+    """
+    Node 5 (Batch Mode): sends every optimizer-sized order at once and tracks the fills together.
+    Each state must already be approved and carry a target_qty. Returns {ticker: state update}.
+    """
+    tickets = {}
+    for state in states:
+        side = get_decision(state).side
+        if side and state.get("target_qty", 0) > 0:
+            tickets[state["ticker"]] = new_ticket(state, side, int(state["target_qty"]))
 
-    return {
-        "execution_status": status
-    }
\ No newline at end of file
+    print(colored(f"🚀 Sending basket of {len(tickets)} orders to Alpaca...", "cyan", attrs=['bold']))
+    get_order_manager().execute(list(tickets.values()))
+    return {ticker: fill_update(ticket) for ticker, ticket in tickets.items()}
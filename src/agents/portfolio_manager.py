@@ -1,15 +1,8 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage
 from src.state import AgentState
+from src.data.lesson_memory import recall_lessons
+from src.utils import llm_gateway
+from src.utils.decisions import PortfolioDecisionSchema, TradeDecision
 from termcolor import colored
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
-MODEL_NAME = "gemini-2.0-flash"
-
-llm = ChatGoogleGenerativeAI(model=MODEL_NAME, temperature=0, google_api_key=api_key)
 
 def portfolio_manager(state: AgentState) -> AgentState:
     """
@@ -22,7 +15,27 @@ def portfolio_manager(state: AgentState) -> AgentState:
     ticker = state.get('ticker')
     fund_analysis = state.get('fundamental_analysis', 'No Report')
     tech_analysis = state.get('technical_analysis', 'No Report')
+
+    # If the Risk Board sent us back, show the PM why
+    risk_feedback = ""
+    if state.get('revision_count', 0) > 0 and state.get('risk_analysis'):
+        risk_feedback = f"""
+    3. RISK BOARD FEEDBACK (your previous proposal was REJECTED, revise it):
+    {state['risk_analysis']}
+    """
     
+    # Lessons the Reflector learned from past trades (this ticker first, then its sector).
+    # Not in backtests: today's lessons would leak the future into replayed days.
+    lessons = ""
+    try:
+        recalled = [] if state.get('metadata', {}).get('backtest') else \
+            recall_lessons(ticker, query=f"{fund_analysis}\n{tech_analysis}")
+        if recalled:
+            lessons = "\n    LESSONS FROM PAST TRADES (apply them where relevant):\n" + \
+                "\n".join(f"    {lesson.render()}" for lesson in recalled) + "\n"
+    except Exception as e:
+        print(colored(f"⚠️ Lesson memory unavailable: {e}", "yellow"))
+
     # The Prompt: Synthesize everything
     msg = f"""
     You are the Head Portfolio Manager. 
@@ -33,22 +46,21 @@ def portfolio_manager(state: AgentState) -> AgentState:
 
     2. TECHNICAL REPORT:
     {tech_analysis}
-
+    {risk_feedback}{lessons}
     DECISION TASK:
     - Synthesize the conflicting signals.
-    - Output a final decision: "ACTION: [BUY/SELL/HOLD]" 
-    - Output a conviction score: "CONFIDENCE: [0-100]%"
-    - Provide a 1-sentence reasoning.
+    - Answer as JSON: {{"action": "BUY|SELL|HOLD", "confidence": 0-100, "reason": "<1 sentence>"}}
     """
     
     try:
-        response = llm.invoke([HumanMessage(content=msg)])
-        decision = response.content
+        answer = llm_gateway.invoke_structured("portfolio_manager", msg, PortfolioDecisionSchema)
+        decision = TradeDecision.from_schema(ticker, answer)
     except Exception as e:
-        # Fallback if API fails
-        print(colored(f"⚠️ PM Rate Limit. Simulating decision.", "yellow"))
-        decision = f"ACTION: HOLD (Simulated)\nCONFIDENCE: 50%\nReason: API Limit reached, staying neutral."
+        # Fallback only once the gateway has exhausted its retries: never trade on a missing decision
+        print(colored(f"⚠️ PM unavailable after retries ({e}). Holding.", "yellow"))
+        decision = TradeDecision.hold(ticker, f"LLM Unavailable: {e}")
 
     return {
-        "portfolio_decision": decision
+        "decision": decision,
+        "portfolio_decision": decision.text()
     }
\ No newline at end of file
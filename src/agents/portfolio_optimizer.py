@@ -0,0 +1,186 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+from src.agents.execution import POSITION_SIZE_USD, size_sell
+from src.agents.risk_manager import get_alpaca_portfolio
+from src.data.ohlcv_cache import load_bars
+from src.utils.decisions import get_decision
+from src.utils.optimizer import ledoit_wolf, risk_parity, mean_variance
+from src.utils.risk_engine import MAX_CONCENTRATION, evaluate_trades
+from termcolor import colored
+
+# CONFIG: Solver ("risk_parity" or "mean_variance")
+OPTIMIZER_METHOD = os.getenv("OPTIMIZER_METHOD", "risk_parity")
+OPTIMIZER_STATE_PATH = "optimizer_state.json"   # last weights, used to warm-start the next run
+
+# CONFIG: Covariance inputs (daily returns from the OHLCV cache)
+RETURN_WINDOW = 126       # ~6 months of trading days
+MIN_OBSERVATIONS = 20     # fewer returns than this -> treated as uncorrelated, at the median variance
+
+# CONFIG: Basket budget. One run spends at most this share of cash, and never more than
+# the old fixed sizing would have (POSITION_SIZE_USD per buy); the optimizer only re-splits it.
+MAX_CASH_DEPLOY = 0.5
+
+# CONFIG: Mean-variance inputs
+RISK_AVERSION = 5.0
+ALPHA_PER_CONFIDENCE = 0.001   # expected daily return of a BUY at 100% PM confidence
+
+
+def load_returns(tickers, window: int = RETURN_WINDOW):
+    """
+    Daily close-to-close returns for `tickers` from the OHLCV cache (no network).
+    Returns (T x N matrix with gaps as 0, per-ticker observation counts).
+    """
+    start = datetime.now(timezone.utc) - timedelta(days=int(window * 1.6) + 10)
+    closes = {}
+    for ticker in tickers:
+        try:
+            closes[ticker] = load_bars(ticker, "1d", start=start)["Close"]
+        except Exception as e:
+            print(colored(f"⚠️ No cached history for {ticker}: {e}", "yellow"))
+            closes[ticker] = pd.Series(dtype=float)
+
+    frame = pd.concat(closes, axis=1).reindex(columns=list(tickers)).sort_index()
+    returns = frame.pct_change(fill_method=None).iloc[1:].tail(window)
+    counts = returns.notna().sum().to_numpy()
+    return returns.fillna(0.0).to_numpy(), counts
+
+
+def estimate_covariance(tickers, window: int = RETURN_WINDOW):
+    """Ledoit-Wolf covariance of daily returns; names without enough history get a neutral row."""
+    n = len(tickers)
+    returns, counts = load_returns(tickers, window)
+    valid = counts >= MIN_OBSERVATIONS
+
+    cov = np.zeros((n, n))
+    shrinkage = 1.0
+    if valid.sum() >= 2:
+        sub, shrinkage = ledoit_wolf(returns[:, valid])
+        cov[np.ix_(valid, valid)] = sub
+        fallback = float(np.median(np.diag(sub)))
+    elif valid.sum() == 1:
+        fallback = float(returns[:, valid].var())
+        cov[np.ix_(valid, valid)] = fallback
+    else:
+        fallback = 0.0
+    # ~2% daily vol if nothing at all is cached
+    fallback = fallback if fallback > 0 else 4e-4
+    cov[~valid, ~valid] = fallback
+    return cov, shrinkage, valid
+
+
+def load_warm_start(tickers, method: str, path: str = OPTIMIZER_STATE_PATH):
+    """Previous run's weights for these tickers (None if there are none to reuse)."""
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if saved.get("method") != method:
+        return None
+    previous = saved.get("weights", {})
+    w0 = np.array([previous.get(t, 0.0) for t in tickers], dtype=float)
+    return w0 if w0.sum() > 0 else None
+
+
+def save_warm_start(tickers, weights, method: str, path: str = OPTIMIZER_STATE_PATH):
+    try:
+        with open(path, "w") as f:
+            json.dump({
+                "method": method,
+                "updated": time.time(),
+                "weights": {t: float(w) for t, w in zip(tickers, weights)},
+            }, f)
+    except OSError as e:
+        print(colored(f"⚠️ Could not save optimizer state: {e}", "yellow"))
+
+
+def solve_weights(tickers, cov, caps, method: str, expected=None):
+    """Runs the chosen solver, warm-started from the last run. Returns (weights, iterations)."""
+    w0 = load_warm_start(tickers, method)
+    if method == "mean_variance":
+        weights, iterations = mean_variance(cov, expected, caps, RISK_AVERSION, w0=w0)
+    else:
+        weights, iterations = risk_parity(cov, caps, w0=w0)
+    save_warm_start(tickers, weights, method)
+    return weights, iterations
+
+
+def optimize_basket(states, method: str = None, portfolio=None) -> dict:
+    """
+    Stage 6: Portfolio Optimizer
+    Sizes every approved trade of a universe run jointly, after all tickers have been decided.
+    BUYs share one cash budget split by the solver under the risk engine's concentration cap;
+    SELLs are capped at the shares we hold. Returns {ticker: {"target_qty", "metadata"}}.
+    """
+    method = method or OPTIMIZER_METHOD
+    print(colored(f"--- [Stage 6] Portfolio Optimizer ({method}): {len(states)} approved trades ---", "blue"))
+    start = time.perf_counter()
+    portfolio = portfolio if portfolio is not None else get_alpaca_portfolio()
+
+    held = {p["symbol"]: p for p in portfolio.get("positions", [])}
+    results = {}
+    buys, sells = [], []
+    for state in states:
+        side = get_decision(state).side
+        price = state.get("data", {}).get("price", 0.0)
+        if side and price and price > 0:
+            (buys if side == "buy" else sells).append(state)
+        else:
+            results[state["ticker"]] = {"target_qty": 0}
+
+    # 1. SELLs: never more than we hold
+    for state in sells:
+        ticker = state["ticker"]
+        results[ticker] = {"target_qty": size_sell(state["data"]["price"], float(held.get(ticker, {}).get("qty", 0)))}
+
+    # 2. BUYs: one budget, split by the solver
+    if buys:
+        tickers = [s["ticker"] for s in buys]
+        prices = np.array([s["data"]["price"] for s in buys], dtype=float)
+        cash = float(portfolio.get("cash", 0.0))
+        equity = float(portfolio.get("equity", 0.0)) or cash
+        budget = min(cash * MAX_CASH_DEPLOY, POSITION_SIZE_USD * len(buys))
+
+        # Concentration cap from the risk engine, net of what we already hold, as a share of the budget
+        existing = np.array([float(held.get(t, {}).get("market_value", 0.0)) for t in tickers])
+        caps = np.clip((MAX_CONCENTRATION * equity - existing) / budget, 0.0, 1.0) if budget > 0 else np.zeros(len(buys))
+
+        cov, shrinkage, valid = estimate_covariance(tickers)
+        expected = np.array([get_decision(s).confidence * ALPHA_PER_CONFIDENCE for s in buys])
+        weights, iterations = solve_weights(tickers, cov, caps, method, expected)
+        qty = np.floor(weights * budget / prices).astype(int)
+
+        for i, ticker in enumerate(tickers):
+            results[ticker] = {"target_qty": int(qty[i]), "target_weight": float(weights[i])}
+        print(colored(f"📐 Budget ${budget:,.2f} over {len(buys)} BUYs | shrinkage {shrinkage:.2f} | "
+                      f"{int((~valid).sum())} without history | {iterations} solver iterations", "blue"))
+
+    # 3. Re-check the final basket with the deterministic risk engine (BUYs draw cash cumulatively)
+    by_ticker = {s["ticker"]: s for s in states}
+    sized = [t for t, r in results.items() if r["target_qty"] > 0]
+    proposals = [{
+        "ticker": t,
+        "side": get_decision(by_ticker[t]).side,
+        "qty": results[t]["target_qty"],
+        "price": by_ticker[t]["data"]["price"],
+        "rsi": by_ticker[t]["data"].get("rsi", 50.0),
+    } for t in sized]
+    for check in evaluate_trades(proposals, portfolio):
+        if check.violations:
+            print(colored(f"⚠️ Optimizer basket breaches risk limits for {check.ticker}: {'; '.join(check.violations)}", "yellow"))
+            results[check.ticker]["target_qty"] = 0
+
+    # 4. Shape as state updates
+    for ticker, result in results.items():
+        metadata = dict(by_ticker[ticker].get("metadata", {}))
+        metadata["optimizer"] = {"method": method, "weight": result.pop("target_weight", None)}
+        result["metadata"] = metadata
+
+    total = sum(r["target_qty"] * by_ticker[t]["data"].get("price", 0.0) for t, r in results.items())
+    print(colored(f"✅ Basket: {sum(1 for r in results.values() if r['target_qty'] > 0)} orders, "
+                  f"${total:,.2f} notional, solved in {time.perf_counter() - start:.3f}s", "blue"))
+    return results
@@ -0,0 +1,86 @@
+import numpy as np
+from src.state import AgentState
+from src.utils.decisions import TradeDecision
+from termcolor import colored
+
+# CONFIG: What counts as "plainly neutral". A ticker is only skipped if EVERY rule says quiet.
+PRESCREEN_THRESHOLDS = {
+    "rsi_low": 45.0,              # RSI inside [rsi_low, rsi_high] is neutral
+    "rsi_high": 55.0,
+    "macd_gap_pct": 0.002,        # |MACD - signal| under 0.2% of price is "close to the signal line"
+    "sma_gap_pct": 0.01,          # |SMA20 - SMA50| under 1% of price is "no meaningful cross"
+}
+
+# LLM calls the full chain spends on a ticker that ends in HOLD:
+# fundamental + technical + portfolio manager (the risk board skips HOLDs)
+LLM_CALLS_PER_TICKER = 3
+
+SKIPPED_REASON = "Indicators are neutral; no LLM review needed."
+
+
+def score_universe(states, thresholds=None) -> dict:
+    """
+    Vectorized neutrality check over the whole universe's `data` dicts.
+    Returns {"tickers", "score", "candidate"} arrays; score counts how many rules fired (0 = neutral).
+    """
+    t = dict(PRESCREEN_THRESHOLDS)
+    if thresholds:
+        t.update(thresholds)
+
+    tickers = [s['ticker'] for s in states]
+    fields = ["price", "rsi", "macd", "signal", "sma_20", "sma_50"]
+    m = np.array([[float(s['data'].get(f, 0.0)) for f in fields] for s in states], dtype=float).reshape(-1, len(fields))
+    price, rsi, macd, signal, sma_20, sma_50 = m.T
+    price = np.where(price > 0, price, np.nan)
+
+    # Each rule is a boolean vector over tickers
+    rsi_active = (rsi < t["rsi_low"]) | (rsi > t["rsi_high"])
+    macd_active = np.abs(macd - signal) / price > t["macd_gap_pct"]
+    trend_active = np.abs(sma_20 - sma_50) / price > t["sma_gap_pct"]
+
+    score = rsi_active.astype(int) + macd_active.astype(int) + trend_active.astype(int)
+    # Missing/zero price means we can't judge: send it on rather than auto-HOLD
+    candidate = (score > 0) | np.isnan(price)
+
+    return {"tickers": tickers, "score": score, "candidate": candidate}
+
+
+def prescreen_universe(states, thresholds=None):
+    """
+    Pre-Screen between data collection and the analysts.
+    Returns (candidates, skipped): candidates go on to the LLM agents; skipped states
+    are updated in place with an automatic HOLD.
+    """
+    states = [s for s in states if s.get('data')]
+    if not states:
+        return [], []
+
+    scored = score_universe(states, thresholds)
+    candidates, skipped = [], []
+    for state, is_candidate in zip(states, scored["candidate"]):
+        if is_candidate:
+            candidates.append(state)
+        else:
+            state.update(auto_hold(state))
+            skipped.append(state)
+
+    saved = len(skipped) * LLM_CALLS_PER_TICKER
+    print(colored(f"🔎 Pre-Screen: {len(candidates)}/{len(states)} tickers sent to the LLM agents, "
+                  f"{len(skipped)} auto-HOLD (~{saved} LLM calls saved)", "cyan"))
+    return candidates, skipped
+
+
+def auto_hold(state: AgentState) -> AgentState:
+    """The state a skipped ticker ends with: a HOLD that never touched an LLM."""
+    decision = TradeDecision.hold(state["ticker"], SKIPPED_REASON, source="prescreen", confidence=1.0)
+    return {
+        "fundamental_analysis": "Skipped (Pre-Screen)",
+        "technical_analysis": "Skipped (Pre-Screen)",
+        "decision": decision,
+        "portfolio_decision": decision.text(),
+        "risk_score": 0,
+        "risk_analysis": "No trade proposed. Risk checks skipped.",
+        "trade_approved": True,
+        "execution_status": "Skipped (Hold)",
+        "metadata": {**state.get("metadata", {}), "prescreen": "skipped"},
+    }
@@ -1,98 +1,146 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import numpy as np
 from src.state import AgentState
-from src.data.storage import log_trade
+from src.utils import llm_gateway, telemetry
+from src.utils.decisions import ReflectionBatchSchema
+from src.data.storage import get_unreviewed_trades, mark_reviewed, save_lesson
+from src.data.lesson_memory import sector_of
 from termcolor import colored
-import sqlite3
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0, google_api_key=api_key)
+# CONFIG: Trades reviewed per Reflector prompt, and prompts in flight at once
+REFLECT_BATCH_SIZE = 25
+REFLECT_BATCH_WORKERS = 4
 
-DB_PATH = "portfolio.db"
+# CONFIG: Trades younger than this stay unreviewed (a fresh fill has no outcome to learn from yet)
+REVIEW_MIN_AGE_HOURS = 1.0
 
-def get_last_trade():
-    """Fetches the most recent trade from the DB."""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM trades ORDER BY id DESC LIMIT 1')
-        trade = cursor.fetchone()
-        conn.close()
-        return trade
-    except Exception:
-        return None
-
-def save_lesson(ticker, lesson):
-    """Saves a learned lesson to the DB."""
+
+def latest_prices(tickers, known=None) -> dict:
+    """Current prices for `tickers`: the run's own prices first, the OHLCV cache for the rest."""
+    prices = {t: p for t, p in (known or {}).items() if p}
+    missing = set(tickers) - prices.keys()
+    if not missing:
+        return prices
+    # Imported here: pandas is only needed when a price has to come from the cache
+    from src.data.ohlcv_cache import load_bars
+
+    start = datetime.now(timezone.utc) - timedelta(days=10)
+    for ticker in missing:
+        try:
+            bars = load_bars(ticker, "1d", start=start)
+            if not bars.empty:
+                prices[ticker] = float(bars["Close"].iloc[-1])
+        except Exception as e:
+            print(colored(f"⚠️ No current price for {ticker}: {e}", "yellow"))
+    return prices
+
+
+def compute_pnl(trades, prices: dict):
+    """
+    Unrealized PnL of every trade in one vectorized step.
+    Returns (trades with a price, pnl in $, pnl in %). A SELL profits when the price falls.
+    """
+    trades = [t for t in trades if prices.get(t[2]) and t[5]]
+    if not trades:
+        return [], np.array([]), np.array([])
+    side = np.array([1.0 if str(t[3]).lower() == "buy" else -1.0 for t in trades])
+    qty = np.array([t[4] or 0.0 for t in trades], dtype=float)
+    entry = np.array([t[5] for t in trades], dtype=float)
+    current = np.array([prices[t[2]] for t in trades], dtype=float)
+    pnl = side * (current - entry) * qty
+    pnl_pct = side * (current / entry - 1.0) * 100
+    return trades, pnl, pnl_pct
+
+
+def _run_reflection_batch(batch):
+    """One prompt for a batch of (trade row, current price, pnl %). Returns {trade id: lesson}."""
+    lines = [
+        json.dumps({
+            "trade_id": t[0], "ticker": t[2], "action": str(t[3]).upper(),
+            "entry_price": round(t[5], 2), "current_price": round(price, 2),
+            "result": f"{'PROFIT' if pct > 0 else 'LOSS'} ({pct:.2f}%)", "reasoning": t[6],
+        })
+        for t, price, pct in batch
+    ]
+    msg = f"""
+    You are a Trading Coach reviewing {len(batch)} trades.
+    Each line is one trade with the reasoning we had and how it has played out:
+    {chr(10).join(lines)}
+
+    Task:
+    For EVERY trade, write a ONE-sentence "Trading Rule" to remember for next time.
+    If we won, reinforce the good habit. If we lost, correct the mistake.
+    Answer as JSON: {{"lessons": [{{"trade_id": <id>, "lesson": "<1 sentence>"}}, ...]}}
+    """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('INSERT INTO lessons (timestamp, ticker, lesson_text) VALUES (datetime("now"), ?, ?)', (ticker, lesson))
-        conn.commit()
-        conn.close()
-        print(colored(f"🧠 New Lesson Learned: {lesson}", "magenta", attrs=['bold']))
+        answer = llm_gateway.invoke_structured("reflector", msg, ReflectionBatchSchema)
     except Exception as e:
-        print(colored(f"Error saving lesson: {e}", "red"))
+        print(colored(f"Reflector batch failed ({len(batch)} trades stay unreviewed): {e}", "red"))
+        return {}
+    return {item.trade_id: item.lesson.replace("LESSON:", "").strip() for item in answer.lessons}
 
-def reflector_node(state: AgentState) -> AgentState:
+
+def _old_enough(trade, cutoff):
+    try:
+        return datetime.fromisoformat(trade[1]) <= cutoff
+    except (TypeError, ValueError):
+        return True
+
+
+def reflect_trades(prices: dict = None, tickers=None, batch_size: int = REFLECT_BATCH_SIZE,
+                   min_age_hours: float = REVIEW_MIN_AGE_HOURS) -> int:
     """
-    Node 6: Reflector Agent
-    Reviews the last trade and extracts a strategic lesson.
+    Node 6 (Batch Mode): Reflector for every unreviewed trade.
+    One query loads them, PnL is computed for all at once, and the LLM sees `batch_size`
+    trades per prompt. Reviewed trades get their pnl written. Returns how many were reviewed.
     """
-    print(colored("--- [Node 6] Reflector Agent Analyzing Past ---", "magenta"))
-    
-    # 1. Get the last trade we made
-    last_trade = get_last_trade()
-    if not last_trade:
-        print(colored("No past trades to reflect on yet.", "yellow"))
-        return {"revision_count": 0}
+    # Trade timestamps are local time (datetime.now().isoformat())
+    cutoff = datetime.now() - timedelta(hours=min_age_hours)
+    trades = [t for t in get_unreviewed_trades(tickers) if _old_enough(t, cutoff)]
+    if not trades:
+        print(colored("No unreviewed trades to reflect on.", "yellow"))
+        return 0
 
-    # Unpack tuple (id, time, ticker, action, qty, price, pnl, reason)
-    # Note: Schema matches what we defined in storage.py
-    # id=0, time=1, ticker=2, action=3, qty=4, buy_price=5, pnl=6, reason=7
-    past_ticker = last_trade[2]
-    buy_price = last_trade[5]
-    reasoning = last_trade[7]
-    
-    # 2. Check Current Price (Hypothetical PnL Check)
-    # In a real app, we'd check if we sold it. Here we check "Unrealized PnL".
-    current_price = state['data']['price']
-    
-    # Only reflect if we are looking at the same stock we bought
-    if past_ticker != state['ticker']:
-        print(colored(f"Skipping reflection (Last trade was {past_ticker}, currently analyzing {state['ticker']})", "yellow"))
-        return {"revision_count": 0}
+    current = latest_prices({t[2] for t in trades}, prices)
+    priced, pnl, pnl_pct = compute_pnl(trades, current)
+    items = list(zip(priced, pnl_pct.tolist()))
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    print(colored(f"--- [Node 6] Batched Reflector: {len(priced)}/{len(trades)} priced trades "
+                  f"in {len(batches)} prompts ---", "magenta"))
 
-    # Calculate simple PnL
-    pnl_percent = ((current_price - buy_price) / buy_price) * 100
-    
-    outcome = "PROFIT" if pnl_percent > 0 else "LOSS"
-    
-    print(colored(f"🧐 Reviewing Trade: Bought {past_ticker} at ${buy_price:.2f}. Current: ${current_price:.2f} ({pnl_percent:.2f}%)", "cyan"))
+    lessons = {}
+    with ThreadPoolExecutor(max_workers=REFLECT_BATCH_WORKERS) as pool:
+        batch_inputs = [[(t, current[t[2]], pct) for t, pct in batch] for batch in batches]
+        for result in pool.map(telemetry.bind(_run_reflection_batch), batch_inputs):
+            lessons.update(result)
 
-    # 3. Generate Lesson using LLM
-    msg = f"""
-    You are a Trading Coach.
-    We bought {past_ticker} at ${buy_price:.2f} based on this reasoning:
-    "{reasoning}"
-    
-    Current Result: {outcome} ({pnl_percent:.2f}%)
-    
-    Task:
-    Write a ONE-sentence "Trading Rule" to remember for next time.
-    If we won, reinforce the good habit.
-    If we lost, correct the mistake.
-    Start with "LESSON: ..."
+    # Only trades the model answered for count as reviewed; the rest are retried next run
+    reviewed = []
+    for trade, value in zip(priced, pnl.tolist()):
+        lesson = lessons.get(trade[0])
+        if lesson:
+            save_lesson(trade[2], lesson, sector_of(trade[2]))
+            reviewed.append((trade[0], value))
+    mark_reviewed(reviewed)
+    print(colored(f"🧐 Reviewed {len(reviewed)} trades, total unrealized PnL ${pnl.sum():,.2f}", "cyan"))
+    return len(reviewed)
+
+
+def reflector_node(state: AgentState) -> AgentState:
     """
+    Node 6: Reflector Agent
+    Reviews this ticker's unreviewed trades and extracts strategic lessons.
+    Universe runs set metadata.batch_reflection and review every ticker once at the end instead.
+    """
+    if state.get('metadata', {}).get('batch_reflection'):
+        return {"revision_count": 0}
+    print(colored("--- [Node 6] Reflector Agent Analyzing Past ---", "magenta"))
 
     try:
-        response = llm.invoke([HumanMessage(content=msg)])
-        lesson = response.content.replace("LESSON:", "").strip()
-        save_lesson(past_ticker, lesson)
+        reflect_trades({state['ticker']: state.get('data', {}).get('price')}, tickers=[state['ticker']])
     except Exception as e:
         print(colored(f"Reflector Failed: {e}", "red"))
 
-    return {"revision_count": 0}
\ No newline at end of file
+    return {"revision_count": 0}
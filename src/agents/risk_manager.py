@@ -1,110 +1,173 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage
+import os
 from src.state import AgentState
+from src.data.lesson_memory import sector_of
+from src.utils import llm_gateway
+from src.utils.alpaca_client import get_client
+from src.utils.decisions import RiskVerdictSchema, get_decision
+from src.utils.portfolio_context import portfolio_context
+from src.utils.risk_engine import evaluate_trades
+from src.agents.execution import held_shares, size_order, size_sell
 from termcolor import colored
-import os
-import requests
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Setup Alpaca & Gemini
-ALPACA_KEY = os.getenv("ALPACA_API_KEY")
-ALPACA_SECRET = os.getenv("ALPACA_SECRET_KEY")
-BASE_URL = os.getenv("ALPACA_BASE_URL", "https://paper-api.alpaca.markets")
-HEADERS = {
-    "APCA-API-KEY-ID": ALPACA_KEY,
-    "APCA-API-SECRET-KEY": ALPACA_SECRET,
-    "Content-Type": "application/json"
-}
 
-api_key = os.getenv("GOOGLE_API_KEY")
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0, google_api_key=api_key)
+# Alpaca goes through the shared pooled client (src/utils/alpaca_client.py),
+# Gemini through src/utils/llm_gateway.py
+
+# CONFIG: Portfolio in the Risk Board prompt. "compact" = one summary per snapshot (exposure, top
+# weights, sectors, this ticker's weight) within CONTEXT_TOKEN_BUDGET of src/utils/portfolio_context.py;
+# "full" = cash plus the raw list of every position.
+RISK_PORTFOLIO_CONTEXT = os.getenv("RISK_PORTFOLIO_CONTEXT", "compact")
 
 def get_alpaca_portfolio():
-    """Fetches REAL account data from Alpaca."""
+    """Fetches REAL account data from Alpaca (shared short-TTL snapshot)."""
     try:
-        # 1. Get Account Info (Cash, Buying Power)
-        acct_response = requests.get(f"{BASE_URL}/v2/account", headers=HEADERS)
-        acct_data = acct_response.json()
-        
-        # 2. Get Open Positions (What stocks we own)
-        pos_response = requests.get(f"{BASE_URL}/v2/positions", headers=HEADERS)
-        pos_data = pos_response.json()
-        
-        # Format for the LLM
-        portfolio = {
-            "buying_power": float(acct_data.get('buying_power', 0)),
-            "cash": float(acct_data.get('cash', 0)),
-            "equity": float(acct_data.get('equity', 0)),
-            "positions": [
-                {
-                    "symbol": p['symbol'],
-                    "qty": int(p['qty']),
-                    "market_value": float(p['market_value']),
-                    "profit_loss_pct": float(p['unrealized_plpc']) * 100
-                }
-                for p in pos_data
-            ]
-        }
-        return portfolio
+        return get_client().portfolio_snapshot()
     except Exception as e:
         print(colored(f"⚠️ Failed to fetch Alpaca Portfolio: {e}", "yellow"))
         return {"error": str(e), "positions": []}
 
-def risk_management_node(state: AgentState) -> AgentState:
-    """
-    Node 4: Risk Veto Board
-    Reviews the trade against the REAL portfolio.
-    """
-    ticker = state['ticker']
-    decision = state['portfolio_decision']
-    
-    print(colored(f"--- [Node 4] Risk Veto Board Reviewing: {ticker} ---", "red"))
+def portfolio_lines(ticker: str, portfolio, mode: str = None) -> str:
+    """The REAL-TIME PORTFOLIO STATS block of the risk prompt."""
+    if (mode or RISK_PORTFOLIO_CONTEXT) == "full":
+        return f"- Cash Available: ${portfolio.get('cash', 0):.2f}\n- Existing Holdings: {portfolio.get('positions')}"
+    return portfolio_context(portfolio, sector_of=sector_of).for_ticker(ticker)
 
-    # Skip checks if holding
-    if "HOLD" in decision.upper():
-        return {
-            "risk_score": 0,
-            "risk_analysis": "No trade proposed. Risk checks skipped.",
-            "trade_approved": True 
-        }
-
-    # --- REAL DATA FETCH ---
-    current_portfolio = get_alpaca_portfolio()
-    
-    msg = f"""
+def risk_prompt(state: AgentState, engine_result, portfolio, mode: str = None) -> str:
+    """The Chief Risk Officer prompt for one borderline proposal."""
+    ticker = state['ticker']
+    stats = portfolio_lines(ticker, portfolio, mode).replace("\n", "\n    ")
+    return f"""
     You are the Chief Risk Officer.
     
-    PROPOSAL: {decision}
+    PROPOSAL: {state['portfolio_decision']}
     ASSET: {ticker}
     CURRENT PRICE: ${state['data']['price']:.2f}
     
     REAL-TIME PORTFOLIO STATS:
-    - Cash Available: ${current_portfolio.get('cash', 0):.2f}
-    - Existing Holdings: {current_portfolio.get('positions')}
+    {stats}
+    
+    DETERMINISTIC RISK ENGINE (borderline, needs your judgement):
+    {engine_result.summary()}
     
     RISK CHECKS:
     1. Liquidity Check: Do we have enough cash?
     2. Concentration Check: Do we already hold this asset? (If yes, is exposure > 20%?)
     3. Market Check: Is RSI ({state['data']['rsi']:.2f}) extreme?
     
-    OUTPUT FORMAT:
-    Risk Score: [0-100]
-    Verdict: [APPROVED/REJECTED]
-    Reason: [Explanation based on portfolio data]
+    OUTPUT FORMAT (JSON):
+    {{"risk_score": 0-100, "verdict": "APPROVED|REJECTED", "reason": "<explanation based on portfolio data>"}}
     """
 
+def _llm_review(state: AgentState, engine_result, portfolio) -> tuple:
+    """Borderline cases only: ask the LLM Risk Board, showing it the deterministic findings."""
     try:
-        response = llm.invoke([HumanMessage(content=msg)])
-        analysis = response.content
-        approved = "APPROVED" in analysis.upper()
+        answer = llm_gateway.invoke_structured("risk_manager", risk_prompt(state, engine_result, portfolio), RiskVerdictSchema)
+        analysis = f"Risk Score: {answer.risk_score}\nVerdict: {answer.verdict}\nReason: {answer.reason}"
+        approved = answer.verdict == "APPROVED"
     except Exception as e:
         print(colored(f"Risk Logic Failed: {e}", "red"))
         analysis = "Error in Risk Node. Defaulting to REJECT."
         approved = False
+    return analysis, approved
 
+def build_proposal(state: AgentState):
+    """Turns a PM decision into a risk-engine proposal, or None for HOLD / unclear."""
+    side = get_decision(state).side
+    price = state.get('data', {}).get('price', 0.0)
+    if not side or not price or price <= 0:
+        return None
     return {
+        "ticker": state['ticker'],
+        "side": side,
+        "qty": size_order(price),
+        "price": price,
+        "rsi": state['data'].get('rsi', 50.0),
+    }
+
+def cap_sell(proposal: dict, portfolio) -> dict:
+    """SELLs are sized to at most the shares held; with none held the engine vetoes the short."""
+    if proposal["side"] == "sell":
+        held = held_shares(portfolio, proposal["ticker"])
+        if held > 0:
+            proposal["qty"] = size_sell(proposal["price"], held)
+    return proposal
+
+def _finish(state: AgentState, engine_result, portfolio) -> AgentState:
+    if engine_result.borderline:
+        print(colored(f"⚖️ {state['ticker']} is borderline (score {engine_result.risk_score}), asking the LLM board", "yellow"))
+        analysis, approved = _llm_review(state, engine_result, portfolio)
+    else:
+        analysis, approved = engine_result.summary(), engine_result.trade_approved
+
+    result = {
+        "risk_score": engine_result.risk_score,
         "risk_analysis": analysis,
         "trade_approved": approved
-    }
\ No newline at end of file
+    }
+    # Count rejections so the graph can bound the PM revision loop
+    if not approved:
+        result["revision_count"] = state.get('revision_count', 0) + 1
+    return result
+
+def portfolio_unavailable(state: AgentState, error: str) -> AgentState:
+    """No portfolio, no review: reject, and say why (checkpointed runs retry this on resume)."""
+    print(colored(f"❌ Risk review for {state['ticker']} impossible without the portfolio: {error}", "red"))
+    return {
+        "risk_score": 100,
+        "risk_analysis": f"Error: portfolio unavailable ({error}). Defaulting to REJECT.",
+        "trade_approved": False,
+        "revision_count": state.get('revision_count', 0) + 1
+    }
+
+NO_TRADE = {
+    "risk_score": 0,
+    "risk_analysis": "No trade proposed. Risk checks skipped.",
+    "trade_approved": True
+}
+
+def risk_management_node(state: AgentState) -> AgentState:
+    """
+    Node 4: Risk Veto Board
+    Reviews the trade against the REAL portfolio.
+    The deterministic risk engine decides clear cases; only borderline ones reach the LLM.
+    """
+    ticker = state['ticker']
+    print(colored(f"--- [Node 4] Risk Veto Board Reviewing: {ticker} ---", "red"))
+
+    # Skip checks if holding
+    proposal = build_proposal(state)
+    if proposal is None:
+        return dict(NO_TRADE)
+
+    # --- REAL DATA FETCH ---
+    current_portfolio = get_alpaca_portfolio()
+    if current_portfolio.get("error"):
+        return portfolio_unavailable(state, current_portfolio["error"])
+
+    engine_result = evaluate_trades([cap_sell(proposal, current_portfolio)], current_portfolio)[0]
+    return _finish(state, engine_result, current_portfolio)
+
+def risk_review_batch(states) -> dict:
+    """
+    Node 4 (Batch Mode): Risk Veto Board for many tickers against ONE portfolio snapshot.
+    Proposals are checked together (buys share the cash), in the order given.
+    Returns {ticker: risk node result}.
+    """
+    portfolio = get_alpaca_portfolio()
+    if portfolio.get("error"):
+        return {state['ticker']: portfolio_unavailable(state, portfolio["error"]) for state in states}
+    proposals, owners = [], []
+    results = {}
+    for state in states:
+        proposal = build_proposal(state)
+        if proposal is None:
+            results[state['ticker']] = dict(NO_TRADE)
+        else:
+            proposals.append(cap_sell(proposal, portfolio))
+            owners.append(state)
+
+    for state, engine_result in zip(owners, evaluate_trades(proposals, portfolio)):
+        results[state['ticker']] = _finish(state, engine_result, portfolio)
+
+    approved = sum(1 for r in results.values() if r["trade_approved"] and r["risk_score"] > 0)
+    print(colored(f"🛡️ Batch Risk Review: {len(proposals)} proposals, {approved} approved", "red"))
+    return results
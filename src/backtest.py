@@ -0,0 +1,285 @@
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from src.agents.data_collector import build_market_data
+from src.agents.analysts import fundamental_analyst, technical_analyst
+from src.agents.portfolio_manager import portfolio_manager
+from src.agents.prescreen import auto_hold, score_universe
+from src.agents.execution import size_order, size_sell
+from src.data import ohlcv_cache
+from src.pipeline import new_state
+from src.utils.decisions import TradeDecision, get_decision
+from src.utils.indicators import IncrementalIndicators
+from src.utils.llm_cache import ROLE_TTL_SECONDS, SQLiteCache, set_response_cache
+from src.utils.mock_broker import MockBroker
+from src.utils.order_manager import OrderManager, OrderTicket
+from src.utils.risk_engine import evaluate_trades
+from termcolor import colored
+
+# Event-driven historical replay of the pipeline over the OHLCV cache:
+#   phase 1 (one process per ticker): bars -> incremental indicators -> pre-screen -> analysts -> PM
+#   phase 2 (one process, day by day): risk engine -> OrderManager -> MockBroker -> equity curve
+# A decision made on day t's close can only trade on day t+1: it fills at the next day's open.
+
+# CONFIG: Account and costs
+BACKTEST_START_CASH = 100_000.0
+SLIPPAGE_BPS = 5.0
+
+# CONFIG: Decisions. "offline" = deterministic indicator policy (no LLM at all);
+# "replay" = the real analyst + PM nodes, answered from a cache that never expires
+# (misses go to the live model once and are recorded for the next replay).
+BACKTEST_LLM_MODE = os.getenv("BACKTEST_LLM", "offline")
+BACKTEST_LLM_CACHE_PATH = "backtest_llm_cache.db"
+
+# CONFIG: Parallelism and warm-up
+BACKTEST_PROCESSES = os.cpu_count() or 1
+WARMUP_BARS = 50            # SMA_50 needs this many bars before the first decision
+TRADING_DAYS = 252
+
+ACTION_CODES = {"SELL": -1, "HOLD": 0, "BUY": 1}
+
+
+def indicator_decision(ticker: str, data: dict) -> TradeDecision:
+    """Offline stand-in for analysts + PM: two of three indicator rules must agree, RSI extremes veto."""
+    bullish = (data["rsi"] < 30) + (data["macd"] > data["signal"]) + (data["sma_20"] > data["sma_50"])
+    bearish = (data["rsi"] > 70) + (data["macd"] < data["signal"]) + (data["sma_20"] < data["sma_50"])
+    if bullish >= 2 and data["rsi"] < 70:
+        return TradeDecision(ticker, "BUY", bullish / 3, "Indicator policy", source="backtest")
+    if bearish >= 2 and data["rsi"] > 30:
+        return TradeDecision(ticker, "SELL", bearish / 3, "Indicator policy", source="backtest")
+    return TradeDecision.hold(ticker, "Indicator policy", source="backtest", confidence=1.0)
+
+
+def agent_decision(state) -> TradeDecision:
+    """The live pipeline's decision nodes (Nodes 2-4) on one replayed day."""
+    state.update(fundamental_analyst(state))
+    state.update(technical_analyst(state))
+    state.update(portfolio_manager(state))
+    return get_decision(state)
+
+
+def _init_worker(cache_path: str, llm_mode: str, quiet: bool):
+    """Runs once per worker process: point it at the same caches as the parent."""
+    ohlcv_cache.CACHE_DB_PATH = cache_path
+    if llm_mode == "replay":
+        set_response_cache(SQLiteCache(BACKTEST_LLM_CACHE_PATH, ttl={role: float("inf") for role in ROLE_TTL_SECONDS}))
+    if quiet:
+        # The agent nodes print a banner per call; thousands of replayed days would flood the console
+        sys.stdout = open(os.devnull, "w")
+
+
+def replay_ticker(task) -> dict:
+    """
+    Phase 1 for one ticker: walks its cached bars once. Indicators advance O(1) per bar,
+    the pre-screen scores every day in one vectorized pass, and only the days it lets
+    through reach the decision step. Returns per-day arrays.
+    """
+    ticker, start_ts, end_ts, llm_mode = task
+    bars = ohlcv_cache.load_bars(ticker, "1d")
+    engine = IncrementalIndicators()
+
+    days, opens, states = [], [], []
+    for ts, row in zip(bars.index.as_unit("s").asi8.tolist(), bars.itertuples(index=False)):
+        latest = engine.update(row.Close)
+        if engine.bars < WARMUP_BARS or not start_ts <= ts <= end_ts:
+            continue
+        data = build_market_data({**latest, "Volume": row.Volume})
+        # Bar time instead of wall-clock time, so replayed prompts are identical run to run
+        data["last_updated"] = datetime.fromtimestamp(ts, timezone.utc).isoformat()
+        state = new_state(ticker)
+        state["data"] = data
+        state["metadata"] = {"backtest": True}
+        days.append(ts)
+        opens.append(row.Open)
+        states.append(state)
+
+    action = np.zeros(len(days), dtype=np.int8)
+    confidence = np.zeros(len(days))
+    llm_days = 0
+    if states:
+        candidate = score_universe(states)["candidate"]
+        for i, state in enumerate(states):
+            if not candidate[i]:
+                decision = get_decision(auto_hold(state))
+            elif llm_mode == "replay":
+                decision = agent_decision(state)
+                llm_days += 1
+            else:
+                decision = indicator_decision(ticker, state["data"])
+            action[i] = ACTION_CODES.get(decision.action, 0)
+            confidence[i] = decision.confidence
+
+    return {
+        "ticker": ticker,
+        "ts": np.array(days, dtype=np.int64),
+        "open": np.array(opens, dtype=float),
+        "close": np.array([s["data"]["price"] for s in states], dtype=float),
+        "rsi": np.array([s["data"]["rsi"] for s in states], dtype=float),
+        "action": action,
+        "confidence": confidence,
+        "llm_days": llm_days,
+    }
+
+
+def generate_signals(tickers, start_ts: int, end_ts: int, llm_mode: str = None, processes: int = None):
+    """Phase 1 for every ticker, spread over a process pool."""
+    llm_mode = llm_mode or BACKTEST_LLM_MODE
+    processes = max(1, min(processes or BACKTEST_PROCESSES, len(tickers)))
+    tasks = [(t, start_ts, end_ts, llm_mode) for t in tickers]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(ohlcv_cache.CACHE_DB_PATH, llm_mode, True)) as pool:
+        return list(pool.map(replay_ticker, tasks, chunksize=max(1, len(tasks) // (processes * 4))))
+
+
+def _panel(signals, field, calendar, fill=np.nan):
+    """Days x tickers matrix of one per-ticker array, aligned on the shared calendar."""
+    panel = np.full((len(calendar), len(signals)), fill, dtype=float)
+    for j, s in enumerate(signals):
+        panel[np.searchsorted(calendar, s["ts"]), j] = s[field]
+    return panel
+
+
+def simulate(signals, cash: float = BACKTEST_START_CASH, slippage_bps: float = SLIPPAGE_BPS):
+    """
+    Phase 2: replays the decisions day by day against a simulated account.
+    Each day's BUY/SELL signals go through the deterministic risk engine (borderline = rejected,
+    there is no LLM board in a replay) and get sized like live orders, all on what was known at
+    that day's close. They fill at the next trading day's open on a MockBroker behind the same
+    AlpacaClient + OrderManager the live system uses; the last day's signals never trade.
+    """
+    tickers = [s["ticker"] for s in signals]
+    calendar = np.unique(np.concatenate([s["ts"] for s in signals])) if signals else np.array([], dtype=np.int64)
+    open_ = _panel(signals, "open", calendar)
+    close = _panel(signals, "close", calendar)
+    rsi = _panel(signals, "rsi", calendar, fill=50.0)
+    action = _panel(signals, "action", calendar, fill=0.0)
+    confidence = _panel(signals, "confidence", calendar, fill=0.0)
+
+    broker = MockBroker(cash=cash, fill_delay=0.0, slippage_bps=slippage_bps, seed=0)
+    client = broker.client()
+    manager = OrderManager(client=client, submit_workers=4, poll_interval=0.0, fill_timeout=5.0)
+
+    rows = []
+    stats = {"signals": 0, "risk_rejected": 0, "orders": 0, "filled": 0}
+    last_price = {}
+    for day, ts in enumerate(calendar):
+        traded = 0.0
+        # 1. Yesterday's decisions, for the tickers that open today
+        decided = day - 1
+        active = np.flatnonzero((action[decided] != 0) & ~np.isnan(open_[day])) if day else np.array([], dtype=int)
+        if active.size:
+            # Highest conviction first: buys draw on the cash in this order
+            active = active[np.argsort(-confidence[decided, active], kind="stable")]
+            # Risk checks and sizing on yesterday's close, the book as it stood then
+            portfolio = client.portfolio_snapshot(max_age=0)
+            held = {p["symbol"]: p["qty"] for p in portfolio["positions"]}
+            proposals = []
+            for j in active:
+                side = "buy" if action[decided, j] > 0 else "sell"
+                qty = size_order(close[decided, j])
+                if side == "sell":
+                    qty = size_sell(close[decided, j], held.get(tickers[j], 0))
+                if qty > 0:
+                    proposals.append({"ticker": tickers[j], "side": side, "qty": qty,
+                                      "price": close[decided, j], "rsi": rsi[decided, j]})
+            stats["signals"] += len(proposals)
+
+            checks = evaluate_trades(proposals, portfolio)
+            tickets = [OrderTicket(p["ticker"], p["side"], p["qty"])
+                       for p, check in zip(proposals, checks) if check.trade_approved]
+            stats["risk_rejected"] += len(proposals) - len(tickets)
+            if tickets:
+                # 2. Fill at today's open
+                broker.set_prices({tickers[j]: open_[day, j] for j in active})
+                manager.execute(tickets)
+                stats["orders"] += len(tickets)
+                stats["filled"] += sum(t.status == "filled" for t in tickets)
+                traded = sum(t.filled_qty * (t.filled_avg_price or 0.0) for t in tickets)
+
+        # 3. Mark to today's close (what today's decisions were made on)
+        priced = np.flatnonzero(~np.isnan(close[day]))
+        prices = {tickers[j]: close[day, j] for j in priced}
+        last_price.update(prices)
+        broker.set_prices(prices)
+
+        invested = sum(p["qty"] * last_price.get(s, 0.0) for s, p in broker.positions.items())
+        rows.append((ts, broker.cash + invested, broker.cash, invested, traded))
+
+    curve = pd.DataFrame(rows, columns=["ts", "equity", "cash", "invested", "traded"])
+    curve.index = pd.DatetimeIndex(pd.to_datetime(curve.pop("ts"), unit="s", utc=True), name="Date")
+    curve["turnover"] = curve["traded"] / curve["equity"].shift(1).fillna(cash)
+    return curve, stats
+
+
+def summarize(curve: pd.DataFrame, start_cash: float) -> dict:
+    """Return, risk and turnover statistics of an equity curve."""
+    if curve.empty:
+        return {"days": 0}
+    equity = curve["equity"].to_numpy()
+    daily = np.diff(equity, prepend=start_cash) / np.concatenate([[start_cash], equity[:-1]])
+    years = len(equity) / TRADING_DAYS
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0
+    return {
+        "days": len(equity),
+        "final_equity": float(equity[-1]),
+        "total_return": float(equity[-1] / start_cash - 1.0),
+        "cagr": float((equity[-1] / start_cash) ** (1 / years) - 1.0) if years > 0 and equity[-1] > 0 else 0.0,
+        "volatility": float(daily.std() * np.sqrt(TRADING_DAYS)),
+        "sharpe": float(daily.mean() / daily.std() * np.sqrt(TRADING_DAYS)) if daily.std() > 0 else 0.0,
+        "max_drawdown": float(drawdown.min()),
+        "traded_notional": float(curve["traded"].sum()),
+        "annual_turnover": float(curve["turnover"].sum() / years) if years > 0 else 0.0,
+        "avg_invested": float((curve["invested"] / curve["equity"]).mean()),
+    }
+
+
+def run_backtest(tickers, start: str, end: str = None, cash: float = BACKTEST_START_CASH,
+                 llm_mode: str = None, processes: int = None, output: str = None) -> tuple:
+    """
+    Replays `tickers` from `start` to `end` (YYYY-MM-DD, cached bars only: nothing is fetched).
+    Returns (equity curve DataFrame, stats dict); the curve is also written to `output` as CSV.
+    """
+    llm_mode = llm_mode or BACKTEST_LLM_MODE
+    start_ts = int(pd.Timestamp(start, tz="UTC").timestamp())
+    end_ts = int(pd.Timestamp(end, tz="UTC").timestamp()) if end else int(time.time())
+    print(colored(f"--- ⏪ Backtest: {len(tickers)} tickers, {start} -> {end or 'today'}, "
+                  f"decisions: {llm_mode} ---", "cyan"))
+
+    started = time.perf_counter()
+    signals = [s for s in generate_signals(tickers, start_ts, end_ts, llm_mode, processes) if len(s["ts"])]
+    signal_s = time.perf_counter() - started
+    missing = len(tickers) - len(signals)
+    print(colored(f"📈 Signals: {sum(len(s['ts']) for s in signals):,} ticker-days in {signal_s:.1f}s "
+                  f"({sum(s['llm_days'] for s in signals):,} sent to the agents"
+                  f"{f', {missing} tickers without cached bars' if missing else ''})", "cyan"))
+
+    curve, stats = simulate(signals, cash)
+    stats.update(summarize(curve, cash))
+    stats["signal_seconds"] = signal_s
+    stats["simulate_seconds"] = time.perf_counter() - started - signal_s
+
+    if output:
+        curve.to_csv(output)
+    print(colored(f"--- ✅ Backtest finished in {time.perf_counter() - started:.1f}s ---", "green"))
+    return curve, stats
+
+
+def print_backtest(stats: dict):
+    print("\n" + "=" * 50)
+    print("⏪ BACKTEST RESULTS")
+    print("=" * 50)
+    if not stats.get("days"):
+        print("No cached bars in the requested window.")
+        return
+    print(f"Days: {stats['days']}  Final equity: ${stats['final_equity']:,.2f}")
+    print(f"Total return: {stats['total_return']:.1%}  CAGR: {stats['cagr']:.1%}  "
+          f"Vol: {stats['volatility']:.1%}  Sharpe: {stats['sharpe']:.2f}  Max DD: {stats['max_drawdown']:.1%}")
+    print(f"Orders: {stats['orders']} ({stats['filled']} filled, {stats['risk_rejected']} blocked by risk)  "
+          f"Traded: ${stats['traded_notional']:,.0f}  Annual turnover: {stats['annual_turnover']:.1f}x  "
+          f"Avg invested: {stats['avg_invested']:.0%}")
+    print(json.dumps({k: round(v, 4) if isinstance(v, float) else v for k, v in stats.items()}))
@@ -1,22 +1,19 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
 import os
-import requests
-from dotenv import load_dotenv
+import sys
 import plotly.express as px
 
-# 1. Load Environment Variables
-load_dotenv()
-ALPACA_KEY = os.getenv("ALPACA_API_KEY")
-ALPACA_SECRET = os.getenv("ALPACA_SECRET_KEY")
-BASE_URL = os.getenv("ALPACA_BASE_URL", "https://paper-api.alpaca.markets")
+# `streamlit run src/dashboard.py` only puts src/ on the path; we need the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.alpaca_client import get_client
+from src.data.storage import get_connection
 
-HEADERS = {
-    "APCA-API-KEY-ID": ALPACA_KEY,
-    "APCA-API-SECRET-KEY": ALPACA_SECRET,
-    "Content-Type": "application/json"
-}
+# CONFIG: Rows shown per table (the journal grows without bound)
+DASHBOARD_ROW_LIMIT = 200
+
+# 1. Shared pooled Alpaca client (loads the .env keys itself)
+client = get_client()
 
 # 2. Configure the Page
 st.set_page_config(
@@ -33,7 +30,7 @@ st.sidebar.header("📡 Live Market Connection")
 
 try:
     # Fetch Account Data
-    acct = requests.get(f"{BASE_URL}/v2/account", headers=HEADERS).json()
+    acct = client.request("GET", "/v2/account").json()
     
     # Check if we got valid data
     if 'cash' in acct:
@@ -62,7 +59,7 @@ with tab1:
     
     try:
         # Fetch Positions from Alpaca
-        positions = requests.get(f"{BASE_URL}/v2/positions", headers=HEADERS).json()
+        positions = client.get_positions()
         
         if positions:
             # Convert to DataFrame for display
@@ -94,9 +91,8 @@ with tab2:
     st.markdown("The **Reflector Agent** analyzes past trades and saves lessons here.")
     
     try:
-        conn = sqlite3.connect("portfolio.db")
-        lessons_df = pd.read_sql_query("SELECT * FROM lessons ORDER BY id DESC", conn)
-        conn.close()
+        lessons_df = pd.read_sql_query("SELECT * FROM lessons ORDER BY id DESC LIMIT ?", get_connection(),
+                                       params=(DASHBOARD_ROW_LIMIT,))
         
         if not lessons_df.empty:
             for index, row in lessons_df.iterrows():
@@ -114,9 +110,8 @@ with tab3:
     st.subheader("📜 Recent Trade Decisions")
     
     try:
-        conn = sqlite3.connect("portfolio.db")
-        trades_df = pd.read_sql_query("SELECT * FROM trades ORDER BY id DESC", conn)
-        conn.close()
+        trades_df = pd.read_sql_query("SELECT * FROM trades ORDER BY id DESC LIMIT ?", get_connection(),
+                                      params=(DASHBOARD_ROW_LIMIT,))
         
         if not trades_df.empty:
             st.dataframe(trades_df, use_container_width=True)
@@ -0,0 +1,203 @@
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from termcolor import colored
+from src.data.storage import delete_checkpoints, get_checkpoint_runs, get_checkpoints, save_checkpoint
+from src.utils import telemetry
+from src.utils.decisions import TradeDecision
+
+# Resumable runs: every node's state update is saved to the journal under (run id, ticker, node, step).
+# Re-running with the same run id replays the saved updates instead of calling the node again,
+# so a run that crashed partway through picks up at the first node that never finished.
+# Failures (an LLM or Alpaca error the node caught) are not saved, and neither is anything that
+# ticker did after one in the same attempt: a resumed run retries from the failed step.
+
+# CONFIG: Checkpoints of runs last touched longer ago than this are pruned after each checkpointed run
+CHECKPOINT_RETENTION_DAYS = 14
+
+TYPE_TAG = "__type__"
+
+# execution_status prefixes of orders that didn't complete (re-sent on resume, same client_order_id)
+UNFINISHED_EXECUTION = ("Failed", "Error", "Pending:")
+
+
+def new_run_id() -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+# --- Serialization: state updates are plain JSON, plus the typed records AgentState carries ---
+
+def _default(value):
+    if isinstance(value, TradeDecision):
+        return {TYPE_TAG: "TradeDecision", **value.to_dict()}
+    if hasattr(value, "item"):          # numpy scalars (indicator values)
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not checkpointable")
+
+
+def _object_hook(data: dict):
+    if data.get(TYPE_TAG) == "TradeDecision":
+        return TradeDecision.from_dict({k: v for k, v in data.items() if k != TYPE_TAG})
+    return data
+
+
+def encode(update: dict) -> str:
+    return json.dumps(update, default=_default)
+
+
+def decode(payload: str) -> dict:
+    return json.loads(payload, object_hook=_object_hook)
+
+
+def failed(update: dict) -> bool:
+    """True if a node's update records an error it caught rather than a result worth replaying."""
+    if not isinstance(update, dict):
+        return False
+    if (update.get("metadata") or {}).get("status") == "error":
+        return True
+    for key in ("fundamental_analysis", "technical_analysis", "risk_analysis"):
+        if str(update.get(key, "")).startswith("Error"):
+            return True
+    decision = update.get("decision")
+    if isinstance(decision, TradeDecision) and decision.source == "fallback":
+        return True
+    return str(update.get("execution_status", "")).startswith(UNFINISHED_EXECUTION)
+
+
+class Checkpointer:
+    """
+    The checkpoints of one run. wrap() turns a graph node into one that replays its saved update
+    if it already finished in an earlier attempt; batch() does the same per ticker for the
+    universe-wide stages. A node that runs more than once per ticker (the PM and Risk Board in
+    the revision loop) is told apart by its step: the nth call of that node for that ticker.
+    After a failed step, that ticker's later graph steps aren't saved in this attempt either,
+    since they were decided on top of the failure.
+    """
+
+    def __init__(self, run_id: str = None):
+        self.run_id = run_id or new_run_id()
+        self._saved = {}
+        for ticker, node, step, payload in get_checkpoints(self.run_id):
+            try:
+                self._saved[(ticker, node, step)] = decode(payload)
+            except ValueError as e:
+                print(colored(f"⚠️ Unreadable checkpoint {ticker}/{node}#{step}, it will re-run: {e}", "yellow"))
+        self._calls = defaultdict(int)
+        self._failed_tickers = set()
+        self._lock = threading.Lock()
+        self.stats = {"replayed": 0, "saved": 0, "failed": 0}
+
+        if self._saved:
+            tickers = len({key[0] for key in self._saved})
+            print(colored(f"♻️ Resuming run {self.run_id}: {len(self._saved)} finished steps "
+                          f"for {tickers} tickers will be replayed", "cyan"))
+        else:
+            print(colored(f"💾 Checkpointing run {self.run_id} (resume it with --run-id {self.run_id})", "cyan"))
+
+    @property
+    def resumed(self) -> bool:
+        return bool(self._saved)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def _next_step(self, ticker, node) -> int:
+        with self._lock:
+            step = self._calls[(ticker, node)]
+            self._calls[(ticker, node)] += 1
+            return step
+
+    def save(self, ticker, node, step, update):
+        try:
+            payload = encode(update)
+        except (TypeError, ValueError) as e:
+            # Not fatal: this step simply runs again on resume
+            print(colored(f"⚠️ Could not checkpoint {ticker}/{node}: {e}", "yellow"))
+            return
+        save_checkpoint(self.run_id, ticker, node, step, payload)
+        self._count("saved")
+
+    def wrap(self, node: str, fn):
+        """A graph node that replays its saved update, or runs `fn` and saves what it returns."""
+        def wrapper(state):
+            ticker = state.get("ticker", "*")
+            step = self._next_step(ticker, node)
+            key = (ticker, node, step)
+            if key in self._saved:
+                self._count("replayed")
+                telemetry.count("checkpoint_replays")
+                return self._saved[key]
+            update = fn(state)
+            with self._lock:
+                if failed(update):
+                    self._failed_tickers.add(ticker)
+                    self.stats["failed"] += 1
+                skip = ticker in self._failed_tickers
+            if not skip:
+                self.save(ticker, node, step, update)
+            return update
+        wrapper.__name__ = getattr(fn, "__name__", node)
+        return wrapper
+
+    def batch(self, stage: str, tickers, fn) -> dict:
+        """
+        {ticker: result} for a universe-wide stage. Tickers with a saved result are replayed;
+        `fn(missing tickers)` runs for the rest and each of its successful results is saved.
+        """
+        results, missing = {}, []
+        for ticker in tickers:
+            key = (ticker, stage, 0)
+            if key in self._saved:
+                results[ticker] = self._saved[key]
+            else:
+                missing.append(ticker)
+        if results:
+            self._count("replayed", len(results))
+            telemetry.count("checkpoint_replays", len(results))
+            print(colored(f"♻️ {stage}: {len(results)} tickers replayed from checkpoints, {len(missing)} to run", "cyan"))
+        if missing:
+            fresh = fn(missing)
+            for ticker, result in fresh.items():
+                if failed(result):
+                    self._count("failed")
+                else:
+                    self.save(ticker, stage, 0, result)
+            results.update(fresh)
+        return results
+
+
+# --- Housekeeping ---
+
+def list_runs() -> list:
+    """[{run_id, tickers, checkpoints, started, updated}] for every checkpointed run, newest first."""
+    return [{"run_id": run_id, "tickers": tickers, "checkpoints": count, "started": started, "updated": updated}
+            for run_id, tickers, count, started, updated in get_checkpoint_runs()]
+
+
+def prune(older_than_days: float = None, run_ids=None) -> tuple:
+    """
+    Deletes the checkpoints of `run_ids`, and of every run last updated more than
+    `older_than_days` ago (0 = all runs). Returns (runs removed, checkpoints removed).
+    """
+    runs = list_runs()
+    doomed = {run["run_id"] for run in runs} & set(run_ids or [])
+    if older_than_days is not None:
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).strftime("%Y-%m-%d %H:%M:%S")
+        doomed |= {run["run_id"] for run in runs if run["updated"] <= cutoff}
+    return len(doomed), delete_checkpoints(doomed)
+
+
+def print_runs(runs=None):
+    runs = list_runs() if runs is None else runs
+    if not runs:
+        print(colored("No checkpointed runs.", "yellow"))
+        return
+    print(f"{'RUN ID':<24} {'TICKERS':>8} {'STEPS':>8}  {'STARTED (UTC)':<20} {'LAST SAVED (UTC)':<20}")
+    for run in runs:
+        print(f"{run['run_id']:<24} {run['tickers']:>8} {run['checkpoints']:>8}  {run['started']:<20} {run['updated']:<20}")
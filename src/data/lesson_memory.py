@@ -0,0 +1,188 @@
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from termcolor import colored
+from src.data.storage import get_connection, on_lesson_saved, wait_for_writes
+
+# Episodic memory: the Reflector's lessons, indexed in memory by ticker, sector and recency
+# so the Portfolio Manager can be reminded of them on every decision.
+
+# CONFIG: Retrieval
+LESSON_TOP_K = 3                 # lessons injected into the PM prompt
+CANDIDATES_PER_SCOPE = 32        # newest lessons considered from each of ticker / sector / all
+RECENCY_HALF_LIFE_DAYS = 30
+SCOPE_WEIGHTS = {"ticker": 1.0, "sector": 0.6, "global": 0.25}
+
+# CONFIG: Optional TF-IDF re-ranking against the analyst reports (pure Python, no extra deps)
+USE_TFIDF = os.getenv("LESSON_TFIDF", "1") != "0"
+TFIDF_WEIGHT = 0.5
+MAX_QUERY_TERMS = 64
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9]+")
+STOP_WORDS = frozenset(
+    "the and for with that this are was were when from have has had not but you your our its "
+    "into than then them they their there will would should could been being about after before "
+    "over under more most less very only also just always never lesson".split()
+)
+
+
+def tokenize(text: str) -> Counter:
+    return Counter(t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOP_WORDS)
+
+
+def _epoch(timestamp: str) -> float:
+    """Journal timestamps are UTC 'YYYY-MM-DD HH:MM:SS' (older trades used local ISO format)."""
+    try:
+        parsed = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return 0.0
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+@dataclass(slots=True)
+class Lesson:
+    ticker: str
+    text: str
+    sector: str
+    timestamp: str
+    epoch: float
+    terms: Counter
+
+    def render(self) -> str:
+        return f"- [{self.ticker}, {self.timestamp[:10]}] {self.text}"
+
+
+# --- Sector lookup (filled from the universe file's 'sector' column) ---
+
+_sectors = {}
+
+
+def set_sectors(mapping: dict):
+    _sectors.update({t.upper(): s for t, s in mapping.items() if s})
+
+
+def sector_of(ticker: str):
+    return _sectors.get((ticker or "").upper())
+
+
+class LessonIndex:
+    """
+    Append-only in-memory index over the lessons table.
+    Loaded from SQLite once, then kept current by save_lesson (no re-reads). Each lookup only
+    scores the newest CANDIDATES_PER_SCOPE lessons per scope, so its cost does not grow with the table.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._lessons = []        # in insert order, so the tail is the most recent
+        self._by_ticker = {}      # ticker -> positions in _lessons
+        self._by_sector = {}      # sector -> positions in _lessons
+        self._seen = set()        # (timestamp, ticker, text): a lesson both queued and loaded is kept once
+        self._df = Counter()      # document frequency per term
+        self._idf_cache = {}      # cleared whenever a lesson is added
+
+    def __len__(self):
+        return len(self._lessons)
+
+    def _append(self, timestamp, ticker, text, sector):
+        key = (timestamp, ticker, text)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        sector = sector or sector_of(ticker)
+        terms = tokenize(text) if USE_TFIDF else Counter()
+        position = len(self._lessons)
+        self._lessons.append(Lesson(ticker, text, sector, timestamp, _epoch(timestamp), terms))
+        self._by_ticker.setdefault(ticker, []).append(position)
+        if sector:
+            self._by_sector.setdefault(sector, []).append(position)
+        self._df.update(terms.keys())
+        self._idf_cache.clear()
+
+    def load(self):
+        """Reads the whole lessons table once (later lessons arrive through add())."""
+        with self._lock:
+            if self._loaded:
+                return
+            start = time.perf_counter()
+            wait_for_writes()
+            rows = get_connection(self.path).execute(
+                'SELECT timestamp, ticker, lesson_text, sector FROM lessons ORDER BY id'
+            ).fetchall()
+            for row in rows:
+                self._append(*row)
+            self._loaded = True
+        print(colored(f"🧠 Lesson memory: {len(rows)} lessons indexed in {time.perf_counter() - start:.2f}s", "cyan"))
+
+    def add(self, timestamp, ticker, text, sector=None):
+        """Incremental update (registered with storage.on_lesson_saved). No-op until the index is loaded."""
+        with self._lock:
+            if self._loaded:
+                self._append(timestamp, ticker, text, sector)
+
+    def _idf(self, term):
+        idf = self._idf_cache.get(term)
+        if idf is None:
+            idf = self._idf_cache[term] = math.log((1 + len(self._lessons)) / (1 + self._df.get(term, 0))) + 1.0
+        return idf
+
+    def _query_vector(self, query: str):
+        weights = {t: tf * self._idf(t) for t, tf in tokenize(query).items() if t in self._df}
+        if len(weights) > MAX_QUERY_TERMS:
+            weights = dict(heapq.nlargest(MAX_QUERY_TERMS, weights.items(), key=lambda kv: kv[1]))
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        return weights, norm
+
+    def _cosine(self, query, query_norm, terms):
+        dot = norm = 0.0
+        for term, tf in terms.items():
+            w = tf * self._idf(term)
+            norm += w * w
+            dot += w * query.get(term, 0.0)
+        return dot / (math.sqrt(norm) * query_norm) if dot else 0.0
+
+    def search(self, ticker: str, sector: str = None, query: str = "", k: int = LESSON_TOP_K, now: float = None):
+        """Top-k lessons for a ticker: same ticker > same sector > any, decayed by age, re-ranked by TF-IDF."""
+        if not self._loaded:
+            self.load()
+        now = now or time.time()
+        sector = sector or sector_of(ticker)
+
+        with self._lock:
+            scopes = [("ticker", self._by_ticker.get(ticker, [])),
+                      ("sector", self._by_sector.get(sector, []) if sector else []),
+                      ("global", range(len(self._lessons)))]
+            candidates = {}
+            for scope, positions in scopes:
+                for position in positions[-CANDIDATES_PER_SCOPE:]:
+                    candidates[position] = max(candidates.get(position, 0.0), SCOPE_WEIGHTS[scope])
+
+            query_vector, query_norm = self._query_vector(query) if USE_TFIDF and query else ({}, 0.0)
+            scored = []
+            for position, weight in candidates.items():
+                lesson = self._lessons[position]
+                age_days = max(now - lesson.epoch, 0.0) / 86400
+                score = weight * 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+                if query_norm:
+                    score += TFIDF_WEIGHT * self._cosine(query_vector, query_norm, lesson.terms)
+                scored.append((score, position))
+            return [self._lessons[p] for _, p in heapq.nlargest(k, scored)]
+
+
+_index = LessonIndex()
+on_lesson_saved(_index.add)
+
+
+def recall_lessons(ticker: str, query: str = "", k: int = LESSON_TOP_K, sector: str = None):
+    """The k most relevant past lessons for `ticker` (query = text to match them against)."""
+    return _index.search(ticker, sector=sector, query=query, k=k)
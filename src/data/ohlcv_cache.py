@@ -0,0 +1,356 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from termcolor import colored
+from src.utils import telemetry
+
+# Lives next to portfolio.db
+CACHE_DB_PATH = "ohlcv_cache.db"
+
+# STALENESS: how long a series is served straight from disk before we ask Yahoo for newer bars
+STALE_AFTER_SECONDS = {
+    "1m": 60,
+    "5m": 5 * 60,
+    "15m": 15 * 60,
+    "1h": 30 * 60,
+    "1d": 6 * 60 * 60,
+    "1wk": 24 * 60 * 60,
+}
+DEFAULT_STALE_SECONDS = 60 * 60
+
+# EVICTION: keeps the cache bounded as the universe changes
+MAX_SYMBOLS = 2000            # LRU cap on cached (ticker, interval) series
+MAX_IDLE_DAYS = 30            # drop series nobody has asked for in this long
+DELISTED_AFTER_DAYS = 14      # drop series whose newest bar is this much older than our last fetch
+MAX_HISTORY_DAYS = 6 * 365    # trim bars older than this (enough for a 5-year backtest)
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+_write_lock = threading.Lock()
+
+
+def _connect():
+    return sqlite3.connect(CACHE_DB_PATH, timeout=30)
+
+
+def init_cache():
+    """Creates the OHLCV cache tables if they don't exist."""
+    conn = _connect()
+    cursor = conn.cursor()
+
+    # 1. Bars (one row per ticker/interval/timestamp, UTC epoch seconds)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bars (
+            ticker TEXT,
+            interval TEXT,
+            ts INTEGER,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume REAL,
+            PRIMARY KEY (ticker, interval, ts)
+        ) WITHOUT ROWID
+    ''')
+
+    # 2. Per-series bookkeeping for staleness + eviction
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS series (
+            ticker TEXT,
+            interval TEXT,
+            last_ts INTEGER,
+            covered_from INTEGER,
+            last_fetch REAL,
+            last_access REAL,
+            PRIMARY KEY (ticker, interval)
+        )
+    ''')
+
+    # 3. Saved IncrementalIndicators state, as of bar `ts`
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS indicator_state (
+            ticker TEXT,
+            interval TEXT,
+            ts INTEGER,
+            state TEXT,
+            PRIMARY KEY (ticker, interval)
+        )
+    ''')
+
+    conn.commit()
+    conn.close()
+
+
+_download = None
+
+
+def set_downloader(download):
+    """Swaps in a different yf.download-compatible function (e.g. synthetic bars for offline runs)."""
+    global _download
+    _download = download
+
+
+def _yf_download(tickers, **kwargs) -> pd.DataFrame:
+    if _download is not None:
+        return _download(tickers, **kwargs)
+    # Imported on first download: yfinance is slow to import and warm runs never need it
+    import yfinance as yf
+    return yf.download(tickers, **kwargs)
+
+
+def _period_start(period: str) -> datetime:
+    """Turns a yfinance period string ('6mo', '1y', '30d', '5y') into a UTC start time."""
+    now = datetime.now(timezone.utc)
+    if period == "max":
+        return datetime(1970, 1, 1, tzinfo=timezone.utc)
+    if period.endswith("mo"):
+        return now - timedelta(days=31 * int(period[:-2]))
+    if period.endswith("y"):
+        return now - timedelta(days=366 * int(period[:-1]))
+    if period.endswith("wk"):
+        return now - timedelta(weeks=int(period[:-2]))
+    if period.endswith("d"):
+        return now - timedelta(days=int(period[:-1]))
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def _to_epoch(index: pd.DatetimeIndex):
+    index = index.tz_convert("UTC") if index.tz is not None else index.tz_localize("UTC")
+    return index.as_unit("s").asi8
+
+
+def store_bars(ticker: str, interval: str, df: pd.DataFrame, covered_from: int = None):
+    """
+    Upserts bars for one series. Re-sent bars (e.g. today's partial bar) overwrite the old row.
+    `covered_from` is the start of a full-period download, so longer windows know to backfill.
+    """
+    df = df.dropna(subset=["Close"])
+    if df.empty:
+        return
+
+    rows = list(zip(
+        [ticker] * len(df),
+        [interval] * len(df),
+        _to_epoch(df.index).tolist(),
+        *(df[col].astype(float).tolist() for col in OHLCV_COLUMNS)
+    ))
+    last_ts = rows[-1][2]
+    now = time.time()
+
+    with _write_lock:
+        conn = _connect()
+        conn.executemany('INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        conn.execute('''
+            INSERT INTO series (ticker, interval, last_ts, covered_from, last_fetch, last_access)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(ticker, interval) DO UPDATE SET
+                last_ts = MAX(COALESCE(series.last_ts, 0), excluded.last_ts),
+                covered_from = MIN(COALESCE(series.covered_from, excluded.covered_from),
+                                   COALESCE(excluded.covered_from, series.covered_from)),
+                last_fetch = excluded.last_fetch,
+                last_access = excluded.last_access
+        ''', (ticker, interval, last_ts, covered_from, now, now))
+        conn.commit()
+        conn.close()
+
+
+def _mark_fetched(ticker: str, interval: str):
+    """Records a fetch that returned no new bars, so staleness rules still apply."""
+    now = time.time()
+    with _write_lock:
+        conn = _connect()
+        conn.execute('UPDATE series SET last_fetch = ?, last_access = ? WHERE ticker = ? AND interval = ?',
+                     (now, now, ticker, interval))
+        conn.commit()
+        conn.close()
+
+
+def _touch(tickers, interval: str):
+    now = time.time()
+    with _write_lock:
+        conn = _connect()
+        conn.executemany('UPDATE series SET last_access = ? WHERE ticker = ? AND interval = ?',
+                         [(now, t, interval) for t in tickers])
+        conn.commit()
+        conn.close()
+
+
+def load_bars(ticker: str, interval: str = "1d", start: datetime = None) -> pd.DataFrame:
+    """Reads cached bars for one series (optionally from `start` onwards) as an OHLCV frame."""
+    start_ts = int(start.timestamp()) if start else 0
+    conn = _connect()
+    rows = conn.execute('''
+        SELECT ts, open, high, low, close, volume FROM bars
+        WHERE ticker = ? AND interval = ? AND ts >= ?
+        ORDER BY ts
+    ''', (ticker, interval, start_ts)).fetchall()
+    conn.close()
+
+    df = pd.DataFrame(rows, columns=["ts"] + OHLCV_COLUMNS)
+    df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("ts"), unit="s", utc=True), name="Date")
+    return df
+
+
+def _series_meta(tickers, interval: str) -> dict:
+    conn = _connect()
+    placeholders = ",".join("?" * len(tickers))
+    rows = conn.execute(
+        f'SELECT ticker, last_ts, last_fetch, covered_from FROM series WHERE interval = ? AND ticker IN ({placeholders})',
+        (interval, *tickers)
+    ).fetchall()
+    conn.close()
+    return {t: (last_ts, last_fetch, covered_from) for t, last_ts, last_fetch, covered_from in rows}
+
+
+def _is_fresh(last_fetch: float, interval: str) -> bool:
+    return (time.time() - last_fetch) < STALE_AFTER_SECONDS.get(interval, DEFAULT_STALE_SECONDS)
+
+
+def get_history(ticker: str, interval: str = "1d", period: str = "6mo") -> pd.DataFrame:
+    """
+    Returns `period` of OHLCV bars for one ticker, hitting the network only for bars we don't have.
+    - Fresh series are served from disk.
+    - Stale series fetch from the last cached bar onwards (that bar is re-fetched in case it was partial).
+    - Unknown series do one full `period` download.
+    """
+    return get_history_batch([ticker], interval=interval, period=period).get(ticker, pd.DataFrame(columns=OHLCV_COLUMNS))
+
+
+def _split_download(hist: pd.DataFrame, tickers) -> dict:
+    """Splits a yf.download frame into {ticker: OHLCV frame}."""
+    if hist is None or hist.empty:
+        return {}
+    if not isinstance(hist.columns, pd.MultiIndex):
+        return {tickers[0]: hist}
+    available = set(hist.columns.get_level_values(0))
+    return {t: hist[t].dropna(subset=["Close"]) for t in tickers if t in available}
+
+
+def get_history_batch(tickers, interval: str = "1d", period: str = "6mo") -> dict:
+    """
+    Batch version of get_history: {ticker: OHLCV frame}.
+    Cold tickers share one full-period download; stale tickers share one incremental download
+    starting at the oldest last-cached bar among them.
+    """
+    init_cache()
+    tickers = list(dict.fromkeys(tickers))
+    window_start = _period_start(period)
+    covered_needed = int(window_start.timestamp()) + 24 * 60 * 60
+
+    # Series cached for a shorter window than requested are treated as cold
+    meta = {
+        t: m for t, m in _series_meta(tickers, interval).items()
+        if m[2] is not None and m[2] <= covered_needed
+    }
+
+    fresh = [t for t in tickers if t in meta and _is_fresh(meta[t][1], interval)]
+    stale = [t for t in tickers if t in meta and t not in fresh]
+    cold = [t for t in tickers if t not in meta]
+
+    # 1. Cold start: full history
+    if cold:
+        try:
+            with telemetry.timed("yfinance"):
+                hist = _yf_download(cold, period=period, interval=interval, group_by="ticker",
+                                   auto_adjust=True, threads=True, progress=False)
+            for t, frame in _split_download(hist, cold).items():
+                store_bars(t, interval, frame, covered_from=int(window_start.timestamp()))
+        except Exception as e:
+            print(colored(f"⚠️ OHLCV cold download failed: {e}", "yellow"))
+
+    # 2. Incremental: only bars after what we already have
+    if stale:
+        since = min(meta[t][0] for t in stale)
+        start = datetime.fromtimestamp(since, tz=timezone.utc).date()
+        try:
+            with telemetry.timed("yfinance"):
+                hist = _yf_download(stale, start=start.isoformat(), interval=interval, group_by="ticker",
+                                   auto_adjust=True, threads=True, progress=False)
+            frames = _split_download(hist, stale)
+            for t in stale:
+                if t in frames and not frames[t].empty:
+                    store_bars(t, interval, frames[t])
+                else:
+                    _mark_fetched(t, interval)
+        except Exception as e:
+            # Serve what we have; it's better than nothing
+            print(colored(f"⚠️ OHLCV incremental download failed, serving cached bars: {e}", "yellow"))
+
+    if fresh:
+        _touch(fresh, interval)
+
+    # 3. Return the merged window from disk
+    result = {}
+    for t in tickers:
+        df = load_bars(t, interval, start=window_start)
+        if not df.empty:
+            result[t] = df
+
+    print(colored(f"📦 OHLCV cache: {len(fresh)} fresh, {len(stale)} updated, {len(cold)} cold", "cyan"))
+    return result
+
+
+def evict(max_symbols: int = MAX_SYMBOLS, max_idle_days: int = MAX_IDLE_DAYS,
+          delisted_after_days: int = DELISTED_AFTER_DAYS, max_history_days: int = MAX_HISTORY_DAYS) -> int:
+    """
+    Bounds the cache size. Removes, in order:
+    1. Series not requested for `max_idle_days`.
+    2. Series that look delisted (newest bar far older than our last successful fetch).
+    3. Least-recently-used series beyond `max_symbols`.
+    Then trims bars older than `max_history_days`. Returns the number of series evicted.
+    """
+    init_cache()
+    now = time.time()
+    day = 24 * 60 * 60
+
+    with _write_lock:
+        conn = _connect()
+        cursor = conn.cursor()
+
+        doomed = cursor.execute('''
+            SELECT ticker, interval FROM series
+            WHERE last_access < ? OR (last_fetch - last_ts) > ?
+        ''', (now - max_idle_days * day, delisted_after_days * day)).fetchall()
+
+        doomed += cursor.execute('''
+            SELECT ticker, interval FROM series
+            ORDER BY last_access DESC LIMIT -1 OFFSET ?
+        ''', (max_symbols,)).fetchall()
+        doomed = list(dict.fromkeys(doomed))
+
+        cursor.executemany('DELETE FROM bars WHERE ticker = ? AND interval = ?', doomed)
+        cursor.executemany('DELETE FROM series WHERE ticker = ? AND interval = ?', doomed)
+        cursor.executemany('DELETE FROM indicator_state WHERE ticker = ? AND interval = ?', doomed)
+        cursor.execute('DELETE FROM bars WHERE ts < ?', (int(now - max_history_days * day),))
+        conn.commit()
+        conn.close()
+
+    if doomed:
+        print(colored(f"🧹 OHLCV cache evicted {len(doomed)} series", "cyan"))
+    return len(doomed)
+
+
+def save_indicator_state(ticker: str, interval: str, ts: int, state: dict):
+    """Persists an IncrementalIndicators.to_dict() snapshot taken after bar `ts` (UTC epoch seconds)."""
+    init_cache()
+    with _write_lock:
+        conn = _connect()
+        conn.execute('INSERT OR REPLACE INTO indicator_state VALUES (?, ?, ?, ?)',
+                     (ticker, interval, int(ts), json.dumps(state)))
+        conn.commit()
+        conn.close()
+
+
+def load_indicator_state(ticker: str, interval: str = "1d"):
+    """Returns (ts, state dict) for a saved indicator engine, or (None, None)."""
+    init_cache()
+    conn = _connect()
+    row = conn.execute('SELECT ts, state FROM indicator_state WHERE ticker = ? AND interval = ?',
+                       (ticker, interval)).fetchone()
+    conn.close()
+    if not row:
+        return None, None
+    return row[0], json.loads(row[1])
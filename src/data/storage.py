@@ -1,68 +1,369 @@
+import atexit
+import os
+import queue
 import sqlite3
-from datetime import datetime
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from termcolor import colored
+from src.utils import telemetry
+from src.utils.decisions import TradeRecord
+
+# CONFIG: One absolute path for the journal, whatever directory we are launched from
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_PATH = os.getenv("PORTFOLIO_DB_PATH", os.path.join(PROJECT_ROOT, "portfolio.db"))
+
+# CONFIG: Write queue. Inserts are grouped into one executemany + commit per batch.
+WRITE_BATCH_SIZE = 500
+WRITE_LINGER_SECONDS = 0.005   # how long the writer waits for more rows before committing a batch
+
+
+# --- Schema migrations (PRAGMA user_version = number of migrations applied) ---
+
+def _add_columns(table, columns):
+    """Migration step for columns older journals may already have (ADD COLUMN has no IF NOT EXISTS)."""
+    def step(conn):
+        existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        for column, kind in columns:
+            if column not in existing:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {kind}')
+    return step
+
+
+MIGRATIONS = [
+    # 1. Trade History + Lessons (Episodic Memory)
+    [
+        '''CREATE TABLE IF NOT EXISTS trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            ticker TEXT,
+            action TEXT,
+            quantity REAL,
+            price REAL,
+            pnl REAL DEFAULT 0.0,
+            reasoning TEXT
+        )''',
+        '''CREATE TABLE IF NOT EXISTS lessons (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            ticker TEXT,
+            lesson_text TEXT
+        )''',
+    ],
+    # 2. Structured decision fields
+    [_add_columns("trades", [("confidence", "REAL"), ("order_id", "TEXT")])],
+    # 3. Lookups by ticker and recency
+    [
+        'CREATE INDEX IF NOT EXISTS idx_trades_ticker_ts ON trades (ticker, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_lessons_ticker_ts ON lessons (ticker, timestamp)',
+    ],
+    # 4. Sector of the lesson's ticker (for the lesson memory index)
+    [_add_columns("lessons", [("sector", "TEXT")])],
+    # 5. Reflector bookkeeping: trades it has already reviewed (pnl is written at the same time)
+    [
+        _add_columns("trades", [("reviewed", "INTEGER DEFAULT 0")]),
+        'CREATE INDEX IF NOT EXISTS idx_trades_unreviewed ON trades (ticker) WHERE reviewed = 0',
+    ],
+    # 6. Checkpoints of resumable runs: each node's state update, per ticker (src/data/checkpoints.py)
+    [
+        '''CREATE TABLE IF NOT EXISTS checkpoints (
+            run_id TEXT NOT NULL,
+            ticker TEXT NOT NULL,
+            node TEXT NOT NULL,
+            step INTEGER NOT NULL,
+            update_json TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (run_id, ticker, node, step)
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_checkpoints_created ON checkpoints (created_at)',
+    ],
+]
+
+
+def migrate(conn) -> int:
+    """Applies any migrations this database hasn't seen yet. Returns the schema version."""
+    if conn.execute('PRAGMA user_version').fetchone()[0] >= len(MIGRATIONS):
+        return len(MIGRATIONS)
+
+    # Write lock first, so two processes/threads opening a fresh journal don't both migrate
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for number, steps in enumerate(MIGRATIONS[version:], start=version + 1):
+            for step in steps:
+                step(conn) if callable(step) else conn.execute(step)
+            conn.execute(f'PRAGMA user_version = {number}')
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return len(MIGRATIONS)
+
+
+# --- Connections: one per thread per database file ---
+
+_local = threading.local()
+
+
+def _open(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')      # readers never block the writer
+    conn.execute('PRAGMA synchronous=NORMAL')    # safe with WAL, far fewer fsyncs
+    conn.execute('PRAGMA busy_timeout=30000')
+    return conn
+
+
+def get_connection(path: str = None) -> sqlite3.Connection:
+    """This thread's connection to the journal (opened, and migrated, on first use)."""
+    path = path or DB_PATH
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = connections[path] = _open(path)
+        migrate(conn)
+    return conn
+
+
+# --- Write queue: many producers, one writer thread ---
+
+@dataclass
+class WriteFailure:
+    """A queued row the writer could not commit, even on its own."""
+    path: str
+    sql: str
+    params: tuple
+    error: str
+
+
+class WriteQueue:
+    """
+    Agents enqueue inserts and move on; a single writer thread drains the queue and
+    commits each batch with executemany. One writer means no lock contention between
+    concurrent tickers; wait() gives read-your-writes when a reader needs it.
+    A group that fails is retried row by row, so one bad row only loses itself; the rows
+    that still fail are kept until flush() hands them back. A row's `on_commit` callback
+    runs on the writer thread once that row is committed.
+    """
+
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE, linger: float = WRITE_LINGER_SECONDS):
+        self.batch_size = batch_size
+        self.linger = linger
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._failures = []
+        self._failures_lock = threading.Lock()
+        self.stats = {"rows": 0, "batches": 0, "errors": 0, "retried_groups": 0}
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="storage-writer", daemon=True)
+                self._thread.start()
+
+    def put(self, sql: str, params: tuple, path: str = None, on_commit=None):
+        telemetry.count("sqlite_writes")
+        self._ensure_started()
+        self._queue.put((path or DB_PATH, sql, params, on_commit))
+
+    def wait(self):
+        """Blocks until everything enqueued so far is committed (or has failed)."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def flush(self) -> list:
+        """wait(), then returns (and forgets) every WriteFailure since the last flush."""
+        self.wait()
+        with self._failures_lock:
+            failures, self._failures = self._failures, []
+        return failures
+
+    def _take_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get(timeout=self.linger))
+            except queue.Empty:
+                break
+        return batch
+
+    def _committed(self, callbacks):
+        for callback in callbacks:
+            if callback is not None:
+                try:
+                    callback()
+                except Exception as e:
+                    print(colored(f"⚠️ Journal commit callback failed: {e}", "yellow"))
+
+    def _write_rows_one_by_one(self, conn, path, sql, rows, callbacks):
+        self.stats["retried_groups"] += 1
+        for params, callback in zip(rows, callbacks):
+            try:
+                with conn:
+                    conn.execute(sql, params)
+            except Exception as e:
+                self.stats["errors"] += 1
+                with self._failures_lock:
+                    self._failures.append(WriteFailure(path, sql, params, str(e)))
+                print(colored(f"Failed to write a row to the journal: {e}", "red"))
+                continue
+            self.stats["rows"] += 1
+            self._committed([callback])
+
+    def _write_group(self, path, sql, rows, callbacks):
+        try:
+            conn = get_connection(path)
+        except Exception as e:
+            self.stats["errors"] += len(rows)
+            with self._failures_lock:
+                self._failures.extend(WriteFailure(path, sql, params, str(e)) for params in rows)
+            print(colored(f"Failed to open the journal, {len(rows)} rows not written: {e}", "red"))
+            return
+        try:
+            with conn:
+                conn.executemany(sql, rows)
+        except Exception:
+            # Find the bad rows instead of dropping the whole group
+            self._write_rows_one_by_one(conn, path, sql, rows, callbacks)
+            return
+        self.stats["rows"] += len(rows)
+        self._committed(callbacks)
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            # Group by (database, statement) so each group is one executemany
+            groups = {}
+            for path, sql, params, on_commit in batch:
+                rows, callbacks = groups.setdefault((path, sql), ([], []))
+                rows.append(params)
+                callbacks.append(on_commit)
+            for (path, sql), (rows, callbacks) in groups.items():
+                self._write_group(path, sql, rows, callbacks)
+            self.stats["batches"] += 1
+            for _ in batch:
+                self._queue.task_done()
+
+
+_writer = WriteQueue()
+atexit.register(_writer.flush)
+
+
+def flush() -> list:
+    """
+    Waits for queued journal writes to land. Returns the rows that could not be written
+    since the last flush() (WriteFailure list, empty when everything was committed).
+    """
+    return _writer.flush()
+
+
+def wait_for_writes():
+    """Waits for queued journal writes to land, leaving any failures for flush() to report."""
+    _writer.wait()
+
+
+# --- Public API ---
+
+INSERT_TRADE = '''
+    INSERT INTO trades (timestamp, ticker, action, quantity, price, reasoning, confidence, order_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+INSERT_LESSON = 'INSERT INTO lessons (timestamp, ticker, lesson_text, sector) VALUES (?, ?, ?, ?)'
+INSERT_CHECKPOINT = '''
+    INSERT OR REPLACE INTO checkpoints (run_id, ticker, node, step, update_json, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+# Callbacks run for every saved lesson, with (timestamp, ticker, lesson, sector)
+_lesson_listeners = []
+
+
+def on_lesson_saved(callback):
+    """Registers a callback for new lessons (the lesson memory index keeps itself current this way)."""
+    _lesson_listeners.append(callback)
 
-DB_PATH = "portfolio.db"
 
 def init_db():
-    """Initializes the SQLite database with required tables."""
+    """Initializes the SQLite database with required tables (runs pending migrations)."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # 1. Trade History Table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS trades (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT,
-                ticker TEXT,
-                action TEXT,
-                quantity REAL,
-                price REAL,
-                pnl REAL DEFAULT 0.0,
-                reasoning TEXT
-            )
-        ''')
-        
-        # 2. Lessons Table (Episodic Memory)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS lessons (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT,
-                ticker TEXT,
-                lesson_text TEXT
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        print(colored("--- 💾 Database Initialized (portfolio.db) ---", "cyan"))
+        version = migrate(get_connection())
+        print(colored(f"--- 💾 Database Initialized ({DB_PATH}, schema v{version}) ---", "cyan"))
     except Exception as e:
         print(colored(f"Database Error: {e}", "red"))
 
+def log_trade_record(record: TradeRecord):
+    """Queues an executed trade (a TradeRecord) for the journal; it is announced once committed."""
+    _writer.put(INSERT_TRADE, record.as_row(), on_commit=lambda: print(colored(
+        f"📝 Trade logged to DB: {record.side} {record.qty} {record.ticker} @ {record.price:.2f}", "green")))
+
 def log_trade(ticker, action, qty, price, reason):
     """Saves a executed trade to the database."""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        timestamp = datetime.now().isoformat()
-        
-        cursor.execute('''
-            INSERT INTO trades (timestamp, ticker, action, quantity, price, reasoning)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (timestamp, ticker, action, qty, price, reason))
-        
-        conn.commit()
-        conn.close()
-        print(colored(f"📝 Trade logged to DB: {action} {qty} {ticker}", "green"))
-    except Exception as e:
-        print(colored(f"Failed to log trade: {e}", "red"))
+    log_trade_record(TradeRecord(ticker, action, qty, price, reason))
+
+def save_lesson(ticker, lesson, sector=None):
+    """Queues a learned lesson for the journal."""
+    # Same format as SQLite's datetime("now"), which older rows were written with
+    row = (datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"), ticker, lesson, sector)
+    _writer.put(INSERT_LESSON, row, on_commit=lambda: print(colored(
+        f"🧠 New Lesson Learned: {lesson}", "magenta", attrs=['bold'])))
+    for callback in _lesson_listeners:
+        callback(*row)
 
 def get_recent_trades(limit=5):
     """Retrieves the last N trades."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM trades ORDER BY id DESC LIMIT ?', (limit,))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
\ No newline at end of file
+    _writer.wait()
+    return get_connection().execute('SELECT * FROM trades ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+
+def get_unreviewed_trades(tickers=None):
+    """Every trade the Reflector hasn't reviewed yet (optionally only for `tickers`), oldest first."""
+    _writer.wait()
+    columns = 'id, timestamp, ticker, action, quantity, price, reasoning, confidence'
+    if tickers is None:
+        return get_connection().execute(
+            f'SELECT {columns} FROM trades WHERE reviewed = 0 ORDER BY id').fetchall()
+    tickers = list(tickers)
+    placeholders = ",".join("?" * len(tickers))
+    return get_connection().execute(
+        f'SELECT {columns} FROM trades WHERE reviewed = 0 AND ticker IN ({placeholders}) ORDER BY id',
+        tickers).fetchall()
+
+def mark_reviewed(updates):
+    """Queues (trade id, pnl) pairs: writes each trade's pnl and marks it reviewed."""
+    for trade_id, pnl in updates:
+        _writer.put('UPDATE trades SET pnl = ?, reviewed = 1 WHERE id = ?', (float(pnl), int(trade_id)))
+
+def get_recent_lessons(limit=50):
+    """Retrieves the last N lessons."""
+    _writer.wait()
+    return get_connection().execute('SELECT * FROM lessons ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+
+def save_checkpoint(run_id, ticker, node, step, update_json):
+    """Queues one node's serialized state update for a resumable run."""
+    created = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    _writer.put(INSERT_CHECKPOINT, (run_id, ticker, node, int(step), update_json, created))
+
+def get_checkpoints(run_id):
+    """Every (ticker, node, step, update_json) saved for `run_id`."""
+    _writer.wait()
+    return get_connection().execute(
+        'SELECT ticker, node, step, update_json FROM checkpoints WHERE run_id = ?', (run_id,)).fetchall()
+
+def get_checkpoint_runs():
+    """One row per checkpointed run: (run_id, tickers, checkpoints, first saved, last saved), newest first."""
+    _writer.wait()
+    return get_connection().execute(
+        'SELECT run_id, COUNT(DISTINCT ticker), COUNT(*), MIN(created_at), MAX(created_at) '
+        'FROM checkpoints GROUP BY run_id ORDER BY MAX(created_at) DESC').fetchall()
+
+def delete_checkpoints(run_ids):
+    """Deletes every checkpoint of the given runs. Returns the number of rows removed."""
+    run_ids = list(run_ids)
+    if not run_ids:
+        return 0
+    _writer.wait()
+    conn = get_connection()
+    placeholders = ",".join("?" * len(run_ids))
+    with conn:
+        return conn.execute(f'DELETE FROM checkpoints WHERE run_id IN ({placeholders})', run_ids).rowcount
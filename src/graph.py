@@ -0,0 +1,124 @@
+import time
+from langgraph.graph import StateGraph, START, END
+from src.state import AgentState
+from src.agents.data_collector import data_collection_node
+from src.agents.analysts import fundamental_analyst, technical_analyst
+from src.agents.portfolio_manager import portfolio_manager
+from src.agents.risk_manager import risk_management_node
+from src.agents.execution import execute_trade_node
+from src.agents.reflector import reflector_node
+from src.data.storage import log_trade_record
+from src.utils import telemetry
+from src.utils.decisions import TradeRecord, get_decision
+from termcolor import colored
+
+# CONFIG: How many times the PM may revise a proposal the Risk Board rejected
+MAX_REVISIONS = 2
+
+
+def record_trade_node(state: AgentState) -> AgentState:
+    """
+    Node 5b: Trade Journal
+    Writes filled orders (actual fill price and quantity) to the trade journal.
+    """
+    fill = state.get('metadata', {}).get('fill')
+    if not fill or fill.get('filled_qty', 0) <= 0:
+        return {}
+
+    try:
+        log_trade_record(TradeRecord.from_fill(get_decision(state), fill))
+    except Exception as e:
+        print(colored(f"⚠️ Error logging: {e}", "yellow"))
+    return {}
+
+
+def skip_if_filled(key, fn):
+    """
+    Wraps a node so it is skipped when `key` is already in the state,
+    e.g. filled in up front by batch_data_collection or technical_analyst_batch.
+    """
+    def node(state: AgentState) -> AgentState:
+        if state.get(key):
+            return {}
+        return fn(state)
+    node.__name__ = fn.__name__
+    return node
+
+
+# (node name, stage, function). The stage is what concurrency caps are keyed on,
+# so both analysts share the "analysts" budget.
+GRAPH_NODES = [
+    ("data_collection", "data", skip_if_filled("data", data_collection_node)),
+    ("fundamental_analyst", "analysts", fundamental_analyst),
+    ("technical_analyst", "analysts", skip_if_filled("technical_analysis", technical_analyst)),
+    ("portfolio_manager", "portfolio_manager", portfolio_manager),
+    ("risk_management", "risk", risk_management_node),
+    ("execution", "execution", execute_trade_node),
+    ("record_trade", "execution", record_trade_node),
+    ("reflector", "reflector", reflector_node),
+]
+
+
+def route_after_data(state: AgentState):
+    """Halt on a data error; otherwise fan out to both analysts in parallel."""
+    if state.get("metadata", {}).get("status") == "error" or not state.get("data"):
+        return END
+    return ["fundamental_analyst", "technical_analyst"]
+
+
+def route_after_risk(state: AgentState):
+    """Send rejected proposals back to the PM until MAX_REVISIONS is used up."""
+    if state.get("trade_approved", False):
+        return "execution"
+    if state.get("revision_count", 0) <= MAX_REVISIONS:
+        print(colored(f"🔁 Risk Board rejected {state['ticker']}, asking PM to revise "
+                      f"({state['revision_count']}/{MAX_REVISIONS})", "yellow"))
+        return "portfolio_manager"
+    return "execution"
+
+
+def _with_limit(fn, stage, limiter):
+    def node(state):
+        waited = time.perf_counter()
+        with limiter.slot(stage):
+            telemetry.count("limiter_wait_seconds", time.perf_counter() - waited)
+            return fn(state)
+    node.__name__ = getattr(fn, "__name__", stage)
+    return node
+
+
+def build_graph(limiter=None, checkpointer=None):
+    """
+    Compiles the agent pipeline as a LangGraph StateGraph:
+
+        data_collection -> (fundamental_analyst || technical_analyst) -> portfolio_manager
+            -> risk_management -(rejected, revisions left)-> portfolio_manager
+            -> execution -> record_trade -> reflector
+
+    If a StageLimiter is given, each node waits for a free slot in its stage first.
+    If a Checkpointer is given, each node's update is saved, and nodes that finished in an
+    earlier attempt of the same run are replayed without waiting for a slot.
+    Every node call is traced (src/utils/telemetry.py), slot wait included.
+    """
+    graph = StateGraph(AgentState)
+    for name, stage, fn in GRAPH_NODES:
+        node = _with_limit(fn, stage, limiter) if limiter is not None else fn
+        if checkpointer is not None:
+            node = checkpointer.wrap(name, node)
+        graph.add_node(name, telemetry.traced(name, node))
+
+    graph.add_edge(START, "data_collection")
+    graph.add_conditional_edges("data_collection", route_after_data,
+                                ["fundamental_analyst", "technical_analyst", END])
+
+    # Parallel branches join here: the PM runs once both analysts are done
+    graph.add_edge("fundamental_analyst", "portfolio_manager")
+    graph.add_edge("technical_analyst", "portfolio_manager")
+
+    graph.add_edge("portfolio_manager", "risk_management")
+    graph.add_conditional_edges("risk_management", route_after_risk, ["portfolio_manager", "execution"])
+    graph.add_edge("execution", "record_trade")
+    graph.add_edge("record_trade", "reflector")
+    graph.add_edge("reflector", END)
+
+    return graph.compile()
@@ -0,0 +1,39 @@
+from src.state import AgentState
+from src.graph import build_graph
+
+_default_graph = None
+
+
+def new_state(ticker: str) -> AgentState:
+    """Builds an empty AgentState for a single ticker."""
+    return {
+        "ticker": ticker,
+        "data": {},
+        "metadata": {},
+        "fundamental_analysis": "",
+        "technical_analysis": "",
+        "sentiment_analysis": "",
+        "decision": None,
+        "portfolio_decision": "",
+        "risk_score": 0,
+        "risk_analysis": "",
+        "trade_approved": False,
+        "execution_status": "",
+        "target_qty": 0,
+        "revision_count": 0
+    }
+
+
+def run_pipeline(state: AgentState, graph=None) -> AgentState:
+    """
+    Runs the compiled agent graph for one ticker and updates `state` in place.
+    Pass a graph from build_graph(limiter) to share stage limits across tickers.
+    """
+    global _default_graph
+    if graph is None:
+        if _default_graph is None:
+            _default_graph = build_graph()
+        graph = _default_graph
+
+    state.update(graph.invoke(state))
+    return state
@@ -0,0 +1,43 @@
+import threading
+from contextlib import contextmanager
+
+# Kept apart from src/universe.py so the CLI can build its --<stage>-limit flags
+# without importing the agents and LangGraph.
+
+# CONFIG: Max in-flight calls per stage.
+# Network-bound stages (yfinance, Gemini) can run wide; the broker gets a narrow lane.
+DEFAULT_STAGE_LIMITS = {
+    "data": 16,
+    "analysts": 8,
+    "portfolio_manager": 8,
+    "risk": 4,
+    "execution": 2,
+    "reflector": 4,
+}
+
+
+class StageLimiter:
+    """One bounded semaphore per pipeline stage."""
+
+    def __init__(self, limits=None):
+        self.limits = dict(DEFAULT_STAGE_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self._semaphores = {
+            stage: threading.BoundedSemaphore(max(1, int(cap)))
+            for stage, cap in self.limits.items()
+        }
+
+    @contextmanager
+    def slot(self, stage):
+        sem = self._semaphores.get(stage)
+        if sem is None:
+            yield
+            return
+        with sem:
+            yield
+
+    @property
+    def max_workers(self):
+        # Enough threads for every stage to be saturated at the same time
+        return sum(self.limits.values())
@@ -1,5 +1,10 @@
 import operator
-from typing import Annotated, List, Dict, Any, TypedDict
+from typing import Annotated, List, Dict, Any, Optional, TypedDict
+from src.utils.decisions import TradeDecision
+
+def merge_dicts(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """Reducer: parallel graph branches may each add keys to the same dict."""
+    return {**(left or {}), **(right or {})}
 
 class AgentState(TypedDict):
     """
@@ -8,7 +13,7 @@ class AgentState(TypedDict):
     """
     ticker: str
     data: Dict[str, Any]  # Stores price data, indicators, news
-    metadata: Dict[str, Any]
+    metadata: Annotated[Dict[str, Any], merge_dicts]  # Merged across parallel branches
     
     # Analyst Outputs
     fundamental_analysis: str
@@ -16,7 +21,8 @@ class AgentState(TypedDict):
     sentiment_analysis: str
     
     # Portfolio Manager Output
-    portfolio_decision: str  # e.g., "ACTION: BUY | Size: 100"
+    decision: Optional[TradeDecision]  # Typed decision every later stage reads
+    portfolio_decision: str  # Rendered decision.text(), for prompts and logs
     
     # Risk Board Outputs (Added for Sprint 4)
     risk_score: int          # 0 = Safe, 100 = Dangerous
@@ -25,6 +31,7 @@ class AgentState(TypedDict):
     
     # Execution Details (Added for Sprint 5)
     execution_status: str
+    target_qty: int          # Set by the Portfolio Optimizer; 0 = size the order alone
     
     # Loop Control
     revision_count: int  # To track Risk Board rejections
\ No newline at end of file
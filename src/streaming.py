@@ -0,0 +1,437 @@
+import csv
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import numpy as np
+from termcolor import colored
+from src.agents.data_collector import build_market_data
+from src.data.ohlcv_cache import get_history_batch, load_indicator_state, save_indicator_state
+from src.data.storage import flush as flush_journal
+from src.graph import build_graph
+from src.pipeline import new_state, run_pipeline
+from src.stage_limits import StageLimiter
+from src.utils import telemetry
+from src.utils.alpaca_client import ALPACA_KEY, ALPACA_SECRET
+from src.utils.decisions import get_decision
+from src.utils.indicators import IncrementalIndicators
+
+# Intraday streaming: minute bars from a feed -> per-ticker ring buffer + incremental indicators
+#   -> trigger check -> (only when it fires) analysts -> PM -> risk -> execution for that ticker.
+
+# CONFIG: Feeds
+ALPACA_STREAM_URL = os.getenv("ALPACA_STREAM_URL", "wss://stream.data.alpaca.markets/v2")
+ALPACA_STREAM_FEED = os.getenv("ALPACA_STREAM_FEED", "iex")   # "iex" (free) or "sip"
+MAX_RECONNECTS = 10
+
+# CONFIG: Per-ticker state
+RING_SIZE = 390               # one regular session of minute bars
+WARMUP_BARS = 50              # no triggers until SMA_50 is defined
+WARMUP_PERIOD = "5d"          # minute history pulled through the OHLCV cache at start-up
+STREAM_INTERVAL = "1m"        # indicator state is saved under this interval when the stream stops
+
+# CONFIG: When a new bar sends its ticker through the agents. Any rule firing is enough.
+STREAM_TRIGGERS = {
+    "rsi_low": 30.0,              # RSI crosses down through this (oversold)
+    "rsi_high": 70.0,             # RSI crosses up through this (overbought)
+    "macd_cross": True,           # MACD crosses its signal line
+    "volume_spike": 3.0,          # bar volume >= this many times the average of the bars before it (0 = off)
+}
+COOLDOWN_SECONDS = 15 * 60    # per ticker, in bar time, after a triggered run
+STREAM_WORKERS = 4            # triggered pipelines in flight at once
+REPORT_EVERY_SECONDS = 15 * 60   # telemetry summary + reset, so a long session stays bounded
+
+
+@dataclass(slots=True)
+class Bar:
+    ticker: str
+    ts: float          # bar start, epoch seconds
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+    @classmethod
+    def from_alpaca(cls, msg: dict) -> "Bar":
+        """From an Alpaca stream bar message ({"T": "b", "S": ..., "o", "h", "l", "c", "v", "t"})."""
+        return cls(msg["S"], _epoch(msg["t"]), float(msg["o"]), float(msg["h"]), float(msg["l"]),
+                   float(msg["c"]), float(msg["v"]))
+
+
+def _epoch(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        return (parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).timestamp()
+
+
+# --- Feeds ---
+
+class BarFeed:
+    """A source of bars. Iterating yields Bar objects until the feed ends or close() is called."""
+
+    def __iter__(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class FileReplayFeed(BarFeed):
+    """
+    Replays recorded bars for offline runs: a CSV (ticker, timestamp, open, high, low, close, volume)
+    or JSONL of Alpaca bar messages (what AlpacaBarFeed writes with record_path).
+    `speed` > 0 sleeps the real gaps between bar timestamps, divided by speed; 0 replays at full speed.
+    """
+
+    def __init__(self, path: str, speed: float = 0.0, tickers=None):
+        self.path = path
+        self.speed = speed
+        self.tickers = {t.upper() for t in tickers} if tickers else None
+        self._closed = threading.Event()
+
+    def _read(self):
+        with open(self.path, newline="") as f:
+            if self.path.endswith((".jsonl", ".json")):
+                for line in f:
+                    if line.strip():
+                        msg = json.loads(line)
+                        if msg.get("T", "b") == "b":
+                            yield Bar.from_alpaca(msg)
+            else:
+                for row in csv.DictReader(f):
+                    row = {k.strip().lower(): v for k, v in row.items()}
+                    yield Bar(row["ticker"].strip().upper(), _epoch(row["timestamp"]), float(row["open"]),
+                              float(row["high"]), float(row["low"]), float(row["close"]), float(row["volume"]))
+
+    def symbols(self) -> list:
+        """Every ticker in the file, in order of first appearance."""
+        return list(dict.fromkeys(bar.ticker for bar in self._read()))
+
+    def __iter__(self):
+        previous = None
+        for bar in self._read():
+            if self._closed.is_set():
+                return
+            if self.tickers and bar.ticker not in self.tickers:
+                continue
+            if self.speed > 0 and previous is not None and bar.ts > previous:
+                self._closed.wait((bar.ts - previous) / self.speed)
+            previous = bar.ts
+            yield bar
+
+    def close(self):
+        self._closed.set()
+
+
+class AlpacaBarFeed(BarFeed):
+    """
+    Alpaca market-data websocket (minute bars). Authenticates, subscribes to `tickers` and
+    reconnects with backoff if the connection drops. With `record_path`, every bar message is
+    appended as JSONL so the session can be replayed later with FileReplayFeed.
+    """
+
+    def __init__(self, tickers, feed: str = ALPACA_STREAM_FEED, url: str = ALPACA_STREAM_URL,
+                 record_path: str = None):
+        self.tickers = [t.upper() for t in tickers]
+        self.url = f"{url.rstrip('/')}/{feed}"
+        self.record_path = record_path
+        self._socket = None
+        self._closed = threading.Event()
+
+    def _connect(self):
+        # Imported here: only live streaming needs the websocket client
+        from websockets.sync.client import connect
+
+        socket = connect(self.url, open_timeout=10)
+        for request in ({"action": "auth", "key": ALPACA_KEY, "secret": ALPACA_SECRET},
+                        {"action": "subscribe", "bars": self.tickers}):
+            socket.send(json.dumps(request))
+        return socket
+
+    def _messages(self, socket):
+        for raw in socket:
+            for msg in json.loads(raw):
+                if msg.get("T") == "error":
+                    raise RuntimeError(f"Alpaca stream error {msg.get('code')}: {msg.get('msg')}")
+                yield msg
+
+    def __iter__(self):
+        from websockets.exceptions import ConnectionClosed
+
+        record = open(self.record_path, "a") if self.record_path else None
+        attempt = 0
+        try:
+            while not self._closed.is_set():
+                try:
+                    self._socket = self._connect()
+                    print(colored(f"📡 Streaming {len(self.tickers)} tickers from {self.url}", "cyan"))
+                    for msg in self._messages(self._socket):
+                        attempt = 0
+                        if msg.get("T") != "b":
+                            continue
+                        if record:
+                            record.write(json.dumps(msg) + "\n")
+                        yield Bar.from_alpaca(msg)
+                    reason = "closed by server"
+                except (ConnectionClosed, OSError, TimeoutError) as e:
+                    reason = e
+                if self._closed.is_set():
+                    return
+                attempt += 1
+                if attempt > MAX_RECONNECTS:
+                    raise RuntimeError(f"Alpaca stream lost after {MAX_RECONNECTS} reconnects: {reason}")
+                delay = min(60.0, 2 ** attempt)
+                print(colored(f"⚠️ Stream disconnected ({reason}), reconnect {attempt}/{MAX_RECONNECTS} in {delay:.0f}s", "yellow"))
+                self._closed.wait(delay)
+        finally:
+            if record:
+                record.close()
+
+    def close(self):
+        self._closed.set()
+        if self._socket is not None:
+            self._socket.close()
+
+
+# --- Per-ticker state ---
+
+class TickerStream:
+    """Ring buffer of the last RING_SIZE bars for one ticker, plus its incremental indicators."""
+
+    def __init__(self, ticker: str, ring_size: int = RING_SIZE):
+        self.ticker = ticker
+        self.bars = deque(maxlen=ring_size)
+        self.indicators = IncrementalIndicators()
+        self.latest = {}
+        self.previous = {}
+        self.last_ts = 0.0
+        self.volume_sum = 0.0     # over the ring buffer, kept as bars come and go
+
+    def warm_up(self, frame, saved=None) -> bool:
+        """
+        Seeds the buffer and indicators from an OHLCV frame (oldest first). `saved` is the
+        (ts, IncrementalIndicators.to_dict()) the last session stopped at: if the frame still has
+        bar ts, the indicators carry on from that state and only the bars after it are fed to them,
+        so they keep the whole history instead of restarting on this frame. Returns True if it resumed.
+        """
+        bars = [Bar(self.ticker, ts.timestamp(), row.Open, row.High, row.Low, row.Close, row.Volume)
+                for ts, row in zip(frame.index, frame.itertuples(index=False))]
+        resume_ts, state = saved or (None, None)
+        resumed = bool(state) and any(bar.ts == resume_ts for bar in bars)
+        if resumed:
+            self.indicators = IncrementalIndicators.from_dict(state)
+        for bar in bars:
+            if resumed and bar.ts <= resume_ts:
+                # Already in the saved state: the ring buffer still wants it for the volume average
+                self._push(bar)
+                self.last_ts = bar.ts
+                self.latest = {**self.indicators.latest, "Volume": bar.volume}
+                continue
+            self.add(bar)
+        return resumed
+
+    def add(self, bar: Bar) -> bool:
+        """Feeds one bar. Returns False (and ignores it) if it is not newer than the last one."""
+        if bar.ts <= self.last_ts:
+            return False
+        self.last_ts = bar.ts
+        self._push(bar)
+        self.previous = self.latest
+        self.latest = {**self.indicators.update(bar.close), "Volume": bar.volume}
+        return True
+
+    @property
+    def ready(self) -> bool:
+        return self.indicators.bars >= WARMUP_BARS
+
+    def _push(self, bar: Bar):
+        if len(self.bars) == self.bars.maxlen:
+            self.volume_sum -= self.bars[0].volume
+        self.bars.append(bar)
+        self.volume_sum += bar.volume
+
+    def average_volume(self) -> float:
+        """Mean volume of the buffered bars before the newest one (the baseline a spike is measured against)."""
+        prior = len(self.bars) - 1
+        return (self.volume_sum - self.bars[-1].volume) / prior if prior > 0 else 0.0
+
+
+def check_triggers(stream: TickerStream, triggers=None):
+    """The rules the newest bar fired, as a short text (None if it fired none)."""
+    t = dict(STREAM_TRIGGERS)
+    if triggers:
+        t.update(triggers)
+    now, before = stream.latest, stream.previous
+    if not stream.ready or not before:
+        return None
+
+    fired = []
+    if before["RSI"] > t["rsi_low"] >= now["RSI"]:
+        fired.append(f"RSI fell below {t['rsi_low']:g} ({now['RSI']:.1f})")
+    if before["RSI"] < t["rsi_high"] <= now["RSI"]:
+        fired.append(f"RSI rose above {t['rsi_high']:g} ({now['RSI']:.1f})")
+    if t["macd_cross"]:
+        hist_before, hist_now = before["MACDh_12_26_9"], now["MACDh_12_26_9"]
+        if hist_before and hist_now and (hist_before > 0) != (hist_now > 0):
+            fired.append(f"MACD crossed {'above' if hist_now > 0 else 'below'} its signal line")
+    if t["volume_spike"] and len(stream.bars) > 1:
+        average = stream.average_volume()
+        if average > 0 and now["Volume"] >= t["volume_spike"] * average:
+            fired.append(f"volume {now['Volume'] / average:.1f}x the previous bars' average")
+    return "; ".join(fired) or None
+
+
+# --- Runner ---
+
+class StreamRunner:
+    """
+    Consumes a BarFeed. Every bar updates its ticker's ring buffer and indicators in O(1); when a
+    trigger fires (and the ticker is not in cooldown or already running), the ticker's pipeline runs
+    on a worker thread with the streamed indicators as its data, so the data node is skipped.
+    """
+
+    def __init__(self, feed: BarFeed, tickers, triggers=None, cooldown: float = COOLDOWN_SECONDS,
+                 workers: int = STREAM_WORKERS, stage_limits=None, warm_up: bool = True):
+        self.feed = feed
+        self.tickers = [t.upper() for t in tickers]
+        self.triggers = triggers
+        self.cooldown = cooldown
+        self.streams = {t: TickerStream(t) for t in self.tickers}
+        self.graph = build_graph(StageLimiter(stage_limits))
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.warm_up = warm_up
+
+        self._lock = threading.Lock()
+        self._running = set()
+        self._last_run = {}       # ticker -> bar timestamp of its last triggered run
+        self.reaction_seconds = []
+        self.stats = {"bars": 0, "out_of_order": 0, "triggers": 0, "runs": 0, "skipped": 0, "errors": 0}
+
+    def _warm_up(self):
+        try:
+            frames = get_history_batch(self.tickers, interval="1m", period=WARMUP_PERIOD)
+        except Exception as e:
+            print(colored(f"⚠️ Stream warm-up failed, indicators start cold: {e}", "yellow"))
+            return
+        resumed = 0
+        for ticker, frame in frames.items():
+            try:
+                saved = load_indicator_state(ticker, STREAM_INTERVAL)
+            except Exception as e:
+                print(colored(f"⚠️ No saved indicator state for {ticker}: {e}", "yellow"))
+                saved = None
+            resumed += self.streams[ticker].warm_up(frame.tail(RING_SIZE * 2), saved)
+        print(colored(f"🔥 Warmed up {len(frames)}/{len(self.tickers)} tickers from cached minute bars "
+                      f"({resumed} resumed from saved indicator state)", "cyan"))
+
+    def save_state(self):
+        """Saves every warmed-up ticker's indicators, for the next session's warm-up."""
+        saved = 0
+        for ticker, stream in self.streams.items():
+            if not stream.indicators.bars:
+                continue
+            try:
+                save_indicator_state(ticker, STREAM_INTERVAL, stream.last_ts, stream.indicators.to_dict())
+                saved += 1
+            except Exception as e:
+                print(colored(f"⚠️ Could not save indicator state for {ticker}: {e}", "yellow"))
+        return saved
+
+    def _run_ticker(self, ticker, latest, reason, received):
+        state = new_state(ticker)
+        state["data"] = build_market_data(latest)
+        state["metadata"] = {"stream_trigger": reason, "batch_reflection": True}
+        try:
+            run_pipeline(state, graph=self.graph)
+            print(colored(f"⚡ {ticker}: {get_decision(state).action} | {state.get('execution_status') or 'no order'}", "green"))
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            print(colored(f"❌ Streamed pipeline crashed for {ticker}: {e}", "red"))
+        finally:
+            with self._lock:
+                self._running.discard(ticker)
+                self.reaction_seconds.append(time.perf_counter() - received)
+
+    def on_bar(self, bar: Bar, received: float = None):
+        """Handles one bar. Returns the trigger reason if it started a pipeline run."""
+        stream = self.streams.get(bar.ticker)
+        if stream is None:
+            return None
+        self.stats["bars"] += 1
+        if not stream.add(bar):
+            self.stats["out_of_order"] += 1
+            return None
+
+        reason = check_triggers(stream, self.triggers)
+        if reason is None:
+            return None
+        self.stats["triggers"] += 1
+        with self._lock:
+            # Cooldown is in bar time, so a replay behaves like the live session it was recorded from
+            last = self._last_run.get(bar.ticker)
+            if bar.ticker in self._running or (last is not None and bar.ts - last < self.cooldown):
+                self.stats["skipped"] += 1
+                return None
+            self._running.add(bar.ticker)
+            self._last_run[bar.ticker] = bar.ts
+            self.stats["runs"] += 1
+
+        print(colored(f"🔔 {bar.ticker} @ {bar.close:.2f}: {reason}", "magenta"))
+        self.pool.submit(telemetry.bind(self._run_ticker), bar.ticker, dict(stream.latest), reason,
+                         received or time.perf_counter())
+        return reason
+
+    def run(self):
+        """Consumes the feed until it ends or Ctrl-C, then waits for in-flight runs."""
+        if self.warm_up:
+            self._warm_up()
+        telemetry.new_run()
+        reported = time.monotonic()
+        print(colored(f"--- 📈 Streaming mode: {len(self.tickers)} tickers, triggers {self.triggers or STREAM_TRIGGERS} ---", "cyan"))
+        try:
+            for bar in self.feed:
+                self.on_bar(bar, time.perf_counter())
+                if time.monotonic() - reported > REPORT_EVERY_SECONDS:
+                    telemetry.finish_run()
+                    telemetry.new_run()
+                    reported = time.monotonic()
+        except KeyboardInterrupt:
+            print(colored("\n🛑 Stopping stream...", "yellow"))
+        finally:
+            self.feed.close()
+            self.pool.shutdown(wait=True)
+            # Replays run without warm-up and must not overwrite the live session's state
+            if self.warm_up:
+                self.save_state()
+            failed_writes = flush_journal()
+            if failed_writes:
+                print(colored(f"❌ {len(failed_writes)} journal rows could not be written (see errors above)", "red"))
+            telemetry.finish_run()
+        return self.summary()
+
+    def summary(self) -> dict:
+        with self._lock:
+            reaction = np.array(self.reaction_seconds)
+            stats = dict(self.stats)
+        stats["reaction_p50_s"] = float(np.percentile(reaction, 50)) if len(reaction) else 0.0
+        stats["reaction_p99_s"] = float(np.percentile(reaction, 99)) if len(reaction) else 0.0
+        return stats
+
+
+def print_stream_stats(stats: dict):
+    print("\n" + "=" * 60)
+    print("📈 STREAM SUMMARY")
+    print("=" * 60)
+    print(f"Bars: {stats['bars']:,} ({stats['out_of_order']} out of order) | Triggers: {stats['triggers']} "
+          f"| Runs: {stats['runs']} ({stats['skipped']} in cooldown/running, {stats['errors']} crashed)")
+    if stats["runs"]:
+        print(f"Reaction (bar received -> order done): p50 {stats['reaction_p50_s']:.2f}s | p99 {stats['reaction_p99_s']:.2f}s")
+    print("=" * 60)
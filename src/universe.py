@@ -0,0 +1,313 @@
+import csv
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.agents.data_collector import batch_data_collection
+from src.agents.analysts import technical_analyst_batch, TECH_BATCH_SIZE
+from src.agents.prescreen import prescreen_universe
+from src.agents.risk_manager import risk_review_batch
+from src.agents.portfolio_optimizer import optimize_basket
+from src.agents.execution import execute_orders
+from src.agents.reflector import reflect_trades
+from src.data.checkpoints import CHECKPOINT_RETENTION_DAYS, Checkpointer, prune as prune_checkpoints
+from src.data.ohlcv_cache import evict
+from src.data.storage import flush as flush_journal
+from src.graph import build_graph, record_trade_node
+from src.pipeline import new_state, run_pipeline
+from src.stage_limits import StageLimiter
+from src.state import merge_dicts
+from src.utils import telemetry
+from src.utils.decisions import get_decision
+from src.utils.llm_cache import print_cache_stats
+from termcolor import colored
+
+RESULT_COLUMNS = [
+    "ticker", "status", "price", "rsi", "decision", "trade_approved",
+    "risk_score", "target_qty", "execution_status", "elapsed_s", "error"
+]
+
+
+def load_universe(path):
+    """
+    Reads tickers from a file.
+    Accepts one ticker per line, or a CSV with a 'ticker' column. Lines starting with '#' are ignored.
+    """
+    with open(path, newline="") as f:
+        lines = [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+    if lines and "," in lines[0] and "ticker" in lines[0].lower().split(","):
+        reader = csv.DictReader(lines)
+        key = next(k for k in reader.fieldnames if k.strip().lower() == "ticker")
+        tickers = [row[key].strip() for row in reader if row.get(key)]
+    else:
+        tickers = [line.split(",")[0].strip() for line in lines]
+
+    # De-duplicate, keep order
+    return list(dict.fromkeys(t.upper() for t in tickers if t))
+
+
+def load_sectors(path):
+    """{ticker: sector} from a universe CSV's optional 'sector' column (empty for plain ticker lists)."""
+    with open(path, newline="") as f:
+        lines = [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+    if not lines or "," not in lines[0]:
+        return {}
+    reader = csv.DictReader(lines)
+    columns = {k.strip().lower(): k for k in reader.fieldnames}
+    if "ticker" not in columns or "sector" not in columns:
+        return {}
+    return {row[columns["ticker"]].strip().upper(): row[columns["sector"]].strip()
+            for row in reader if row.get(columns["ticker"]) and row.get(columns["sector"])}
+
+
+def summarize_state(state, elapsed, error=None):
+    """Flattens a finished AgentState into one results-table row."""
+    data = state.get("data", {}) or {}
+    decision = state.get("portfolio_decision", "").strip().splitlines()
+    status = "error" if error or state.get("metadata", {}).get("status") == "error" else "ok"
+    return {
+        "ticker": state.get("ticker"),
+        "status": status,
+        "price": data.get("price", ""),
+        "rsi": data.get("rsi", ""),
+        "decision": decision[0] if decision else "",
+        "trade_approved": state.get("trade_approved", False),
+        "risk_score": state.get("risk_score", 0),
+        "target_qty": state.get("target_qty", 0),
+        "execution_status": state.get("execution_status", ""),
+        "elapsed_s": round(elapsed, 3),
+        "error": error or state.get("metadata", {}).get("error_msg", ""),
+    }
+
+
+def _run_one(state, graph):
+    ticker = state["ticker"]
+    start = time.perf_counter()
+    try:
+        run_pipeline(state, graph=graph)
+        return summarize_state(state, time.perf_counter() - start)
+    except Exception as e:
+        print(colored(f"❌ Pipeline crashed for {ticker}: {e}", "red"))
+        return summarize_state(state, time.perf_counter() - start, error=str(e))
+
+
+def _send_basket(pending, limiter, optimizer_method=None) -> dict:
+    """Sizes `pending` jointly, sends the basket and journals the fills. Returns {ticker: what changed}."""
+    basket = optimize_basket(pending, method=optimizer_method)
+    to_send = []
+    for state in pending:
+        state.update(basket.get(state["ticker"], {"target_qty": 0}))
+        if state["target_qty"] > 0:
+            to_send.append(state)
+        else:
+            state["execution_status"] = "Skipped (Optimizer: 0 shares)"
+
+    if to_send:
+        with limiter.slot("execution"):
+            updates = execute_orders(to_send)
+        for state in to_send:
+            update = updates.get(state["ticker"], {"execution_status": "Skipped (Hold)"})
+            state["execution_status"] = update["execution_status"]
+            state["metadata"] = merge_dicts(state["metadata"], update.get("metadata"))
+            record_trade_node(state)
+    return {s["ticker"]: {**basket.get(s["ticker"], {"target_qty": 0}), "execution_status": s["execution_status"],
+                          "metadata": {"fill": s["metadata"].get("fill")}} for s in pending}
+
+
+def execute_basket(pending, limiter, optimizer_method=None, checkpointer=None):
+    """
+    Phase 2: the Portfolio Optimizer sizes every trade that was approved in phase 1,
+    then the whole basket is submitted at once and its fills tracked together.
+    In a checkpointed run, tickers whose basket already went out in an earlier attempt
+    get their saved fills back and only the rest are sized and sent.
+    """
+    if checkpointer is None:
+        _send_basket(pending, limiter, optimizer_method)
+        return
+    by_ticker = {s["ticker"]: s for s in pending}
+    updates = checkpointer.batch("basket_execution", list(by_ticker), lambda tickers: _send_basket(
+        [by_ticker[t] for t in tickers], limiter, optimizer_method))
+    for ticker, update in updates.items():
+        state = by_ticker[ticker]
+        state.update({k: v for k, v in update.items() if k != "metadata"})
+        state["metadata"] = merge_dicts(state["metadata"], update.get("metadata"))
+
+
+def _checkpointed(checkpointer, stage, tickers, fn) -> dict:
+    """fn(tickers) for a batch stage, replaying per-ticker results saved by an earlier attempt of the run."""
+    if checkpointer is None:
+        return fn(tickers)
+    return checkpointer.batch(stage, tickers, fn)
+
+
+def review_basket(pending, checkpointer=None) -> list:
+    """
+    Phase 1b: the Risk Board again, over every approved trade at once. Each one passed on its own
+    against the full portfolio; together the BUYs share the cash, so the most confident go first
+    and the ones the rest can't afford are vetoed. Returns the trades still approved.
+    """
+    ranked = sorted(pending, key=lambda s: -get_decision(s).confidence)
+    by_ticker = {s["ticker"]: s for s in ranked}
+    reviews = _checkpointed(checkpointer, "batch_risk", list(by_ticker),
+                            lambda tickers: risk_review_batch([by_ticker[t] for t in tickers]))
+    approved = []
+    for ticker, state in by_ticker.items():
+        state.update(reviews[ticker])
+        if state["trade_approved"]:
+            approved.append(state)
+        else:
+            state["execution_status"] = "Skipped (Risk Veto: basket)"
+    return approved
+
+
+def run_universe(tickers, stage_limits=None, max_workers=None, batch_data=True,
+                 batch_technical=True, technical_batch_size=TECH_BATCH_SIZE,
+                 prescreen=True, prescreen_thresholds=None, optimize=True, optimizer_method=None,
+                 batch_reflection=True, run_id=None):
+    """
+    Runs the full agent pipeline for many tickers at once.
+    Each ticker gets its own AgentState; the StageLimiter caps how many tickers are inside each stage.
+    With batch_data, market data for the whole universe is pulled up front in bulk requests.
+    With batch_technical, the Technical Analyst sees many tickers per prompt before the graph runs.
+    With prescreen (needs batch_data), plainly neutral tickers get an automatic HOLD and skip the LLMs.
+    With optimize, approved trades are held back until every ticker is decided, reviewed together
+    by the Risk Board, then sized jointly by the Portfolio Optimizer and executed as one basket.
+    With batch_reflection, the Reflector reviews every unreviewed trade once at the end
+    (a few batched prompts) instead of once per ticker.
+    With a run_id, every stage is checkpointed (src/data/checkpoints.py): running again with the
+    same run_id skips whatever finished, and orders get client_order_ids fixed by the run, so a
+    resumed run can't send the same order twice.
+    """
+    limiter = StageLimiter(stage_limits)
+    workers = max_workers or min(len(tickers), limiter.max_workers) or 1
+
+    print(colored(f"--- 🌐 Universe Run: {len(tickers)} tickers, {workers} workers ---", "cyan"))
+    checkpointer = Checkpointer(run_id) if run_id else None
+    graph = build_graph(limiter, checkpointer)
+    telemetry.new_run(run_id)
+    start = time.perf_counter()
+
+    states = {t: new_state(t) for t in tickers}
+
+    # 1. Universe-wide batch stages (nodes in the graph skip what these fill in)
+    if batch_data:
+        with telemetry.span("batch_data_collection"):
+            batch_results = _checkpointed(checkpointer, "batch_data_collection", tickers, batch_data_collection)
+        for ticker, result in batch_results.items():
+            # A failed bulk fetch is retried by the per-ticker data node
+            if result.get("data"):
+                states[ticker].update(result)
+
+    skipped = []
+    if batch_data and prescreen:
+        _, skipped = prescreen_universe(list(states.values()), prescreen_thresholds)
+    skipped_tickers = {s["ticker"] for s in skipped}
+
+    if batch_technical:
+        ready = {t: s for t, s in states.items() if s["data"] and t not in skipped_tickers}
+        with telemetry.span("batch_technical_analyst"):
+            batch_results = _checkpointed(checkpointer, "batch_technical_analyst", list(ready), lambda missing:
+                                          technical_analyst_batch([ready[t] for t in missing], batch_size=technical_batch_size))
+        for ticker, result in batch_results.items():
+            states[ticker].update(result)
+
+    # 2. Per-ticker graph runs (phase 1: decide; approved orders wait for the optimizer)
+    flags = {}
+    if optimize:
+        flags["defer_execution"] = True
+    if batch_reflection:
+        flags["batch_reflection"] = True
+    if run_id:
+        flags["run_id"] = run_id
+    for state in states.values():
+        state["metadata"] = {**state["metadata"], **flags}
+
+    results = [summarize_state(s, 0.0) for s in skipped]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run_one, states[t], graph): t for t in tickers if t not in skipped_tickers}
+        for future in as_completed(futures):
+            results.append(future.result())
+
+    # 3. Joint risk review, then Portfolio Optimizer + basket execution (phase 2: size and trade)
+    pending = [states[t] for t in tickers if states[t].get("execution_status") == "Pending (Optimizer)"]
+    if pending:
+        try:
+            with telemetry.span("batch_risk"):
+                approved = review_basket(pending, checkpointer)
+        except Exception as e:
+            print(colored(f"❌ Batch Risk Review failed, no orders sent: {e}", "red"))
+            approved = []
+            for state in pending:
+                state["execution_status"] = f"Error: Batch risk review failed ({e})"
+        if approved:
+            try:
+                with telemetry.span("basket_execution"):
+                    execute_basket(approved, limiter, optimizer_method, checkpointer)
+            except Exception as e:
+                print(colored(f"❌ Portfolio Optimizer failed, no orders sent: {e}", "red"))
+                for state in approved:
+                    state["execution_status"] = f"Error: Optimizer failed ({e})"
+        rows = {r["ticker"]: r for r in results}
+        for state in pending:
+            rows[state["ticker"]].update(
+                trade_approved=state.get("trade_approved", False),
+                risk_score=state.get("risk_score", 0),
+                target_qty=state.get("target_qty", 0),
+                execution_status=state.get("execution_status", ""),
+            )
+
+    # Keep the table in input order
+    order = {t: i for i, t in enumerate(tickers)}
+    results.sort(key=lambda r: order.get(r["ticker"], len(order)))
+
+    # Keep the OHLCV cache bounded as the universe changes
+    try:
+        evict()
+    except Exception as e:
+        print(colored(f"⚠️ OHLCV cache eviction failed: {e}", "yellow"))
+
+    # Same for the checkpoint store: old runs go, this one stays resumable
+    if checkpointer is not None:
+        try:
+            prune_checkpoints(older_than_days=CHECKPOINT_RETENTION_DAYS)
+        except Exception as e:
+            print(colored(f"⚠️ Checkpoint pruning failed: {e}", "yellow"))
+
+    # 4. Reflector over every unreviewed trade, priced with this run's data
+    if batch_reflection:
+        try:
+            with telemetry.span("batch_reflector"):
+                reflect_trades({t: s["data"].get("price") for t, s in states.items() if s.get("data")})
+        except Exception as e:
+            print(colored(f"⚠️ Batch Reflector failed: {e}", "yellow"))
+
+    failed_writes = flush_journal()
+    if failed_writes:
+        print(colored(f"❌ {len(failed_writes)} journal rows could not be written (see errors above)", "red"))
+    elapsed = time.perf_counter() - start
+    print(colored(f"--- ✅ Universe Run finished in {elapsed:.1f}s ---", "green"))
+    print_cache_stats()
+    telemetry.finish_run()
+    return results
+
+
+def write_results(results, path):
+    """Writes the universe results table to CSV."""
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(results)
+    print(colored(f"📄 Results written to {path}", "cyan"))
+
+
+def print_results(results):
+    """Prints a compact results table to the terminal."""
+    header = f"{'TICKER':<8} {'PRICE':>10} {'RSI':>7}  {'DECISION':<28} {'EXECUTION'}"
+    print("\n" + "=" * 80)
+    print(header)
+    print("=" * 80)
+    for r in results:
+        price = f"{r['price']:.2f}" if isinstance(r["price"], (int, float)) else "-"
+        rsi = f"{r['rsi']:.1f}" if isinstance(r["rsi"], (int, float)) else "-"
+        line = f"{r['ticker']:<8} {price:>10} {rsi:>7}  {r['decision'][:28]:<28} {r['execution_status'] or r['error']}"
+        print(colored(line, "red") if r["status"] == "error" else line)
+    print("=" * 80)
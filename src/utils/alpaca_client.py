@@ -0,0 +1,194 @@
+import copy
+import itertools
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+from termcolor import colored
+from src.utils import telemetry
+from src.utils.rate_limit import RateBudget
+
+load_dotenv()
+
+# Load Alpaca Keys
+ALPACA_KEY = os.getenv("ALPACA_API_KEY")
+ALPACA_SECRET = os.getenv("ALPACA_SECRET_KEY")
+BASE_URL = os.getenv("ALPACA_BASE_URL", "https://paper-api.alpaca.markets")
+
+HEADERS = {
+    "APCA-API-KEY-ID": ALPACA_KEY,
+    "APCA-API-SECRET-KEY": ALPACA_SECRET,
+    "Content-Type": "application/json"
+}
+
+# CONFIG: Connection pool + timeouts (connect, read) in seconds
+POOL_SIZE = 16
+REQUEST_TIMEOUT = (3.05, 10)
+
+# CONFIG: How long one account/positions snapshot is shared before re-fetching
+SNAPSHOT_TTL_SECONDS = 30
+
+# CONFIG: Alpaca allows 200 API calls/minute per account (orders and polls alike)
+MAX_REQUESTS_PER_MINUTE = int(os.getenv("ALPACA_MAX_RPM", "200"))
+MAX_RATE_LIMIT_RETRIES = 5
+
+# Snapshot versions are unique across clients, so a swapped-in client never reuses one
+_snapshot_versions = itertools.count(1)
+
+
+class AlpacaClient:
+    """
+    One pooled HTTP session to Alpaca, shared by the risk board, execution agent and dashboard.
+    Keeps a short-TTL account/positions snapshot that every ticker in a run reads, and
+    applies our own fills to it locally so later tickers see the cash we just spent.
+    """
+
+    def __init__(self, base_url: str = BASE_URL, headers: dict = None, session: requests.Session = None,
+                 requests_per_minute: int = MAX_REQUESTS_PER_MINUTE):
+        self.base_url = base_url.rstrip("/")
+        self.budget = RateBudget(requests_per_minute)
+        self.session = session or requests.Session()
+        self.session.headers.update(headers or HEADERS)
+
+        # Only idempotent GETs are retried at the HTTP layer; orders are never re-sent blindly
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504),
+                      allowed_methods=frozenset({"GET"}))
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._snapshot = None
+        self._snapshot_at = 0.0
+        self._snapshot_version = 0    # changes with every refresh or fill, so derived views know when to rebuild
+        self._snapshot_lock = threading.Lock()
+
+    # --- Raw REST calls ---
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Every call waits for the shared request budget. A 429 means Alpaca did not process
+        the call, so it is safe to retry (orders included) after Retry-After or a jittered backoff.
+        """
+        kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            wait = self.budget.reserve()
+            if wait > 0:
+                time.sleep(wait)
+            with telemetry.timed("http"):
+                response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+            if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                return response
+            telemetry.count("http_retries")
+            retry_after = response.headers.get("Retry-After")
+            delay = float(retry_after) if retry_after else random.uniform(0, min(30.0, 2 ** attempt))
+            print(colored(f"⏳ Alpaca rate limit hit, retry {attempt + 1}/{MAX_RATE_LIMIT_RETRIES} in {delay:.1f}s", "yellow"))
+            time.sleep(delay)
+
+    def _get_json(self, path: str):
+        response = self.request("GET", path)
+        response.raise_for_status()
+        return response.json()
+
+    def get_account(self) -> dict:
+        return self._get_json("/v2/account")
+
+    def get_positions(self) -> list:
+        return self._get_json("/v2/positions")
+
+    def submit_order(self, order: dict) -> requests.Response:
+        """POSTs an order. Returns the raw response so callers can read Alpaca's error message."""
+        return self.request("POST", "/v2/orders", json=order)
+
+    def get_order(self, order_id: str) -> dict:
+        return self._get_json(f"/v2/orders/{order_id}")
+
+    def get_order_by_client_id(self, client_order_id: str) -> dict:
+        response = self.request("GET", "/v2/orders:by_client_order_id", params={"client_order_id": client_order_id})
+        response.raise_for_status()
+        return response.json()
+
+    def cancel_order(self, order_id: str) -> requests.Response:
+        return self.request("DELETE", f"/v2/orders/{order_id}")
+
+    # --- Shared portfolio snapshot ---
+
+    def _fetch_snapshot(self) -> dict:
+        acct_data = self.get_account()
+        pos_data = self.get_positions()
+        return {
+            "buying_power": float(acct_data.get('buying_power', 0)),
+            "cash": float(acct_data.get('cash', 0)),
+            "equity": float(acct_data.get('equity', 0)),
+            "positions": [
+                {
+                    "symbol": p['symbol'],
+                    "qty": int(float(p['qty'])),
+                    "market_value": float(p['market_value']),
+                    "profit_loss_pct": float(p['unrealized_plpc']) * 100
+                }
+                for p in pos_data
+            ]
+        }
+
+    def portfolio_snapshot(self, max_age: float = SNAPSHOT_TTL_SECONDS) -> dict:
+        """
+        Account + positions, re-fetched at most once per `max_age` seconds.
+        Concurrent callers wait for a single refresh instead of each hitting the API.
+        Returns a copy, so callers may mutate it freely. Its "version" changes whenever the
+        snapshot does (refresh or fill), so anything derived from it can be cached per version.
+        """
+        with self._snapshot_lock:
+            if self._snapshot is None or time.monotonic() - self._snapshot_at > max_age:
+                self._snapshot = self._fetch_snapshot()
+                self._snapshot_at = time.monotonic()
+                self._snapshot_version = next(_snapshot_versions)
+            return {**copy.deepcopy(self._snapshot), "version": self._snapshot_version}
+
+    def apply_fill(self, symbol: str, side: str, qty: float, price: float):
+        """Updates the cached snapshot for one of our fills, without another round trip."""
+        with self._snapshot_lock:
+            if self._snapshot is None:
+                return
+            self._snapshot_version = next(_snapshot_versions)
+            notional = qty * price * (1 if side == "buy" else -1)
+            self._snapshot["cash"] -= notional
+            self._snapshot["buying_power"] -= notional
+
+            positions = self._snapshot["positions"]
+            position = next((p for p in positions if p["symbol"] == symbol), None)
+            if position is None:
+                position = {"symbol": symbol, "qty": 0, "market_value": 0.0, "profit_loss_pct": 0.0}
+                positions.append(position)
+            position["qty"] += qty if side == "buy" else -qty
+            position["market_value"] += notional
+            if position["qty"] <= 0:
+                positions.remove(position)
+
+    def invalidate(self):
+        """Forces the next portfolio_snapshot() to re-fetch."""
+        with self._snapshot_lock:
+            self._snapshot = None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> AlpacaClient:
+    """The process-wide Alpaca client, built on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = AlpacaClient()
+        return _client
+
+
+def set_client(client: AlpacaClient):
+    """Swaps in a different client (e.g. one pointed at a mock broker)."""
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,115 @@
+import json
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import List, Literal
+from pydantic import BaseModel, Field
+
+# Typed records passed between agents. The PM's LLM answers straight into these schemas
+# (structured output), so downstream nodes read fields instead of scanning text.
+
+
+# --- LLM structured-output schemas ---
+
+class PortfolioDecisionSchema(BaseModel):
+    """The Portfolio Manager's answer."""
+    action: Literal["BUY", "SELL", "HOLD"] = Field(description="Final trading decision")
+    confidence: int = Field(ge=0, le=100, description="Conviction, 0-100")
+    reason: str = Field(description="One-sentence reasoning")
+
+
+class RiskVerdictSchema(BaseModel):
+    """The Risk Board's answer for a borderline trade."""
+    risk_score: int = Field(ge=0, le=100, description="0 = safe, 100 = dangerous")
+    verdict: Literal["APPROVED", "REJECTED"]
+    reason: str = Field(description="Explanation based on the portfolio data")
+
+
+class TradeLessonSchema(BaseModel):
+    """One reviewed trade's lesson."""
+    trade_id: int = Field(description="The id of the trade this lesson is about")
+    lesson: str = Field(description="One-sentence trading rule to remember")
+
+
+class ReflectionBatchSchema(BaseModel):
+    """The Reflector's answer for a batch of trades."""
+    lessons: List[TradeLessonSchema]
+
+
+# --- Records carried in AgentState ---
+
+@dataclass(slots=True, frozen=True)
+class TradeDecision:
+    ticker: str
+    action: str            # "BUY" / "SELL" / "HOLD"
+    confidence: float      # 0-1
+    reason: str = ""
+    source: str = "llm"    # "llm", "prescreen" or "fallback"
+
+    @property
+    def side(self):
+        """Order side ("buy"/"sell"), or None for HOLD."""
+        return self.action.lower() if self.action in ("BUY", "SELL") else None
+
+    @property
+    def is_trade(self) -> bool:
+        return self.side is not None
+
+    def text(self) -> str:
+        """Human-readable form, used in prompts, logs and the results table."""
+        label = self.action if self.source == "llm" else f"{self.action} ({self.source.title()})"
+        return f"ACTION: {label}\nCONFIDENCE: {self.confidence:.0%}\nReason: {self.reason}"
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TradeDecision":
+        return cls(**data)
+
+    @classmethod
+    def from_schema(cls, ticker: str, answer: PortfolioDecisionSchema) -> "TradeDecision":
+        return cls(ticker, answer.action, answer.confidence / 100, answer.reason.strip())
+
+    @classmethod
+    def hold(cls, ticker: str, reason: str, source: str = "fallback", confidence: float = 0.0) -> "TradeDecision":
+        return cls(ticker, "HOLD", confidence, reason, source)
+
+
+@dataclass(slots=True)
+class TradeRecord:
+    """One executed trade, as written to the trades table."""
+    ticker: str
+    side: str
+    qty: float
+    price: float
+    reason: str = ""
+    confidence: float = None
+    order_id: str = None
+    timestamp: str = None
+
+    def __post_init__(self):
+        if self.timestamp is None:
+            self.timestamp = datetime.now().isoformat()
+
+    @classmethod
+    def from_fill(cls, decision: TradeDecision, fill: dict) -> "TradeRecord":
+        return cls(fill["symbol"], fill["side"], fill["filled_qty"], fill["filled_avg_price"],
+                   decision.reason, decision.confidence, fill.get("order_id"))
+
+    def as_row(self) -> tuple:
+        """Column order of the trades insert in src/data/storage.py."""
+        return (self.timestamp, self.ticker, self.side, self.qty, self.price,
+                self.reason, self.confidence, self.order_id)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+
+def get_decision(state) -> TradeDecision:
+    """The state's TradeDecision, or a HOLD when the PM hasn't decided."""
+    decision = state.get("decision")
+    if isinstance(decision, TradeDecision):
+        return decision
+    if isinstance(decision, dict) and decision:
+        return TradeDecision.from_dict(decision)
+    return TradeDecision.hold(state.get("ticker", ""), "No decision")
@@ -1,11 +1,18 @@
+import os
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
+from src.utils import indicators_numpy
+
+# CONFIG: Indicator backend ("pandas_ta" or "numpy").
+# Both produce the same columns; "numpy" skips importing pandas_ta entirely.
+INDICATOR_BACKEND = os.getenv("INDICATOR_BACKEND", "pandas_ta")
+
+INDICATOR_COLUMNS = ["RSI", "MACD_12_26_9", "MACDh_12_26_9", "MACDs_12_26_9", "SMA_20", "SMA_50"]
+
+def _pandas_ta_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    # Imported here so the numpy backend never pays for it
+    import pandas_ta as ta  # noqa: F401 (registers the df.ta accessor)
 
-def calculate_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Calculates RSI, MACD, and SMA using pandas-ta.
-    Ref: Synopsis Section 4.5 - Technical Architecture
-    """
     # 1. RSI (Relative Strength Index)
     df['RSI'] = df.ta.rsi(length=14)
 
@@ -16,8 +23,230 @@ def calculate_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
     # 3. SMA (Simple Moving Average)
     df['SMA_20'] = df.ta.sma(length=20)
     df['SMA_50'] = df.ta.sma(length=50)
+    return df
+
+def _numpy_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    values = indicators_numpy.compute_indicators(df["Close"].to_numpy(dtype=float))
+    for column in INDICATOR_COLUMNS:
+        df[column] = values[column]
+    return df
+
+def calculate_technical_indicators(df: pd.DataFrame, backend: str = None) -> pd.DataFrame:
+    """
+    Calculates RSI, MACD, and SMA using pandas-ta (or the NumPy backend).
+    Ref: Synopsis Section 4.5 - Technical Architecture
+    """
+    backend = backend or INDICATOR_BACKEND
+    if backend == "numpy":
+        df = _numpy_indicators(df)
+    else:
+        df = _pandas_ta_indicators(df)
 
     # Clean up NaN values created by indicators
     df.fillna(0, inplace=True)
-    
-    return df
\ No newline at end of file
+
+    return df
+
+def calculate_latest_indicators_batch(frames: dict, backend: str = None) -> dict:
+    """
+    Runs the indicator pass over many tickers' OHLCV frames in one go.
+    Takes {ticker: OHLCV frame} and returns {ticker: latest indicator row}.
+    Tickers with no bars are left out.
+    With the numpy backend every ticker is computed in a single 2D pass.
+    """
+    backend = backend or INDICATOR_BACKEND
+
+    # Each symbol has its own trading calendar (IPOs, halts)
+    frames = {t: f.dropna(subset=["Close"]) if f["Close"].isna().any() else f for t, f in frames.items()}
+    frames = {t: f for t, f in frames.items() if not f.empty}
+
+    if backend != "numpy":
+        return {t: calculate_technical_indicators(f.copy(), backend).iloc[-1] for t, f in frames.items()}
+
+    if not frames:
+        return {}
+
+    # Right-align every close series by bar position: indicators only depend on bar order,
+    # so padding shorter histories with leading NaNs keeps results identical per ticker.
+    tickers = list(frames)
+    bars = max(len(f) for f in frames.values())
+    closes = np.full((bars, len(tickers)), np.nan)
+    for j, t in enumerate(tickers):
+        close = frames[t]["Close"].to_numpy(dtype=float)
+        closes[bars - len(close):, j] = close
+
+    values = indicators_numpy.compute_indicators(closes)
+    last = np.nan_to_num(np.column_stack([values[c][-1] for c in INDICATOR_COLUMNS]))
+
+    latest = {}
+    for j, t in enumerate(tickers):
+        row = frames[t].iloc[-1].to_dict()
+        row.update(zip(INDICATOR_COLUMNS, last[j].tolist()))
+        latest[t] = pd.Series(row, name=frames[t].index[-1]).fillna(0)
+    return latest
+
+class IncrementalIndicators:
+    """
+    Streaming RSI(14), MACD(12,26,9) and SMA 20/50 for a single ticker.
+    update() costs O(1) per bar and returns the same values calculate_technical_indicators
+    would give for the latest row (0.0 while an indicator is still warming up).
+    State round-trips through to_dict() / from_dict() so it can be saved between runs.
+    """
+
+    def __init__(self, rsi_length=14, fast=12, slow=26, signal=9, sma_lengths=(20, 50)):
+        self.rsi_length = rsi_length
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self.sma_lengths = tuple(sma_lengths)
+        self.suffix = f"{fast}_{slow}_{signal}"
+
+        self.bars = 0
+        self.prev_close = None
+
+        # RSI: pandas-ta's RMA is ewm(alpha=1/length, adjust=True), i.e. a weighted mean over
+        # all history. Both averages share the weight total, so only the numerators are needed.
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.rsi_obs = 0
+
+        # EMAs are seeded with the SMA of their first `length` inputs (pandas-ta sma=True)
+        self.ema_fast = self._new_ema(fast)
+        self.ema_slow = self._new_ema(slow)
+        self.ema_signal = self._new_ema(signal)
+
+        # SMA: rolling windows with running sums
+        self.sma_windows = {n: [] for n in self.sma_lengths}
+        self.sma_sums = {n: 0.0 for n in self.sma_lengths}
+        self.sma_heads = {n: 0 for n in self.sma_lengths}
+
+        self.latest = {}
+
+    @staticmethod
+    def _new_ema(length):
+        return {"length": length, "seed_sum": 0.0, "seen": 0, "value": None}
+
+    @staticmethod
+    def _update_ema(ema, x):
+        """Advances one EMA by a bar. Returns the value, or None while seeding."""
+        if ema["value"] is None:
+            ema["seed_sum"] += x
+            ema["seen"] += 1
+            if ema["seen"] == ema["length"]:
+                ema["value"] = ema["seed_sum"] / ema["length"]
+            return ema["value"]
+        alpha = 2.0 / (ema["length"] + 1)
+        ema["value"] = alpha * x + (1.0 - alpha) * ema["value"]
+        return ema["value"]
+
+    def _update_sma(self, n, x):
+        window = self.sma_windows[n]
+        if len(window) < n:
+            window.append(x)
+            self.sma_sums[n] += x
+        else:
+            head = self.sma_heads[n]
+            self.sma_sums[n] += x - window[head]
+            window[head] = x
+            self.sma_heads[n] = (head + 1) % n
+            # Re-sum once per full lap so float drift never builds up
+            if self.sma_heads[n] == 0:
+                self.sma_sums[n] = sum(window)
+        return self.sma_sums[n] / n if len(window) == n else None
+
+    def update(self, close: float) -> dict:
+        """Feeds one new bar's close and returns the latest indicator values."""
+        close = float(close)
+        self.bars += 1
+
+        # 1. RSI
+        rsi = None
+        if self.prev_close is not None:
+            delta = close - self.prev_close
+            decay = 1.0 - 1.0 / self.rsi_length
+            self.gain_sum = max(delta, 0.0) + decay * self.gain_sum
+            self.loss_sum = max(-delta, 0.0) + decay * self.loss_sum
+            self.rsi_obs += 1
+            total = self.gain_sum + self.loss_sum
+            if self.rsi_obs >= self.rsi_length and total > 0:
+                rsi = 100.0 * self.gain_sum / total
+        self.prev_close = close
+
+        # 2. MACD
+        fast = self._update_ema(self.ema_fast, close)
+        slow = self._update_ema(self.ema_slow, close)
+        macd = signal = hist = None
+        if fast is not None and slow is not None:
+            macd = fast - slow
+            signal = self._update_ema(self.ema_signal, macd)
+            if signal is not None:
+                hist = macd - signal
+
+        # 3. SMAs
+        smas = {n: self._update_sma(n, close) for n in self.sma_lengths}
+
+        # Same column names as the pandas-ta frame; warm-up values are 0 like fillna(0)
+        self.latest = {
+            "Close": close,
+            "RSI": rsi or 0.0,
+            f"MACD_{self.suffix}": macd or 0.0,
+            f"MACDh_{self.suffix}": hist or 0.0,
+            f"MACDs_{self.suffix}": signal or 0.0,
+            **{f"SMA_{n}": (v or 0.0) for n, v in smas.items()},
+        }
+        return self.latest
+
+    def warm_up(self, closes) -> dict:
+        """Replays a history of closes (oldest first). Returns the values after the last one."""
+        for close in closes:
+            self.update(close)
+        return self.latest
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame, **kwargs) -> "IncrementalIndicators":
+        """Builds an engine already caught up with an OHLCV frame."""
+        engine = cls(**kwargs)
+        engine.warm_up(df["Close"].dropna().tolist())
+        return engine
+
+    def to_dict(self) -> dict:
+        """JSON-serializable snapshot of the running state."""
+        return {
+            "params": {
+                "rsi_length": self.rsi_length,
+                "fast": self.fast,
+                "slow": self.slow,
+                "signal": self.signal,
+                "sma_lengths": list(self.sma_lengths),
+            },
+            "bars": self.bars,
+            "prev_close": self.prev_close,
+            "gain_sum": self.gain_sum,
+            "loss_sum": self.loss_sum,
+            "rsi_obs": self.rsi_obs,
+            "ema_fast": dict(self.ema_fast),
+            "ema_slow": dict(self.ema_slow),
+            "ema_signal": dict(self.ema_signal),
+            "sma_windows": {str(n): list(w) for n, w in self.sma_windows.items()},
+            "sma_sums": {str(n): s for n, s in self.sma_sums.items()},
+            "sma_heads": {str(n): h for n, h in self.sma_heads.items()},
+            "latest": dict(self.latest),
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "IncrementalIndicators":
+        """Restores an engine saved with to_dict()."""
+        engine = cls(**payload["params"])
+        engine.bars = payload["bars"]
+        engine.prev_close = payload["prev_close"]
+        engine.gain_sum = payload["gain_sum"]
+        engine.loss_sum = payload["loss_sum"]
+        engine.rsi_obs = payload["rsi_obs"]
+        engine.ema_fast = dict(payload["ema_fast"])
+        engine.ema_slow = dict(payload["ema_slow"])
+        engine.ema_signal = dict(payload["ema_signal"])
+        engine.sma_windows = {int(n): list(w) for n, w in payload["sma_windows"].items()}
+        engine.sma_sums = {int(n): s for n, s in payload["sma_sums"].items()}
+        engine.sma_heads = {int(n): h for n, h in payload["sma_heads"].items()}
+        engine.latest = dict(payload["latest"])
+        return engine
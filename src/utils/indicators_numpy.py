@@ -0,0 +1,119 @@
+import numpy as np
+
+# Pure-NumPy versions of the pandas-ta indicators used by calculate_technical_indicators.
+# Every function takes closes shaped (bars,) or (bars, tickers), oldest bar first.
+# Columns may start late (leading NaNs, e.g. recent IPOs) but must not have gaps after that.
+
+# Rows per vectorized block in _linear_recurrence; keeps decay**-i far from overflow
+_BLOCK = 128
+
+
+def _as_2d(close):
+    arr = np.asarray(close, dtype=float)
+    return (arr[:, None], True) if arr.ndim == 1 else (arr, False)
+
+
+def _first_valid(x):
+    valid = ~np.isnan(x)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), x.shape[0])
+
+
+def _linear_recurrence(u, decay):
+    """
+    Solves y[t] = decay * y[t-1] + u[t] (y[-1] = 0) down the rows of u, all columns at once.
+    Each block of rows is a scaled cumsum, so the Python loop is over blocks, not bars.
+    """
+    y = np.empty_like(u)
+    carry = np.zeros(u.shape[1])
+    powers = decay ** np.arange(_BLOCK, dtype=float)
+    for start in range(0, u.shape[0], _BLOCK):
+        block = u[start:start + _BLOCK]
+        p = powers[:len(block), None]
+        y[start:start + _BLOCK] = p * (decay * carry + np.cumsum(block / p, axis=0))
+        carry = y[start + len(block) - 1]
+    return y
+
+
+def ema(close, length):
+    """pandas-ta ema: seeded with the SMA of the first `length` values, then ewm(adjust=False)."""
+    x, flat = _as_2d(close)
+    bars, n = x.shape
+    alpha = 2.0 / (length + 1)
+
+    start = _first_valid(x)
+    seed_row = start + length - 1
+    seeded = seed_row < bars
+
+    # Seed = mean of the first `length` valid values in each column
+    csum = np.cumsum(np.nan_to_num(x), axis=0)
+    cols = np.arange(n)[seeded]
+    seed = np.full(n, np.nan)
+    before = np.where(start[seeded] > 0, csum[np.maximum(start[seeded] - 1, 0), cols], 0.0)
+    seed[seeded] = (csum[seed_row[seeded], cols] - before) / length
+
+    rows = np.arange(bars)[:, None]
+    u = np.where(rows > seed_row, alpha * np.nan_to_num(x), 0.0)
+    u[seed_row[seeded], cols] = seed[seeded]
+
+    out = _linear_recurrence(u, 1.0 - alpha)
+    out[rows < seed_row] = np.nan
+    return out[:, 0] if flat else out
+
+
+def sma(close, length):
+    """Rolling mean with min_periods=length."""
+    x, flat = _as_2d(close)
+    valid = ~np.isnan(x)
+    csum = np.cumsum(np.nan_to_num(x), axis=0)
+    ccount = np.cumsum(valid, axis=0)
+
+    out = np.full(x.shape, np.nan)
+    if x.shape[0] >= length:
+        window_sum = csum[length - 1:].copy()
+        window_sum[1:] -= csum[:-length]
+        window_count = ccount[length - 1:].copy()
+        window_count[1:] -= ccount[:-length]
+        out[length - 1:] = np.where(window_count == length, window_sum / length, np.nan)
+    return out[:, 0] if flat else out
+
+
+def rsi(close, length=14):
+    """pandas-ta rsi: Wilder averages as ewm(alpha=1/length, adjust=True, min_periods=length)."""
+    x, flat = _as_2d(close)
+    delta = np.full(x.shape, np.nan)
+    delta[1:] = x[1:] - x[:-1]
+    valid = ~np.isnan(delta)
+
+    gain = np.where(valid, np.clip(np.nan_to_num(delta), 0.0, None), 0.0)
+    loss = np.where(valid, np.clip(-np.nan_to_num(delta), 0.0, None), 0.0)
+
+    # Gains and losses share the same weights, so the normalizer cancels out
+    decay = 1.0 - 1.0 / length
+    gain_sum = _linear_recurrence(gain, decay)
+    loss_sum = _linear_recurrence(loss, decay)
+    total = gain_sum + loss_sum
+
+    ready = (np.cumsum(valid, axis=0) >= length) & (total > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.where(ready, 100.0 * gain_sum / total, np.nan)
+    return out[:, 0] if flat else out
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """pandas-ta macd: (macd line, histogram, signal line)."""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, line - signal_line, signal_line
+
+
+def compute_indicators(close) -> dict:
+    """All columns calculate_technical_indicators adds, keyed by the pandas-ta column names."""
+    line, hist, signal_line = macd(close, 12, 26, 9)
+    return {
+        "RSI": rsi(close, 14),
+        "MACD_12_26_9": line,
+        "MACDh_12_26_9": hist,
+        "MACDs_12_26_9": signal_line,
+        "SMA_20": sma(close, 20),
+        "SMA_50": sma(close, 50),
+    }
@@ -0,0 +1,220 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from termcolor import colored
+from src.utils import telemetry
+
+# CONFIG: Which cache to use ("sqlite", "memory" or "off")
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE", "sqlite")
+LLM_CACHE_DB_PATH = "llm_cache.db"
+
+# TTL per agent role. Prompts embed live numbers, so identical prompts are safe to reuse
+# for a while; the risk board also embeds the portfolio, so it expires fastest.
+ROLE_TTL_SECONDS = {
+    "fundamental_analyst": 24 * 60 * 60,
+    "technical_analyst": 4 * 60 * 60,
+    "portfolio_manager": 4 * 60 * 60,
+    "risk_manager": 15 * 60,
+    "reflector": 24 * 60 * 60,
+}
+DEFAULT_TTL_SECONDS = 60 * 60
+
+# LRU cap on stored responses
+MAX_ENTRIES = 50_000
+
+
+def prompt_key(model: str, prompt: str) -> str:
+    """Cache key: hash of (model, exact prompt text)."""
+    return hashlib.sha256(f"{model}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Base class for LLM response caches. Subclasses implement _get/_put; this class keeps
+    per-role hit/miss counters. Errors are never cached: only successful responses get stored.
+    """
+
+    def __init__(self, ttl=None, max_entries: int = MAX_ENTRIES):
+        self.ttl = dict(ROLE_TTL_SECONDS)
+        if ttl:
+            self.ttl.update(ttl)
+        self.max_entries = max_entries
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+
+    def ttl_for(self, role: str) -> float:
+        return self.ttl.get(role, DEFAULT_TTL_SECONDS)
+
+    def _count(self, role, field):
+        with self._stats_lock:
+            counts = self._stats.setdefault(role, {"hits": 0, "misses": 0})
+            counts[field] += 1
+
+    def get(self, role: str, key: str):
+        value = self._get(role, key)
+        self._count(role, "hits" if value is not None else "misses")
+        telemetry.count("llm_cache_hits" if value is not None else "llm_cache_misses")
+        return value
+
+    def put(self, role: str, key: str, model: str, response: str):
+        self._put(role, key, model, response)
+
+    def stats(self) -> dict:
+        """{role: {"hits": n, "misses": n}} plus a "total" row."""
+        with self._stats_lock:
+            stats = {role: dict(c) for role, c in self._stats.items()}
+        stats["total"] = {
+            "hits": sum(c["hits"] for c in stats.values()),
+            "misses": sum(c["misses"] for c in stats.values()),
+        }
+        return stats
+
+    def _get(self, role, key):
+        raise NotImplementedError
+
+    def _put(self, role, key, model, response):
+        raise NotImplementedError
+
+
+class NullCache(ResponseCache):
+    """Caching disabled: every lookup is a miss."""
+
+    def _get(self, role, key):
+        return None
+
+    def _put(self, role, key, model, response):
+        pass
+
+
+class MemoryCache(ResponseCache):
+    """In-process LRU cache (lost on exit)."""
+
+    def __init__(self, ttl=None, max_entries: int = MAX_ENTRIES):
+        super().__init__(ttl, max_entries)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def _get(self, role, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, response = entry
+            if time.time() - created_at > self.ttl_for(role):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def _put(self, role, key, model, response):
+        with self._lock:
+            self._entries[key] = (time.time(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteCache(ResponseCache):
+    """Default cache: survives restarts, so re-runs and retries after a crash hit it."""
+
+    # How many inserts between LRU trims
+    TRIM_EVERY = 100
+
+    def __init__(self, path: str = LLM_CACHE_DB_PATH, ttl=None, max_entries: int = MAX_ENTRIES):
+        super().__init__(ttl, max_entries)
+        self.path = path
+        self._write_lock = threading.Lock()
+        self._puts = 0
+
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                role TEXT,
+                model TEXT,
+                created_at REAL,
+                last_access REAL,
+                response TEXT
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_responses_access ON llm_responses (last_access)')
+        conn.commit()
+        conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _get(self, role, key):
+        conn = self._connect()
+        row = conn.execute('SELECT created_at, response FROM llm_responses WHERE key = ?', (key,)).fetchone()
+        conn.close()
+        if row is None:
+            return None
+
+        created_at, response = row
+        now = time.time()
+        with self._write_lock:
+            conn = self._connect()
+            if now - created_at > self.ttl_for(role):
+                conn.execute('DELETE FROM llm_responses WHERE key = ?', (key,))
+                response = None
+            else:
+                conn.execute('UPDATE llm_responses SET last_access = ? WHERE key = ?', (now, key))
+            conn.commit()
+            conn.close()
+        return response
+
+    def _put(self, role, key, model, response):
+        now = time.time()
+        with self._write_lock:
+            conn = self._connect()
+            conn.execute('INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?, ?)',
+                         (key, role, model, now, now, response))
+            self._puts += 1
+            if self._puts % self.TRIM_EVERY == 0:
+                conn.execute('''
+                    DELETE FROM llm_responses WHERE key IN (
+                        SELECT key FROM llm_responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                    )
+                ''', (self.max_entries,))
+            conn.commit()
+            conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Returns the process-wide cache, building it from LLM_CACHE on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            if LLM_CACHE_BACKEND == "off":
+                _cache = NullCache()
+            elif LLM_CACHE_BACKEND == "memory":
+                _cache = MemoryCache()
+            else:
+                _cache = SQLiteCache()
+        return _cache
+
+
+def set_response_cache(cache: ResponseCache):
+    """Swaps in a different cache implementation (e.g. a shared one, or NullCache for live runs)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def print_cache_stats():
+    stats = get_response_cache().stats()
+    total = stats.pop("total")
+    calls = total["hits"] + total["misses"]
+    if not calls:
+        return
+    print(colored(f"🗄️ LLM cache: {total['hits']}/{calls} hits ({100 * total['hits'] / calls:.0f}%)", "cyan"))
+    for role, counts in sorted(stats.items()):
+        print(f"   {role:<20} hits={counts['hits']:<5} misses={counts['misses']}")
@@ -0,0 +1,306 @@
+import asyncio
+import contextlib
+import os
+import random
+import threading
+import time
+from dotenv import load_dotenv
+from termcolor import colored
+from src.utils import telemetry
+from src.utils.llm_cache import get_response_cache, prompt_key
+from src.utils.rate_limit import RateBudget
+
+# Single entry point for every agent's LLM call:
+# cache -> request/token budget -> in-flight semaphore -> call with backoff on 429s.
+# Threads and event loops share one in-flight semaphore, so together they stay under MAX_IN_FLIGHT.
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+MODEL_NAME = os.getenv("LLM_MODEL", "gemini-2.0-flash")
+MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+MAX_REQUESTS_PER_MINUTE = int(os.getenv("LLM_MAX_RPM", "1000"))
+MAX_TOKENS_PER_MINUTE = int(os.getenv("LLM_MAX_TPM", "1000000"))
+REQUEST_TIMEOUT_SECONDS = 60
+
+# Retry policy: exponential backoff with full jitter
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+TRANSIENT_STATUS_CODES = {500, 502, 503, 504}
+
+# How often an async caller re-tries for a free in-flight slot (it never blocks the event loop)
+ASYNC_SLOT_POLL_SECONDS = 0.005
+
+# Budget estimate for a call before we know its real usage
+EXPECTED_OUTPUT_TOKENS = 200
+CHARS_PER_TOKEN = 4
+
+
+_budget = RateBudget(MAX_REQUESTS_PER_MINUTE, MAX_TOKENS_PER_MINUTE)
+_in_flight = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+
+_llm = None
+_llm_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "retries": 0, "rate_limited": 0, "failures": 0, "wait_seconds": 0.0}
+
+
+def get_llm():
+    """The shared Gemini client, built on first use. Retries are handled here, not by the client."""
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
+            api_key = os.getenv("GOOGLE_API_KEY")
+            if not api_key:
+                print(colored("CRITICAL ERROR: GOOGLE_API_KEY not found", "red"))
+            _llm = ChatGoogleGenerativeAI(
+                model=MODEL_NAME,
+                temperature=0,
+                google_api_key=api_key,
+                max_retries=0,
+                timeout=REQUEST_TIMEOUT_SECONDS
+            )
+        return _llm
+
+
+def set_llm(llm):
+    """Swaps in a different chat model (e.g. a fake for offline runs)."""
+    global _llm
+    with _llm_lock:
+        _llm = llm
+
+
+def _count(field, amount=1):
+    with _stats_lock:
+        _stats[field] += amount
+
+
+def gateway_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def status_code(error: Exception):
+    """
+    The HTTP status of a failed call, or None. Looks at the error and what it wraps
+    (LangChain re-raises the Google API error): `status_code`, an int `code`, or `response.status_code`.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        for status in (getattr(error, "status_code", None), getattr(error, "code", None),
+                       getattr(getattr(error, "response", None), "status_code", None)):
+            if isinstance(status, int) and not isinstance(status, bool):
+                return status
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def is_rate_limit(error: Exception) -> bool:
+    text = str(error).upper()
+    return (status_code(error) == 429
+            or "RESOURCE_EXHAUSTED" in text or "RATE LIMIT" in text or "QUOTA" in text)
+
+
+def is_transient(error: Exception) -> bool:
+    return isinstance(error, (TimeoutError, ConnectionError)) or status_code(error) in TRANSIENT_STATUS_CODES
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full jitter: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+def estimate_tokens(prompt: str) -> int:
+    return len(prompt) // CHARS_PER_TOKEN + EXPECTED_OUTPUT_TOKENS
+
+
+def _settle_usage(response, estimated: int):
+    usage = getattr(response, "usage_metadata", None) or {}
+    actual = usage.get("total_tokens")
+    if actual:
+        _budget.adjust(actual - estimated)
+    # Structured-output runnables return the parsed object, without usage: fall back to the estimate
+    telemetry.count("llm_prompt_tokens", usage.get("input_tokens", estimated - EXPECTED_OUTPUT_TOKENS))
+    telemetry.count("llm_completion_tokens", usage.get("output_tokens", 0))
+
+
+def _should_retry(role: str, error: Exception, attempt: int) -> float:
+    """Returns the backoff delay if the call should be retried, else None."""
+    rate_limited = is_rate_limit(error)
+    if rate_limited:
+        _count("rate_limited")
+    if attempt >= MAX_RETRIES or not (rate_limited or is_transient(error)):
+        _count("failures")
+        return None
+    _count("retries")
+    telemetry.count("llm_retries")
+    delay = backoff_delay(attempt)
+    reason = "Rate limited" if rate_limited else "Transient error"
+    print(colored(f"⏳ {reason} ({role}), retry {attempt + 1}/{MAX_RETRIES} in {delay:.1f}s", "yellow"))
+    return delay
+
+
+def _runnable(schema=None):
+    llm = get_llm()
+    if schema is None:
+        return llm
+    try:
+        return llm.with_structured_output(schema)
+    except (AttributeError, NotImplementedError):
+        # No native structured output: _content() validates the JSON in its text reply
+        return llm
+
+
+def _content(response, schema=None):
+    """Text for plain calls; a validated schema instance for structured ones."""
+    if schema is None:
+        return response.content
+    if isinstance(response, schema):
+        return response
+    if isinstance(response, dict):
+        return schema.model_validate(response)
+    # Models without native structured output answer in text: read the JSON out of it
+    text = getattr(response, "content", response)
+    return schema.model_validate_json(_extract_json(text))
+
+
+def _extract_json(text: str) -> str:
+    start, end = text.find("{"), text.rfind("}")
+    return text[start:end + 1] if start != -1 and end > start else text
+
+
+def _messages(prompt: str):
+    # Imported on first call: langchain_core is slow to import and cached runs never need it
+    from langchain_core.messages import HumanMessage
+    return [HumanMessage(content=prompt)]
+
+
+def _call(role: str, prompt: str, schema=None):
+    estimated = estimate_tokens(prompt)
+    for attempt in range(MAX_RETRIES + 1):
+        wait = _budget.reserve(estimated)
+        if wait > 0:
+            _count("wait_seconds", wait)
+            telemetry.count("llm_wait_seconds", wait)
+            time.sleep(wait)
+
+        with _in_flight, telemetry.timed("llm"):
+            try:
+                _count("calls")
+                response = _runnable(schema).invoke(_messages(prompt))
+                _settle_usage(response, estimated)
+                return _content(response, schema)
+            except Exception as e:
+                error = e
+
+        delay = _should_retry(role, error, attempt)
+        if delay is None:
+            raise error
+        time.sleep(delay)
+
+
+@contextlib.asynccontextmanager
+async def _async_slot():
+    """A slot of the same in-flight semaphore the sync path uses, awaited without blocking the loop."""
+    while not _in_flight.acquire(blocking=False):
+        await asyncio.sleep(ASYNC_SLOT_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        _in_flight.release()
+
+
+async def _acall(role: str, prompt: str, schema=None):
+    estimated = estimate_tokens(prompt)
+    for attempt in range(MAX_RETRIES + 1):
+        wait = _budget.reserve(estimated)
+        if wait > 0:
+            _count("wait_seconds", wait)
+            telemetry.count("llm_wait_seconds", wait)
+            await asyncio.sleep(wait)
+
+        async with _async_slot():
+            try:
+                _count("calls")
+                with telemetry.timed("llm"):
+                    response = await _runnable(schema).ainvoke(_messages(prompt))
+                _settle_usage(response, estimated)
+                return _content(response, schema)
+            except Exception as e:
+                error = e
+
+        delay = _should_retry(role, error, attempt)
+        if delay is None:
+            raise error
+        await asyncio.sleep(delay)
+
+
+def invoke(role: str, prompt: str) -> str:
+    """
+    Sends one prompt through the shared gateway and returns the response text.
+    `role` picks the cache TTL. Raises the last error once retries are exhausted.
+    """
+    cache = get_response_cache()
+    key = prompt_key(MODEL_NAME, prompt)
+    cached = cache.get(role, key)
+    if cached is not None:
+        return cached
+
+    content = _call(role, prompt)
+    cache.put(role, key, MODEL_NAME, content)
+    return content
+
+
+async def ainvoke(role: str, prompt: str) -> str:
+    """
+    Async version of invoke() for callers running on an event loop.
+    The cache is SQLite, so its reads and writes run on a worker thread.
+    """
+    cache = get_response_cache()
+    key = prompt_key(MODEL_NAME, prompt)
+    cached = await asyncio.to_thread(cache.get, role, key)
+    if cached is not None:
+        return cached
+
+    content = await _acall(role, prompt)
+    await asyncio.to_thread(cache.put, role, key, MODEL_NAME, content)
+    return content
+
+
+def _structured_key(prompt: str, schema) -> str:
+    # The schema is part of the request, so it is part of the key
+    return prompt_key(MODEL_NAME, f"{schema.__name__}\x00{prompt}")
+
+
+def invoke_structured(role: str, prompt: str, schema):
+    """
+    Like invoke(), but the model answers straight into `schema` (a pydantic model)
+    and a validated instance comes back. Cached as JSON.
+    """
+    cache = get_response_cache()
+    key = _structured_key(prompt, schema)
+    cached = cache.get(role, key)
+    if cached is not None:
+        return schema.model_validate_json(cached)
+
+    answer = _call(role, prompt, schema)
+    cache.put(role, key, MODEL_NAME, answer.model_dump_json())
+    return answer
+
+
+async def ainvoke_structured(role: str, prompt: str, schema):
+    """Async version of invoke_structured(); cache access off the event loop, like ainvoke()."""
+    cache = get_response_cache()
+    key = _structured_key(prompt, schema)
+    cached = await asyncio.to_thread(cache.get, role, key)
+    if cached is not None:
+        return schema.model_validate_json(cached)
+
+    answer = await _acall(role, prompt, schema)
+    await asyncio.to_thread(cache.put, role, key, MODEL_NAME, answer.model_dump_json())
+    return answer
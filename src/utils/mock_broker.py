@@ -0,0 +1,395 @@
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import requests
+from requests.adapters import BaseAdapter
+from src.utils.alpaca_client import AlpacaClient
+
+# In-process stand-in for the Alpaca trading REST API (account, positions, orders).
+# It plugs into AlpacaClient as a requests transport, so the pooled client, rate budget,
+# order manager and agents all run unchanged, just without the network.
+# MockBrokerServer serves the same broker over real HTTP on localhost, when the socket,
+# connection pool and JSON round trip should be part of what is measured.
+
+MOCK_BASE_URL = "http://mock-broker.local"
+
+TERMINAL_STATUSES = {"filled", "canceled", "expired", "rejected"}
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class MockBroker:
+    """
+    Orders are accepted immediately and filled `fill_delay` seconds later at the current
+    price plus `slippage_bps` against us. With `partial_fill_prob`, an order first fills
+    half, then the rest one `fill_delay` later. Buys need cash and sells need shares,
+    reserved at submit time like a real cash account.
+    """
+
+    def __init__(self, cash: float = 100_000.0, prices: dict = None, fill_delay: float = 0.05,
+                 slippage_bps: float = 5.0, partial_fill_prob: float = 0.0, latency: float = 0.0,
+                 max_requests_per_minute: int = None, seed: int = None):
+        self.cash = float(cash)
+        self.prices = dict(prices or {})
+        self.fill_delay = fill_delay
+        self.slippage_bps = slippage_bps
+        self.partial_fill_prob = partial_fill_prob
+        self.latency = latency
+        self.max_requests_per_minute = max_requests_per_minute
+
+        self.positions = {}    # symbol -> {"qty", "cost"}
+        self.orders = {}       # id -> order dict
+        self._open = {}        # id -> order, until it reaches a terminal status
+        self._client_ids = {}         # client_order_id -> order id
+        self._schedule = []    # heap of (fill time, seq, order id)
+        self._seq = itertools.count()
+        self._reserved_cash = 0.0
+        self._reserved_shares = {}
+        self.stats = {"requests": 0, "orders": 0, "fills": 0, "rejected": 0, "rate_limited": 0}
+        self._lock = threading.RLock()
+        self._random = random.Random(seed)
+        self._recent = deque()
+
+    # --- Market ---
+
+    def set_price(self, symbol: str, price: float):
+        with self._lock:
+            self.prices[symbol] = float(price)
+
+    def set_prices(self, prices: dict):
+        with self._lock:
+            self.prices.update({s: float(p) for s, p in prices.items()})
+
+    # --- Order lifecycle ---
+
+    def _fill(self, order, qty: float):
+        price = self.prices[order["symbol"]]
+        sign = 1 if order["side"] == "buy" else -1
+        fill_price = price * (1 + sign * self.slippage_bps / 10_000)
+
+        # Release what this fill had reserved at submit time
+        if order["side"] == "buy":
+            self._reserved_cash -= qty * order["_reserve_price"]
+        else:
+            self._reserved_shares[order["symbol"]] -= qty
+
+        filled = order["filled_qty"]
+        order["filled_avg_price"] = (order["filled_avg_price"] * filled + fill_price * qty) / (filled + qty)
+        order["filled_qty"] = filled + qty
+
+        position = self.positions.setdefault(order["symbol"], {"qty": 0.0, "cost": 0.0})
+        if order["side"] == "buy":
+            self.cash -= fill_price * qty
+            position["qty"] += qty
+            position["cost"] += fill_price * qty
+        else:
+            self.cash += fill_price * qty
+            # Cost basis leaves at the average cost, not the sale price
+            position["cost"] -= position["cost"] / position["qty"] * qty if position["qty"] else 0.0
+            position["qty"] -= qty
+            if position["qty"] <= 0:
+                del self.positions[order["symbol"]]
+
+        self.stats["fills"] += 1
+        order["updated_at"] = _now_iso()
+        if order["filled_qty"] >= order["qty"]:
+            order["status"] = "filled"
+            order["filled_at"] = order["updated_at"]
+        else:
+            order["status"] = "partially_filled"
+
+    def _advance(self, order, now: float):
+        """Lazily moves an order along its schedule whenever someone looks at it."""
+        while order["status"] not in TERMINAL_STATUSES and order["_fills"] and order["_fills"][0][0] <= now:
+            _, qty = order["_fills"].popleft()
+            self._fill(order, qty)
+        if order["status"] in TERMINAL_STATUSES:
+            self._open.pop(order["id"], None)
+
+    def _advance_all(self):
+        """Applies every fill that has come due, in time order."""
+        now = time.monotonic()
+        while self._schedule and self._schedule[0][0] <= now:
+            _, _, order_id = heapq.heappop(self._schedule)
+            order = self._open.get(order_id)
+            if order is not None:
+                self._advance(order, now)
+
+    def _reserved(self):
+        """Cash and shares tied up in open orders."""
+        return self._reserved_cash, self._reserved_shares
+
+    def _release(self, order):
+        remaining = order["qty"] - order["filled_qty"]
+        if order["side"] == "buy":
+            self._reserved_cash -= remaining * order["_reserve_price"]
+        else:
+            self._reserved_shares[order["symbol"]] -= remaining
+
+    def _view(self, order) -> dict:
+        """Order as Alpaca serializes it (numbers as strings)."""
+        view = {k: v for k, v in order.items() if not k.startswith("_")}
+        view["qty"] = str(order["qty"])
+        view["filled_qty"] = str(order["filled_qty"])
+        view["filled_avg_price"] = str(order["filled_avg_price"]) if order["filled_qty"] else None
+        return view
+
+    # --- REST handlers ---
+
+    def _account(self):
+        self._advance_all()
+        reserved_cash, _ = self._reserved()
+        equity = self.cash + sum(p["qty"] * self.prices.get(s, 0.0) for s, p in self.positions.items())
+        return 200, {
+            "cash": str(self.cash),
+            "buying_power": str(self.cash - reserved_cash),
+            "equity": str(equity),
+            "portfolio_value": str(equity),
+            "status": "ACTIVE",
+        }
+
+    def _positions(self):
+        self._advance_all()
+        rows = []
+        for symbol, p in self.positions.items():
+            price = self.prices.get(symbol, 0.0)
+            market_value = p["qty"] * price
+            rows.append({
+                "symbol": symbol,
+                "qty": str(p["qty"]),
+                "avg_entry_price": str(p["cost"] / p["qty"] if p["qty"] else 0.0),
+                "current_price": str(price),
+                "market_value": str(market_value),
+                "unrealized_pl": str(market_value - p["cost"]),
+                "unrealized_plpc": str((market_value - p["cost"]) / p["cost"] if p["cost"] else 0.0),
+            })
+        return 200, rows
+
+    def _submit(self, body):
+        symbol, side = body.get("symbol"), body.get("side")
+        try:
+            qty = float(body.get("qty"))
+        except (TypeError, ValueError):
+            return 422, {"code": 40010001, "message": "qty is required"}
+        if side not in ("buy", "sell") or qty <= 0:
+            return 422, {"code": 40010001, "message": "invalid side or qty"}
+        if symbol not in self.prices:
+            return 422, {"code": 40010001, "message": f"asset {symbol} is not tradable"}
+        client_id = body.get("client_order_id") or str(uuid.uuid4())
+        if client_id in self._client_ids:
+            return 422, {"code": 40010001, "message": "client_order_id must be unique"}
+
+        self._advance_all()
+        reserved_cash, reserved_shares = self._reserved()
+        if side == "buy" and qty * self.prices[symbol] > self.cash - reserved_cash:
+            self.stats["rejected"] += 1
+            return 403, {"code": 40310000, "message": "insufficient buying power"}
+        held = self.positions.get(symbol, {}).get("qty", 0.0) - reserved_shares.get(symbol, 0.0)
+        if side == "sell" and qty > held:
+            self.stats["rejected"] += 1
+            return 403, {"code": 40310000, "message": "insufficient qty available for order"}
+
+        now = time.monotonic()
+        if self._random.random() < self.partial_fill_prob and qty >= 2:
+            first = float(int(qty // 2))
+            fills = deque([(now + self.fill_delay, first), (now + 2 * self.fill_delay, qty - first)])
+        else:
+            fills = deque([(now + self.fill_delay, qty)])
+
+        order = {
+            "id": str(uuid.uuid4()),
+            "client_order_id": client_id,
+            "symbol": symbol,
+            "side": side,
+            "type": body.get("type", "market"),
+            "time_in_force": body.get("time_in_force", "day"),
+            "qty": qty,
+            "filled_qty": 0.0,
+            "filled_avg_price": 0.0,
+            "status": "accepted",
+            "submitted_at": _now_iso(),
+            "updated_at": _now_iso(),
+            "filled_at": None,
+            "_fills": fills,
+            "_reserve_price": self.prices[symbol],
+        }
+        self.orders[order["id"]] = order
+        self._open[order["id"]] = order
+        self._client_ids[client_id] = order["id"]
+        if side == "buy":
+            self._reserved_cash += qty * order["_reserve_price"]
+        else:
+            self._reserved_shares[symbol] = self._reserved_shares.get(symbol, 0.0) + qty
+        for fill_time, _ in fills:
+            heapq.heappush(self._schedule, (fill_time, next(self._seq), order["id"]))
+        self.stats["orders"] += 1
+        self._advance(order, now)
+        return 200, self._view(order)
+
+    def _get_order(self, order_id):
+        order = self.orders.get(order_id)
+        if order is None:
+            return 404, {"code": 40410000, "message": "order not found"}
+        self._advance(order, time.monotonic())
+        return 200, self._view(order)
+
+    def _get_by_client_id(self, client_order_id):
+        order_id = self._client_ids.get(client_order_id)
+        if order_id is None:
+            return 404, {"code": 40410000, "message": "order not found"}
+        return self._get_order(order_id)
+
+    def _cancel(self, order_id):
+        order = self.orders.get(order_id)
+        if order is None:
+            return 404, {"code": 40410000, "message": "order not found"}
+        self._advance(order, time.monotonic())
+        if order["status"] in TERMINAL_STATUSES:
+            return 422, {"code": 42210000, "message": f"order is already {order['status']}"}
+        self._release(order)
+        order["status"] = "canceled"
+        order["_fills"].clear()
+        self._open.pop(order_id, None)
+        return 204, None
+
+    def _rate_limited(self) -> bool:
+        if not self.max_requests_per_minute:
+            return False
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 60:
+            self._recent.popleft()
+        if len(self._recent) >= self.max_requests_per_minute:
+            self.stats["rate_limited"] += 1
+            return True
+        self._recent.append(now)
+        return False
+
+    def handle(self, method: str, path: str, body=None):
+        """Routes one REST call (`path` may carry a query string). Returns (status_code, json payload, headers)."""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.stats["requests"] += 1
+            if self._rate_limited():
+                return 429, {"code": 42910000, "message": "rate limit exceeded"}, {"Retry-After": "1"}
+
+            url = urlsplit(path)
+            parts = [p for p in url.path.split("/") if p]
+            if parts[:2] == ["v2", "account"]:
+                status, payload = self._account()
+            elif parts[:2] == ["v2", "positions"]:
+                status, payload = self._positions()
+            elif parts[:2] == ["v2", "orders"] and len(parts) == 2 and method == "POST":
+                status, payload = self._submit(body or {})
+            elif parts[:2] == ["v2", "orders:by_client_order_id"] and method == "GET":
+                status, payload = self._get_by_client_id(parse_qs(url.query).get("client_order_id", [""])[0])
+            elif parts[:2] == ["v2", "orders"] and len(parts) == 3 and method == "GET":
+                status, payload = self._get_order(parts[2])
+            elif parts[:2] == ["v2", "orders"] and len(parts) == 3 and method == "DELETE":
+                status, payload = self._cancel(parts[2])
+            else:
+                status, payload = 404, {"code": 40410000, "message": f"no route for {method} {path}"}
+        return status, payload, {}
+
+    def client(self, requests_per_minute: int = 1_000_000) -> AlpacaClient:
+        """An AlpacaClient whose HTTP calls are served by this broker."""
+        client = AlpacaClient(base_url=MOCK_BASE_URL, headers={"Content-Type": "application/json"},
+                              requests_per_minute=requests_per_minute)
+        client.session.mount(MOCK_BASE_URL, MockBrokerAdapter(self))
+        return client
+
+
+class MockBrokerAdapter(BaseAdapter):
+    """requests transport that hands each call to a MockBroker instead of the network."""
+
+    def __init__(self, broker: MockBroker):
+        super().__init__()
+        self.broker = broker
+
+    def send(self, request, **kwargs):
+        body = json.loads(request.body) if request.body else None
+        status, payload, headers = self.broker.handle(request.method, request.path_url, body)
+
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(payload).encode() if payload is not None else b""
+        response.headers["Content-Type"] = "application/json"
+        response.headers.update(headers)
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class _BrokerRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the pooled session expects
+
+    def _serve(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        status, payload, headers = self.server.broker.handle(self.command, self.path, body)
+        content = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_DELETE = _serve
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockBrokerServer:
+    """
+    Serves a MockBroker as an Alpaca-compatible REST endpoint on 127.0.0.1 (a free port by default),
+    from a background thread. Use as a context manager, or call start() / stop().
+    """
+
+    def __init__(self, broker: MockBroker, port: int = 0):
+        self.broker = broker
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _BrokerRequestHandler)
+        self._server.daemon_threads = True
+        self._server.broker = broker
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockBrokerServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-broker-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def client(self, requests_per_minute: int = 1_000_000) -> AlpacaClient:
+        """An AlpacaClient pointed at this server over HTTP."""
+        return AlpacaClient(base_url=self.url, headers={"Content-Type": "application/json"},
+                            requests_per_minute=requests_per_minute)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,118 @@
+import numpy as np
+
+# Portfolio math for the optimizer stage: shrinkage covariance and long-only solvers
+# under per-asset caps. Pure NumPy, sized for a few hundred assets per call.
+
+# CONFIG: Solver limits
+MAX_ITERATIONS = 500
+TOLERANCE = 1e-10
+
+
+def ledoit_wolf(returns: np.ndarray):
+    """
+    Ledoit-Wolf shrinkage of the sample covariance towards a scaled identity.
+    returns: (T observations x N assets). Returns (covariance, shrinkage intensity in [0, 1]).
+    """
+    x = returns - returns.mean(axis=0)
+    t, n = x.shape
+    sample = x.T @ x / t
+
+    mu = np.trace(sample) / n
+    target = mu * np.eye(n)
+
+    # Distance of the sample from the target, and how noisy the sample is (per asset)
+    d2 = np.sum((sample - target) ** 2) / n
+    row_norms = np.sum(x ** 2, axis=1)
+    b2_bar = (np.sum(row_norms ** 2) / t - np.sum(sample ** 2)) / t / n
+    b2 = min(max(b2_bar, 0.0), d2)
+
+    shrinkage = b2 / d2 if d2 > 0 else 1.0
+    return shrinkage * target + (1 - shrinkage) * sample, shrinkage
+
+
+def project_capped_simplex(v: np.ndarray, caps: np.ndarray, total: float = 1.0) -> np.ndarray:
+    """
+    Euclidean projection of v onto {w : 0 <= w <= caps, sum(w) = total}.
+    If the caps can't hold `total`, every asset is simply filled to its cap.
+    """
+    if caps.sum() <= total:
+        return caps.copy()
+
+    # sum(clip(v - tau, 0, caps)) is monotone in tau: bisect for the shift that hits `total`
+    lo, hi = v.min() - caps.max() - 1.0, v.max()
+    for _ in range(100):
+        tau = (lo + hi) / 2
+        if np.clip(v - tau, 0, caps).sum() > total:
+            lo = tau
+        else:
+            hi = tau
+        if hi - lo < TOLERANCE:
+            break
+    return np.clip(v - (lo + hi) / 2, 0, caps)
+
+
+def _initial_weights(n, w0):
+    if w0 is None or len(w0) != n or not np.all(np.isfinite(w0)) or w0.sum() <= 0:
+        return np.full(n, 1.0 / n)
+    w = np.maximum(w0, 1e-6)
+    return w / w.sum()
+
+
+def risk_parity(cov: np.ndarray, caps: np.ndarray, w0: np.ndarray = None, budgets: np.ndarray = None):
+    """
+    Long-only (equal) risk contribution weights, then capped.
+    Solves min 1/2 y'Σy - Σ b_i log(y_i) with damped Newton steps (Spinu's method),
+    warm-started from w0. Returns (weights, iterations).
+    """
+    n = len(cov)
+    b = np.full(n, 1.0 / n) if budgets is None else budgets / budgets.sum()
+
+    # Scale the start so y'Σy = 1, which is where the optimum lives
+    y = _initial_weights(n, w0)
+    y = y / np.sqrt(y @ cov @ y)
+    iterations = 0
+    for iterations in range(1, MAX_ITERATIONS + 1):
+        grad = cov @ y - b / y
+        hessian = cov + np.diag(b / y ** 2)
+        step = np.linalg.solve(hessian, grad)
+        decrement = np.sqrt(max(grad @ step, 0.0))
+        # Damped phase keeps y strictly positive; quadratic phase takes full steps
+        y = y - (step / (1 + decrement) if decrement > 0.25 else step)
+        if decrement < 1e-8:
+            break
+
+    w = y / y.sum()
+    return project_capped_simplex(w, caps), iterations
+
+
+def mean_variance(cov: np.ndarray, expected: np.ndarray, caps: np.ndarray,
+                  risk_aversion: float = 5.0, w0: np.ndarray = None):
+    """
+    Long-only max  expected'w - risk_aversion/2 * w'Σw  with sum(w) = 1 and w <= caps.
+    Accelerated projected gradient (FISTA with restarts), warm-started from w0. Returns (weights, iterations).
+    """
+    n = len(cov)
+    w = project_capped_simplex(_initial_weights(n, w0), caps)
+
+    # Step size from the largest eigenvalue (a few power iterations are plenty)
+    v = np.ones(n) / np.sqrt(n)
+    for _ in range(20):
+        v = cov @ v
+        v /= np.linalg.norm(v)
+    lipschitz = risk_aversion * float(v @ cov @ v) * 1.01 or 1.0
+
+    z, t = w.copy(), 1.0
+    iterations = 0
+    for iterations in range(1, MAX_ITERATIONS + 1):
+        grad = expected - risk_aversion * (cov @ z)
+        w_next = project_capped_simplex(z + grad / lipschitz, caps)
+        # Adaptive restart: drop the momentum as soon as it points uphill
+        if (z - w_next) @ (w_next - w) > 0:
+            t = 1.0
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        z = w_next + ((t - 1) / t_next) * (w_next - w)
+        done = np.max(np.abs(w_next - w)) < TOLERANCE * 100
+        w, t = w_next, t_next
+        if done:
+            break
+    return w, iterations
@@ -0,0 +1,204 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import List
+from termcolor import colored
+from src.utils import telemetry
+from src.utils.alpaca_client import get_client, POOL_SIZE
+
+# Order lifecycle on top of the pooled Alpaca client:
+# submit many orders concurrently, then poll the open ones until they reach a final status.
+
+# CONFIG: Concurrency (stays inside the HTTP connection pool)
+SUBMIT_WORKERS = POOL_SIZE
+
+# CONFIG: Fill tracking. Polls start fast and back off while orders stay open.
+POLL_INTERVAL_SECONDS = 0.25
+MAX_POLL_INTERVAL_SECONDS = 2.0
+FILL_TIMEOUT_SECONDS = 30.0
+
+# Alpaca's 422 message when a client_order_id was already used (the order exists)
+DUPLICATE_CLIENT_ID = "client_order_id must be unique"
+
+# Alpaca order statuses after which nothing else will happen
+FINAL_STATUSES = {"filled", "canceled", "expired", "rejected", "done_for_day", "replaced"}
+
+
+@dataclass
+class OrderTicket:
+    """One order as we know it: what we asked for, and what the broker has filled so far."""
+    symbol: str
+    side: str
+    qty: float
+    client_order_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    order_id: str = None
+    status: str = "new"
+    filled_qty: float = 0.0
+    filled_avg_price: float = None
+    error: str = None
+    submitted_at: float = None
+    completed_at: float = None
+
+    @property
+    def is_final(self) -> bool:
+        return self.status in FINAL_STATUSES or self.status == "failed"
+
+    def payload(self) -> dict:
+        return {
+            "symbol": self.symbol,
+            "qty": self.qty,
+            "side": self.side,
+            "type": "market",
+            "time_in_force": "day",
+            "client_order_id": self.client_order_id,
+        }
+
+    def update_from(self, data: dict):
+        self.order_id = data.get("id", self.order_id)
+        self.status = data.get("status", self.status)
+        self.filled_qty = float(data.get("filled_qty") or 0.0)
+        if data.get("filled_avg_price") is not None:
+            self.filled_avg_price = float(data["filled_avg_price"])
+        if self.is_final and self.completed_at is None:
+            self.completed_at = time.time()
+
+    def describe(self) -> str:
+        """execution_status text for the agent state."""
+        qty = f"{self.filled_qty:g}"
+        if self.status == "filled":
+            return f"Filled: {self.side} {qty} {self.symbol} @ {self.filled_avg_price:.2f}"
+        if self.filled_qty > 0:
+            return f"Partially Filled: {self.side} {qty}/{self.qty:g} {self.symbol} @ {self.filled_avg_price:.2f} ({self.status})"
+        if self.status == "failed":
+            return f"Failed: {self.error}"
+        if self.is_final:
+            return f"Failed: order {self.status}"
+        return f"Pending: {self.side} {self.qty:g} {self.symbol} ({self.status}, not filled within {FILL_TIMEOUT_SECONDS:.0f}s)"
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class OrderManager:
+    """
+    Submits baskets of orders concurrently over the shared client and tracks them to completion.
+    Every REST call goes through the client's request budget, so bursts respect Alpaca's rate limit.
+    A client_order_id per ticket makes a blind re-send impossible to double-fill.
+    """
+
+    def __init__(self, client=None, submit_workers: int = SUBMIT_WORKERS,
+                 poll_interval: float = POLL_INTERVAL_SECONDS, fill_timeout: float = FILL_TIMEOUT_SECONDS):
+        self._client = client
+        self.submit_workers = submit_workers
+        self.poll_interval = poll_interval
+        self.fill_timeout = fill_timeout
+        self._stats_lock = threading.Lock()
+        self.stats = {"submitted": 0, "recovered": 0, "failed": 0, "polls": 0, "filled": 0}
+
+    @property
+    def client(self):
+        return self._client or get_client()
+
+    def _count(self, field_name, amount=1):
+        with self._stats_lock:
+            self.stats[field_name] += amount
+
+    def _submit_one(self, ticket: OrderTicket) -> OrderTicket:
+        ticket.submitted_at = time.time()
+        try:
+            response = self.client.submit_order(ticket.payload())
+            if response.status_code == 200:
+                ticket.update_from(response.json())
+                self._count("submitted")
+                return ticket
+            try:
+                ticket.error = response.json().get("message", response.text)
+            except Exception:
+                ticket.error = response.text
+            if response.status_code == 422 and DUPLICATE_CLIENT_ID in ticket.error:
+                # Sent before (a resumed run): track the order that already exists instead
+                ticket.update_from(self.client.get_order_by_client_id(ticket.client_order_id))
+                ticket.error = None
+                self._count("recovered")
+                return ticket
+        except Exception as e:
+            ticket.error = f"API Connection Error: {e}"
+        ticket.status = "failed"
+        ticket.completed_at = time.time()
+        self._count("failed")
+        return ticket
+
+    def _poll_one(self, ticket: OrderTicket) -> OrderTicket:
+        try:
+            ticket.update_from(self.client.get_order(ticket.order_id))
+        except Exception as e:
+            # Keep tracking: one failed poll says nothing about the order
+            print(colored(f"⚠️ Poll failed for {ticket.symbol} ({ticket.order_id}): {e}", "yellow"))
+        self._count("polls")
+        return ticket
+
+    def submit(self, tickets: List[OrderTicket]) -> List[OrderTicket]:
+        """Sends every ticket concurrently. Failed submissions come back with status 'failed'."""
+        if not tickets:
+            return tickets
+        with ThreadPoolExecutor(max_workers=max(1, min(self.submit_workers, len(tickets)))) as pool:
+            list(pool.map(telemetry.bind(self._submit_one), tickets))
+        return tickets
+
+    def track(self, tickets: List[OrderTicket], timeout: float = None) -> List[OrderTicket]:
+        """Polls the open tickets until all are final or `timeout` runs out."""
+        deadline = time.monotonic() + (self.fill_timeout if timeout is None else timeout)
+        interval = self.poll_interval
+        with ThreadPoolExecutor(max_workers=max(1, min(self.submit_workers, len(tickets) or 1))) as pool:
+            while True:
+                open_tickets = [t for t in tickets if not t.is_final]
+                if not open_tickets or time.monotonic() >= deadline:
+                    break
+                time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+                list(pool.map(telemetry.bind(self._poll_one), open_tickets))
+                interval = min(interval * 1.5, MAX_POLL_INTERVAL_SECONDS)
+        return tickets
+
+    def execute(self, tickets: List[OrderTicket], timeout: float = None) -> List[OrderTicket]:
+        """
+        Submit + track, then bring the shared portfolio snapshot in line with what really filled.
+        Orders still open at the timeout are left working; the snapshot is refreshed so nobody
+        sizes against stale cash.
+        """
+        self.submit(tickets)
+        self.track(tickets, timeout)
+
+        client = self.client
+        for ticket in tickets:
+            if ticket.filled_qty > 0:
+                client.apply_fill(ticket.symbol, ticket.side, ticket.filled_qty, ticket.filled_avg_price)
+        self._count("filled", sum(1 for t in tickets if t.status == "filled"))
+        if any(not t.is_final for t in tickets):
+            client.invalidate()
+        return tickets
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def stable_client_order_id(*parts) -> str:
+    """The same client_order_id for the same parts (e.g. run id, ticker, side), so a re-send is recognized."""
+    return uuid.uuid5(uuid.NAMESPACE_URL, ":".join(str(p) for p in parts)).hex
+
+
+def get_order_manager() -> OrderManager:
+    """The process-wide order manager (uses whichever Alpaca client is current)."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = OrderManager()
+        return _manager
+
+
+def set_order_manager(manager: OrderManager):
+    global _manager
+    with _manager_lock:
+        _manager = manager
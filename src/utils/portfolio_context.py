@@ -0,0 +1,136 @@
+import os
+import threading
+from dataclasses import dataclass, field
+from src.utils.llm_gateway import CHARS_PER_TOKEN
+
+# Compact portfolio context for prompts: the account summarized once per snapshot (exposure,
+# largest weights, sector buckets) and shared by every ticker, instead of each prompt carrying
+# the raw list of positions. Only the line about the ticker under review differs per prompt.
+
+# CONFIG: Prompt size
+CONTEXT_TOP_N = 10                                                  # largest positions listed by weight
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RISK_CONTEXT_TOKENS", "250"))  # whole block, per-ticker line included
+TICKER_LINE_TOKENS = 20        # reserved for the per-ticker line
+
+UNCLASSIFIED = "Unclassified"
+
+
+@dataclass
+class PortfolioContext:
+    """The shared summary block, plus what's needed to describe any one ticker's position."""
+    text: str
+    equity: float
+    positions: dict = field(default_factory=dict)   # symbol -> {"weight", "qty", "profit_loss_pct"}
+
+    def for_ticker(self, ticker: str) -> str:
+        """The summary plus the reviewed ticker's current weight."""
+        position = self.positions.get(ticker)
+        if position is None:
+            line = f"- {ticker}: not held (0.0% of equity)"
+        else:
+            line = (f"- {ticker}: held, {position['weight']:.2%} of equity "
+                    f"({position['qty']:g} sh, P/L {position['profit_loss_pct']:+.1f}%)")
+        return f"{self.text}\n{line}"
+
+
+def _money(value: float) -> str:
+    return f"${value:,.0f}"
+
+
+def _items_line(label, items, rest) -> str:
+    """'- label: a, b, c, +N more x%' — `rest` is (count, weight) of what was left out."""
+    parts = list(items)
+    if rest[0]:
+        parts.append(f"+{rest[0]} more {rest[1]:.1%}")
+    return f"- {label}: {', '.join(parts)}" if parts else ""
+
+
+def build_portfolio_context(portfolio: dict, top_n: int = None, token_budget: int = None,
+                            sector_of=None) -> PortfolioContext:
+    """
+    Summarizes a portfolio snapshot ({"cash", "equity", "buying_power", "positions"}) for prompts.
+    Top weights and sector buckets are trimmed, smallest first, until the block fits `token_budget`
+    (estimated at CHARS_PER_TOKEN). `sector_of(ticker)` names each position's sector bucket.
+    Defaults: CONTEXT_TOP_N and CONTEXT_TOKEN_BUDGET.
+    """
+    top_n = CONTEXT_TOP_N if top_n is None else top_n
+    token_budget = CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    positions = portfolio.get("positions") or []
+    cash = float(portfolio.get("cash", 0.0))
+    gross = sum(abs(float(p["market_value"])) for p in positions)
+    net = sum(float(p["market_value"]) for p in positions)
+    equity = float(portfolio.get("equity", 0.0)) or (cash + net) or 1.0
+
+    # 1. Per-position weights (of equity), largest first
+    weights = {p["symbol"]: {"weight": float(p["market_value"]) / equity, "qty": float(p["qty"]),
+                             "profit_loss_pct": float(p.get("profit_loss_pct", 0.0))} for p in positions}
+    ranked = sorted(weights.items(), key=lambda kv: -abs(kv[1]["weight"]))[:max(0, top_n)]
+
+    # 2. Sector buckets
+    sectors = {}
+    for symbol, w in weights.items():
+        sector = (sector_of(symbol) if sector_of else None) or UNCLASSIFIED
+        bucket = sectors.setdefault(sector, [0.0, 0])
+        bucket[0] += w["weight"]
+        bucket[1] += 1
+    buckets = sorted(sectors.items(), key=lambda kv: -abs(kv[1][0]))
+
+    # 3. Fixed lines, then as many weights and sectors as the budget allows
+    header = [
+        f"- Cash: {_money(cash)} | Equity: {_money(equity)} | Buying power: {_money(float(portfolio.get('buying_power', cash)))}",
+        f"- Exposure: gross {_money(gross)} ({gross / equity:.1%} of equity), net {_money(net)} "
+        f"({net / equity:.1%}), {len(positions)} positions",
+    ]
+
+    def render(n_top, n_sectors):
+        shown = ranked[:n_top]
+        top_weight = sum(w["weight"] for _, w in ranked[n_top:])
+        top = _items_line(f"Top {len(shown)} weights", [f"{s} {w['weight']:.1%}" for s, w in shown],
+                          (len(ranked) - n_top, top_weight))
+        rest = buckets[n_sectors:]
+        sector = _items_line("Sectors", [f"{name} {b[0]:.1%} ({b[1]})" for name, b in buckets[:n_sectors]],
+                             (len(rest), sum(b[0] for _, b in rest)))
+        return "\n".join(line for line in header + [top, sector] if line)
+
+    budget_chars = max(0, token_budget - TICKER_LINE_TOKENS) * CHARS_PER_TOKEN
+    n_top, n_sectors = len(ranked), len(buckets)
+    text = render(n_top, n_sectors)
+    while len(text) > budget_chars and (n_top or n_sectors):
+        # Trim whichever list is longer, so both keep their largest entries
+        if n_top >= n_sectors:
+            n_top -= 1
+        else:
+            n_sectors -= 1
+        text = render(n_top, n_sectors)
+    return PortfolioContext(text, equity, weights)
+
+
+# --- One context per snapshot version (src/utils/alpaca_client.py), shared by every ticker ---
+
+_cache = {"key": None, "context": None}
+_cache_lock = threading.Lock()
+stats = {"builds": 0, "hits": 0}
+
+
+def portfolio_context(portfolio: dict, top_n: int = None, token_budget: int = None,
+                      sector_of=None) -> PortfolioContext:
+    """
+    build_portfolio_context, built once per portfolio snapshot version. Snapshots without
+    a version (e.g. the backtest's simulated book) are summarized on every call.
+    """
+    top_n = CONTEXT_TOP_N if top_n is None else top_n
+    token_budget = CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    version = portfolio.get("version")
+    if version is None:
+        stats["builds"] += 1
+        return build_portfolio_context(portfolio, top_n, token_budget, sector_of)
+
+    key = (version, top_n, token_budget, sector_of)
+    with _cache_lock:
+        if _cache["key"] == key:
+            stats["hits"] += 1
+            return _cache["context"]
+        context = build_portfolio_context(portfolio, top_n, token_budget, sector_of)
+        _cache.update(key=key, context=context)
+        stats["builds"] += 1
+        return context
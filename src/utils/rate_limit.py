@@ -0,0 +1,42 @@
+import threading
+import time
+
+# Shared request/token budget used by every rate-limited client (Gemini, Alpaca).
+
+
+class RateBudget:
+    """
+    Token bucket over requests/minute and tokens/minute, shared by every caller in the process.
+    reserve() always succeeds but may put the bucket into debt; the caller sleeps off the debt,
+    so sync threads and async tasks queue fairly behind the same quota.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int = None):
+        self.rpm = requests_per_minute
+        # No token quota (e.g. a plain REST API): an effectively bottomless token bucket
+        self.tpm = tokens_per_minute or float("inf")
+        self._lock = threading.Lock()
+        self._requests = float(requests_per_minute)
+        self._tokens = float(self.tpm)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Takes one request and `tokens` from the budget. Returns how long to wait before sending."""
+        with self._lock:
+            self._refill()
+            self._requests -= 1
+            self._tokens -= min(tokens, self.tpm)
+            token_wait = -self._tokens * 60.0 / self.tpm if self._tokens < 0 else 0.0
+            return max(0.0, -self._requests * 60.0 / self.rpm, token_wait)
+
+    def adjust(self, extra_tokens: int):
+        """Corrects the estimate once the real usage is known (negative gives tokens back)."""
+        with self._lock:
+            self._tokens -= extra_tokens
@@ -0,0 +1,137 @@
+from dataclasses import dataclass, field
+from typing import List
+import numpy as np
+
+# Deterministic pre-trade risk checks. Pure arithmetic on the portfolio snapshot
+# and the `data` dict, evaluated for a whole batch of proposals at once.
+
+# CONFIG: Hard limits (any breach = REJECT, no LLM involved)
+MAX_CONCENTRATION = 0.20      # Position value / equity after the trade
+RSI_HARD_OVERBOUGHT = 80.0    # Never BUY above this
+RSI_HARD_OVERSOLD = 20.0      # Never SELL below this
+
+# CONFIG: Soft zones that raise the score
+RSI_SOFT_OVERBOUGHT = 70.0
+RSI_SOFT_OVERSOLD = 30.0
+
+# CONFIG: Score bands. Clean trades under APPROVE_BELOW pass, over REJECT_ABOVE fail,
+# and only the band in between is sent to the LLM Risk Board.
+APPROVE_BELOW = 40
+REJECT_ABOVE = 70
+
+# Score weights (sum to 100)
+WEIGHT_CONCENTRATION = 40
+WEIGHT_LIQUIDITY = 30
+WEIGHT_RSI = 30
+
+
+@dataclass
+class RiskResult:
+    ticker: str
+    side: str
+    risk_score: int
+    trade_approved: bool
+    borderline: bool
+    checks: dict = field(default_factory=dict)
+    violations: List[str] = field(default_factory=list)
+
+    @property
+    def verdict(self) -> str:
+        if self.borderline:
+            return "BORDERLINE"
+        return "APPROVED" if self.trade_approved else "REJECTED"
+
+    def summary(self) -> str:
+        """Same shape as the LLM board's answer, so the rest of the pipeline reads it the same way."""
+        c = self.checks
+        reason = "; ".join(self.violations) if self.violations else "All deterministic checks passed"
+        return (
+            f"Risk Score: {self.risk_score}\n"
+            f"Verdict: {self.verdict}\n"
+            f"Reason: {reason}. "
+            f"(Cash use {c['cash_usage']:.0%}, post-trade weight {c['post_trade_weight']:.1%}, RSI {c['rsi']:.1f})"
+        )
+
+
+def evaluate_trades(proposals, portfolio) -> List[RiskResult]:
+    """
+    Runs the risk checks for every proposal against one portfolio snapshot.
+    proposals: [{"ticker", "side" ("buy"/"sell"), "qty", "price", "rsi"}], in priority order.
+    Buys consume cash cumulatively in that order, so the batch can't overspend together;
+    a buy vetoed for concentration or RSI consumes none.
+    """
+    if not proposals:
+        return []
+
+    tickers = [p["ticker"] for p in proposals]
+    is_buy = np.array([p["side"] == "buy" for p in proposals])
+    qty = np.array([float(p["qty"]) for p in proposals])
+    price = np.array([float(p["price"]) for p in proposals])
+    rsi = np.array([float(p.get("rsi", 50.0)) for p in proposals])
+    notional = qty * price
+
+    cash = float(portfolio.get("cash", 0.0))
+    equity = float(portfolio.get("equity", 0.0)) or cash
+    held_value = {p["symbol"]: float(p["market_value"]) for p in portfolio.get("positions", [])}
+    held_qty = {p["symbol"]: float(p["qty"]) for p in portfolio.get("positions", [])}
+    existing = np.array([held_value.get(t, 0.0) for t in tickers])
+    existing_qty = np.array([held_qty.get(t, 0.0) for t in tickers])
+
+    # 1. Concentration: weight of this name after the trade
+    post_value = existing + np.where(is_buy, notional, -notional)
+    post_weight = np.maximum(post_value, 0.0) / equity if equity > 0 else np.full(len(tickers), np.inf)
+    concentration_fail = is_buy & (post_weight > MAX_CONCENTRATION)
+
+    # 2. Selling what we don't own would open a short (SELLs are sized to at most what is held)
+    short_fail = ~is_buy & (existing_qty <= 0)
+
+    # 3. Market: chasing extremes
+    rsi_hard = np.where(is_buy, rsi > RSI_HARD_OVERBOUGHT, rsi < RSI_HARD_OVERSOLD)
+    rsi_soft = np.where(is_buy, np.clip((rsi - RSI_SOFT_OVERBOUGHT) / (RSI_HARD_OVERBOUGHT - RSI_SOFT_OVERBOUGHT), 0, 1),
+                        np.clip((RSI_SOFT_OVERSOLD - rsi) / (RSI_SOFT_OVERSOLD - RSI_HARD_OVERSOLD), 0, 1))
+
+    # 4. Liquidity: cumulative cash needed by buys, in priority order. Buys already vetoed above
+    #    spend nothing, so they can't crowd out the ones after them.
+    spends = is_buy & ~(concentration_fail | rsi_hard)
+    committed = np.cumsum(np.where(spends, notional, 0.0))
+    cash_needed = np.where(spends, committed, committed + notional)
+    cash_usage = np.where(is_buy, cash_needed / cash if cash > 0 else np.inf, 0.0)
+    liquidity_fail = is_buy & (cash_needed > cash)
+
+    score = (
+        WEIGHT_CONCENTRATION * np.clip(post_weight / MAX_CONCENTRATION, 0, 1) * is_buy
+        + WEIGHT_LIQUIDITY * np.clip(cash_usage, 0, 1)
+        + WEIGHT_RSI * rsi_soft
+    )
+    hard_fail = liquidity_fail | concentration_fail | short_fail | rsi_hard
+    score = np.where(hard_fail, 100.0, score).round().astype(int)
+
+    approved = ~hard_fail & (score < APPROVE_BELOW)
+    borderline = ~hard_fail & (score >= APPROVE_BELOW) & (score <= REJECT_ABOVE)
+
+    results = []
+    for i, ticker in enumerate(tickers):
+        violations = []
+        if liquidity_fail[i]:
+            violations.append(f"Insufficient cash: needs ${cash_needed[i]:,.2f} (cumulative), has ${cash:,.2f}")
+        if concentration_fail[i]:
+            violations.append(f"Concentration {post_weight[i]:.1%} > {MAX_CONCENTRATION:.0%} limit")
+        if short_fail[i]:
+            violations.append(f"Sell of {qty[i]:g} shares with no {ticker} position (no shorting)")
+        if rsi_hard[i]:
+            violations.append(f"RSI {rsi[i]:.1f} is extreme for a {proposals[i]['side'].upper()}")
+        results.append(RiskResult(
+            ticker=ticker,
+            side=proposals[i]["side"],
+            risk_score=int(score[i]),
+            trade_approved=bool(approved[i]),
+            borderline=bool(borderline[i]),
+            checks={
+                "notional": float(notional[i]),
+                "cash_usage": float(min(cash_usage[i], 9.99)),
+                "post_trade_weight": float(min(post_weight[i], 9.99)),
+                "rsi": float(rsi[i]),
+            },
+            violations=violations,
+        ))
+    return results
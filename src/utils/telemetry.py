@@ -0,0 +1,252 @@
+import contextvars
+import cProfile
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from termcolor import colored
+
+# Per-node tracing. Every graph node (and each universe batch stage) runs inside a span;
+# the LLM gateway, response cache, Alpaca client, yfinance downloads and the journal
+# call count() and the numbers land on whichever span is current in that context.
+
+# CONFIG: Output. "jsonl" appends one line per node call; "prometheus" rewrites a text-format
+# file (histograms + counters) at the end of each run; "off" disables tracing.
+METRICS_FORMAT = os.getenv("METRICS_FORMAT", "jsonl")
+METRICS_PATH = os.getenv("METRICS_PATH")           # default: metrics.jsonl / metrics.prom
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# CONFIG: cProfile every node of one ticker (one .prof file per node call)
+PROFILE_TICKER = os.getenv("PROFILE_TICKER")
+PROFILE_DIR = "profiles"
+
+# Counters shown in the summary table, in this order
+SUMMARY_COUNTERS = [
+    ("llm_calls", "LLM"), ("llm_cache_hits", "Cache hits"), ("llm_prompt_tokens", "Tok in"),
+    ("llm_completion_tokens", "Tok out"), ("http_calls", "HTTP"), ("yfinance_calls", "yfinance"),
+    ("sqlite_writes", "DB writes"),
+]
+
+
+@dataclass
+class Span:
+    run_id: str
+    ticker: str
+    node: str
+    started: float
+    wall_s: float = 0.0
+    error: str = None
+    counters: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {"run_id": self.run_id, "ticker": self.ticker, "node": self.node, "started": self.started,
+                "wall_s": round(self.wall_s, 6), "error": self.error, **self.counters}
+
+
+_current = contextvars.ContextVar("telemetry_span", default=None)
+_lock = threading.Lock()
+_run = {"id": None, "started": None}
+_spans = []                     # finished spans of the current run
+_untraced = defaultdict(float)  # counts recorded outside any span
+
+
+def enabled() -> bool:
+    return METRICS_FORMAT != "off"
+
+
+def metrics_path() -> str:
+    return METRICS_PATH or ("metrics.prom" if METRICS_FORMAT == "prometheus" else "metrics.jsonl")
+
+
+def new_run(run_id: str = None) -> str:
+    """Starts a fresh run: clears the collected spans and stamps later ones with `run_id`."""
+    with _lock:
+        _run["id"] = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        _run["started"] = time.time()
+        _spans.clear()
+        _untraced.clear()
+    return _run["id"]
+
+
+def current_run() -> str:
+    return _run["id"] or new_run()
+
+
+def count(name: str, amount: float = 1):
+    """Adds to a counter on the current span (e.g. count("llm_calls"), count("http_seconds", 0.2))."""
+    if not enabled():
+        return
+    span = _current.get()
+    with _lock:
+        if span is not None:
+            span.counters[name] = span.counters.get(name, 0) + amount
+        else:
+            _untraced[name] += amount
+
+
+@contextmanager
+def timed(prefix: str):
+    """Counts one `{prefix}_calls` and its `{prefix}_seconds` on the current span."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        count(f"{prefix}_calls")
+        count(f"{prefix}_seconds", time.perf_counter() - start)
+
+
+def _write_jsonl(span: Span):
+    try:
+        with open(metrics_path(), "a") as f:
+            f.write(json.dumps(span.to_dict()) + "\n")
+    except OSError as e:
+        print(colored(f"⚠️ Could not write metrics: {e}", "yellow"))
+
+
+@contextmanager
+def span(node: str, ticker: str = "*"):
+    """Traces one unit of work (a node call, or a batch stage with ticker='*')."""
+    if not enabled():
+        yield None
+        return
+    current = Span(current_run(), ticker, node, time.time())
+    token = _current.set(current)
+    profiler = cProfile.Profile() if PROFILE_TICKER and ticker == PROFILE_TICKER else None
+    if profiler:
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield current
+    except Exception as e:
+        current.error = repr(e)
+        raise
+    finally:
+        current.wall_s = time.perf_counter() - start
+        if profiler:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{current.run_id}_{ticker}_{node}.prof")
+            profiler.dump_stats(path)
+            print(colored(f"🔬 Profile saved: {path} (python -m pstats {path})", "cyan"))
+        _current.reset(token)
+        with _lock:
+            _spans.append(current)
+            if METRICS_FORMAT == "jsonl":
+                _write_jsonl(current)
+
+
+def bind(fn):
+    """`fn` run in a copy of the caller's context, so work handed to a thread pool counts on the caller's span."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+def traced(node: str, fn):
+    """Wraps a graph node so each call is one span, keyed by the state's ticker."""
+    def wrapper(state):
+        with span(node, state.get("ticker", "*")):
+            return fn(state)
+    wrapper.__name__ = getattr(fn, "__name__", node)
+    return wrapper
+
+
+def spans() -> list:
+    with _lock:
+        return list(_spans)
+
+
+def _by_node(collected) -> dict:
+    nodes = {}
+    for s in collected:
+        nodes.setdefault(s.node, []).append(s)
+    return nodes
+
+
+def prometheus_text(collected=None) -> str:
+    """Latency histograms and counter totals per node, in Prometheus text exposition format."""
+    import numpy as np
+
+    collected = spans() if collected is None else collected
+    lines = ["# HELP pipeline_node_seconds Wall time of one node call",
+             "# TYPE pipeline_node_seconds histogram"]
+    totals = []
+    for node, items in sorted(_by_node(collected).items()):
+        wall = np.array([s.wall_s for s in items])
+        for bound in LATENCY_BUCKETS:
+            lines.append(f'pipeline_node_seconds_bucket{{node="{node}",le="{bound}"}} {int((wall <= bound).sum())}')
+        lines.append(f'pipeline_node_seconds_bucket{{node="{node}",le="+Inf"}} {len(wall)}')
+        lines.append(f'pipeline_node_seconds_sum{{node="{node}"}} {wall.sum():.6f}')
+        lines.append(f'pipeline_node_seconds_count{{node="{node}"}} {len(wall)}')
+        counters = defaultdict(float)
+        for s in items:
+            for name, value in s.counters.items():
+                counters[name] += value
+        counters["errors"] = sum(1 for s in items if s.error)
+        totals += [f'pipeline_events_total{{node="{node}",event="{name}"}} {value:g}'
+                   for name, value in sorted(counters.items())]
+    lines += ["# HELP pipeline_events_total Calls, retries, tokens and seconds counted inside nodes",
+              "# TYPE pipeline_events_total counter"] + totals
+    return "\n".join(lines) + "\n"
+
+
+def print_summary(collected=None):
+    """Per-node table for the run: latency percentiles plus what each node spent its time on."""
+    import numpy as np
+
+    collected = spans() if collected is None else collected
+    if not collected:
+        return
+    header = f"{'Node':<24}{'Calls':>6}{'p50 s':>8}{'p95 s':>8}{'Max s':>8}{'Total s':>9}" + \
+        "".join(f"{label:>11}" for _, label in SUMMARY_COUNTERS) + f"{'Retries':>9}{'Errors':>8}"
+    print("\n" + "=" * len(header))
+    print(f"⏱️ RUN TELEMETRY ({current_run()})")
+    print("=" * len(header))
+    print(header)
+    for node, items in _by_node(collected).items():
+        wall = np.array([s.wall_s for s in items])
+        total = lambda name: sum(s.counters.get(name, 0) for s in items)
+        print(f"{node:<24}{len(items):>6}{np.percentile(wall, 50):>8.2f}{np.percentile(wall, 95):>8.2f}"
+              f"{wall.max():>8.2f}{wall.sum():>9.1f}"
+              + "".join(f"{total(name):>11,.0f}" for name, _ in SUMMARY_COUNTERS)
+              + f"{total('llm_retries') + total('http_retries'):>9,.0f}{sum(1 for s in items if s.error):>8}")
+
+    # Where the time went, by dependency
+    seconds = defaultdict(float)
+    for s in collected:
+        for name, value in s.counters.items():
+            if name.endswith("_seconds"):
+                seconds[name[:-len("_seconds")]] += value
+    if seconds:
+        print("Time inside nodes by source: " + ", ".join(f"{k} {v:.1f}s" for k, v in sorted(seconds.items(), key=lambda kv: -kv[1])))
+    with _lock:
+        untraced = {k: v for k, v in _untraced.items() if v}
+    if untraced:
+        print("Outside any node: " + ", ".join(f"{k} {v:,.1f}" for k, v in sorted(untraced.items())))
+
+    per_ticker = defaultdict(float)
+    for s in collected:
+        if s.ticker != "*":
+            per_ticker[s.ticker] += s.wall_s
+    slowest = sorted(per_ticker.items(), key=lambda kv: -kv[1])[:5]
+    if slowest:
+        print("Slowest tickers: " + ", ".join(f"{t} {v:.1f}s" for t, v in slowest))
+
+
+def finish_run():
+    """Writes the run's metrics (Prometheus mode) and prints the summary table."""
+    if not enabled():
+        return
+    collected = spans()
+    if METRICS_FORMAT == "prometheus" and collected:
+        try:
+            with open(metrics_path(), "w") as f:
+                f.write(prometheus_text(collected))
+        except OSError as e:
+            print(colored(f"⚠️ Could not write metrics: {e}", "yellow"))
+    print_summary(collected)
+    if collected:
+        print(colored(f"📊 Metrics: {metrics_path()} ({METRICS_FORMAT})", "cyan"))
@@ -0,0 +1,84 @@
+"""
+Offline fixtures: every test runs against the benchmarks' stand-ins (FakeChatModel, SyntheticMarket,
+MockBroker) in a temp directory with its own journal and caches, so nothing touches the network
+or the real databases.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Before any src module reads its config
+_TMP = tempfile.mkdtemp(prefix="hedge-fund-tests-")
+os.environ.update(PORTFOLIO_DB_PATH=os.path.join(_TMP, "portfolio.db"), INDICATOR_BACKEND="numpy",
+                  GOOGLE_API_KEY="offline", LLM_CACHE="off", METRICS_FORMAT="off",
+                  LLM_MAX_RPM="100000000", LLM_MAX_TPM="100000000000")
+os.chdir(_TMP)   # relative cache files (OHLCV, optimizer state) land here too
+
+import pytest
+from benchmarks.fakes import FakeChatModel, SyntheticMarket
+from src.data import ohlcv_cache
+from src.data.storage import init_db
+from src.utils import llm_gateway
+from src.utils.alpaca_client import set_client
+from src.utils.mock_broker import MockBroker
+from src.utils.order_manager import OrderManager, set_order_manager
+
+TICKERS = [f"SYN{i:03d}" for i in range(8)]
+
+
+class RecordingChatModel(FakeChatModel):
+    """FakeChatModel that keeps every prompt it answered."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.prompts = []
+
+    def answer(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return super().answer(prompt)
+
+    def count(self, marker: str) -> int:
+        return sum(1 for p in self.prompts if marker in p)
+
+
+class FlakyBroker(MockBroker):
+    """MockBroker that answers every call with a 503 while `down` is set (an Alpaca outage)."""
+    down = False
+
+    def handle(self, method, path, body=None):
+        if self.down:
+            return 503, {"code": 50300000, "message": "service unavailable"}, {}
+        return super().handle(method, path, body)
+
+
+@pytest.fixture
+def market():
+    market = SyntheticMarket(seed=7)
+    ohlcv_cache.set_downloader(market.download)
+    init_db()
+    yield market
+    ohlcv_cache.set_downloader(None)
+
+
+@pytest.fixture
+def broker(market):
+    broker = FlakyBroker(cash=1_000_000.0, prices=market.last_close(TICKERS), fill_delay=0.01, seed=7)
+    set_client(broker.client())
+    set_order_manager(OrderManager(poll_interval=0.02, fill_timeout=5.0))
+    yield broker
+    set_client(None)
+    set_order_manager(None)
+
+
+@pytest.fixture
+def llm():
+    """Installs a fresh RecordingChatModel; call it again for a new one (e.g. per attempt)."""
+    def install():
+        model = RecordingChatModel(seed=7)
+        llm_gateway.set_llm(model)
+        return model
+    yield install
+    llm_gateway.set_llm(None)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from src.backtest import simulate
+
+
+def _signals(action):
+    days = len(action)
+    return [{
+        "ticker": "SYN000",
+        "ts": np.arange(days, dtype=np.int64) * 86_400,
+        "open": np.array([100.0, 90.0, 95.0][:days]),
+        "close": np.array([100.0, 110.0, 120.0][:days]),
+        "rsi": np.full(days, 50.0),
+        "action": np.array(action, dtype=np.int8),
+        "confidence": np.ones(days),
+    }]
+
+
+def test_decisions_fill_at_the_next_open():
+    curve, stats = simulate(_signals([1, 0, 0]), slippage_bps=0.0)
+
+    # Day 0's BUY trades on day 1, at day 1's open, not at the close it was decided on
+    assert curve["traded"].tolist()[0] == 0.0
+    qty = 5000 // 100
+    assert curve["traded"].iloc[1] == pytest.approx(qty * 90.0)
+    assert curve["invested"].iloc[1] == pytest.approx(qty * 110.0)
+    assert stats["orders"] == 1
+
+
+def test_last_day_decisions_never_trade():
+    curve, stats = simulate(_signals([0, 0, 1]), slippage_bps=0.0)
+    assert stats["orders"] == 0
+    assert curve["traded"].sum() == 0.0
@@ -0,0 +1,107 @@
+import json
+
+from conftest import TICKERS, RecordingChatModel
+from src.agents.execution import execute_trade_node
+from src.agents.risk_manager import risk_management_node, risk_review_batch
+from src.pipeline import new_state
+from src.universe import run_universe
+from src.utils import llm_gateway
+from src.utils.decisions import TradeDecision
+
+# Each BUY is ~$5k (POSITION_SIZE_USD): one fits the cash, three together don't
+CASH = 12_000.0
+
+
+class BullishChatModel(RecordingChatModel):
+    """The PM buys everything and the Risk Board approves whatever it is asked about."""
+
+    def answer(self, prompt: str) -> str:
+        if "Head Portfolio Manager" in prompt:
+            self.prompts.append(prompt)
+            confidence = 90 - 5 * sum(1 for p in self.prompts if "Head Portfolio Manager" in p)
+            return json.dumps({"action": "BUY", "confidence": max(confidence, 1), "reason": "Synthetic decision."})
+        if "Chief Risk Officer" in prompt:
+            self.prompts.append(prompt)
+            return json.dumps({"risk_score": 50, "verdict": "APPROVED", "reason": "Synthetic review."})
+        return super().answer(prompt)
+
+
+def _small_cash_book(broker):
+    # A large holding keeps each new position far below the concentration limit
+    broker.cash = CASH
+    broker.set_price("HELD", 200.0)
+    broker.positions["HELD"] = {"qty": 1000.0, "cost": 200_000.0}
+
+
+def _proposal(ticker, action, price=100.0, rsi=50.0, confidence=0.7):
+    state = new_state(ticker)
+    state["data"] = {"price": price, "rsi": rsi}
+    state["decision"] = TradeDecision(ticker, action, confidence, "Synthetic proposal.")
+    state["portfolio_decision"] = state["decision"].text()
+    return state
+
+
+def _buy(ticker, confidence=0.7):
+    return _proposal(ticker, "BUY", confidence=confidence)
+
+
+def test_buys_approved_one_at_a_time_are_vetoed_together(broker):
+    _small_cash_book(broker)
+    states = [_buy(t) for t in TICKERS[:4]]
+
+    assert all(risk_management_node(s)["trade_approved"] for s in states)
+
+    reviews = risk_review_batch(states)
+    approved = [t for t, r in reviews.items() if r["trade_approved"]]
+    assert approved == TICKERS[:2]
+    for ticker in TICKERS[2:4]:
+        assert "Insufficient cash" in reviews[ticker]["risk_analysis"]
+
+
+def test_universe_run_reviews_the_basket_jointly(broker):
+    _small_cash_book(broker)
+    llm_gateway.set_llm(BullishChatModel(seed=7))
+    try:
+        rows = run_universe(TICKERS, prescreen=False, batch_reflection=False)
+    finally:
+        llm_gateway.set_llm(None)
+
+    vetoed = [r for r in rows if r["execution_status"] == "Skipped (Risk Veto: basket)"]
+    sent = [r for r in rows if r["target_qty"] > 0]
+    assert vetoed and not any(r["trade_approved"] for r in vetoed)
+    assert sum(r["target_qty"] * r["price"] for r in sent) <= CASH
+    assert broker.cash >= 0
+
+
+def test_sell_of_a_position_smaller_than_the_order_size_is_approved(broker):
+    # 10 shares at $200 = $2k held, below the ~$5k a fresh order would be
+    broker.set_price("SYN000", 200.0)
+    broker.positions["SYN000"] = {"qty": 10.0, "cost": 2_000.0}
+    state = _proposal("SYN000", "SELL", price=200.0)
+
+    review = risk_management_node(state)
+    assert review["trade_approved"] and "revision_count" not in review
+    assert risk_review_batch([state])["SYN000"]["trade_approved"]
+
+    state.update(review)
+    assert execute_trade_node(state)["execution_status"].startswith("Filled")
+    assert "SYN000" not in broker.positions
+
+
+def test_sell_with_nothing_held_is_still_vetoed(broker):
+    state = _proposal("SYN001", "SELL")
+    review = risk_management_node(state)
+    assert not review["trade_approved"] and "no shorting" in review["risk_analysis"]
+
+    state["trade_approved"] = True
+    assert execute_trade_node(state)["execution_status"] == "Skipped (Nothing to sell)"
+
+
+def test_buy_vetoed_for_rsi_leaves_its_cash_to_the_next_ones(broker):
+    _small_cash_book(broker)
+    states = [_proposal(TICKERS[0], "BUY", rsi=85.0)] + [_buy(t) for t in TICKERS[1:3]]
+
+    reviews = risk_review_batch(states)
+    assert not reviews[TICKERS[0]]["trade_approved"]
+    assert "Insufficient cash" not in reviews[TICKERS[0]]["risk_analysis"]
+    assert all(reviews[t]["trade_approved"] for t in TICKERS[1:3])
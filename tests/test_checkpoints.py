@@ -0,0 +1,60 @@
+from conftest import TICKERS
+from src.data.checkpoints import failed, new_run_id
+from src.universe import run_universe
+from src.utils.decisions import TradeDecision
+
+FUNDAMENTAL = "Senior Fundamental Analyst"
+
+
+def _filled(rows):
+    return [r for r in rows if r["execution_status"].startswith("Filled")]
+
+
+def test_resume_replays_finished_run_without_llm_or_orders(broker, llm):
+    run_id = new_run_id()
+    first = llm()
+    rows = run_universe(TICKERS, run_id=run_id, prescreen=False)
+    orders = broker.stats["orders"]
+    assert first.calls > 0 and orders > 0
+
+    again = llm()
+    requests = broker.stats["requests"]
+    replayed = run_universe(TICKERS, run_id=run_id, prescreen=False)
+
+    assert again.calls == 0
+    assert broker.stats["requests"] == requests
+    assert [r["execution_status"] for r in replayed] == [r["execution_status"] for r in rows]
+
+
+def test_resume_after_alpaca_outage_retries_the_failed_steps(broker, llm):
+    run_id = new_run_id()
+
+    # 1. Alpaca is down: the analysts and PM run, every risk review fails on the portfolio fetch
+    broker.down = True
+    during = llm()
+    rows = run_universe(TICKERS, run_id=run_id, prescreen=False)
+    assert not _filled(rows)
+    assert broker.stats["orders"] == 0
+    assert during.count(FUNDAMENTAL) == len(TICKERS)
+
+    # 2. Alpaca is back: same run id, the finished analyst work is replayed, the risk reviews re-run
+    broker.down = False
+    after = llm()
+    resumed = run_universe(TICKERS, run_id=run_id, prescreen=False)
+
+    assert after.count(FUNDAMENTAL) == 0
+    assert broker.stats["orders"] > 0
+    assert _filled(resumed)
+
+
+def test_failed_updates_are_not_replayable():
+    assert failed({"data": {}, "metadata": {"status": "error", "error_msg": "timeout"}})
+    assert failed({"fundamental_analysis": "Error: 503 Service Unavailable"})
+    assert failed({"decision": TradeDecision.hold("MU", "LLM Unavailable: quota")})
+    assert failed({"risk_analysis": "Error: portfolio unavailable (503). Defaulting to REJECT."})
+    assert failed({"execution_status": "Failed: API Connection Error: refused"})
+
+    assert not failed({"decision": TradeDecision("MU", "HOLD", 0.4, "Mixed signals.")})
+    assert not failed({"execution_status": "Pending (Optimizer)"})
+    assert not failed({"execution_status": "Skipped (Hold)"})
+    assert not failed({})
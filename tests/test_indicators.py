@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.utils import indicators_numpy
+
+TOLERANCE = 1e-9
+
+
+def _closes(bars, seed):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+
+
+def _pandas_ta_columns(ta, close):
+    """What pandas_ta gives for one close series, keyed like compute_indicators."""
+    series = pd.Series(close)
+    macd = ta.macd(series, fast=12, slow=26, signal=9)
+    return {
+        "RSI": ta.rsi(series, length=14).to_numpy(),
+        "MACD_12_26_9": macd["MACD_12_26_9"].to_numpy(),
+        "MACDh_12_26_9": macd["MACDh_12_26_9"].to_numpy(),
+        "MACDs_12_26_9": macd["MACDs_12_26_9"].to_numpy(),
+        "SMA_20": ta.sma(series, length=20).to_numpy(),
+        "SMA_50": ta.sma(series, length=50).to_numpy(),
+    }
+
+
+def _assert_matches(actual, expected):
+    for column, want in expected.items():
+        got = actual[column]
+        np.testing.assert_array_equal(np.isnan(got), np.isnan(want), err_msg=column)
+        np.testing.assert_allclose(got, want, rtol=TOLERANCE, atol=TOLERANCE, equal_nan=True, err_msg=column)
+
+
+def test_numpy_backend_matches_pandas_ta_on_one_series():
+    ta = pytest.importorskip("pandas_ta")
+    close = _closes(300, seed=1)
+    _assert_matches(indicators_numpy.compute_indicators(close), _pandas_ta_columns(ta, close))
+
+
+def test_numpy_backend_matches_pandas_ta_column_by_column():
+    ta = pytest.importorskip("pandas_ta")
+    # Tickers with shorter histories are right-aligned behind leading NaNs, as in the batch pass
+    lengths = [300, 250, 120, 60, 40]
+    closes = np.full((300, len(lengths)), np.nan)
+    for j, bars in enumerate(lengths):
+        closes[300 - bars:, j] = _closes(bars, seed=j)
+
+    values = indicators_numpy.compute_indicators(closes)
+    for j, bars in enumerate(lengths):
+        column = {name: v[300 - bars:, j] for name, v in values.items()}
+        _assert_matches(column, _pandas_ta_columns(ta, closes[300 - bars:, j]))
+
+
+def test_numpy_indicators_against_hand_computed_values():
+    close = np.array([1.0, 2.0, 1.0, 3.0, 5.0])
+    nan = np.nan
+
+    # SMA(3): plain window means
+    np.testing.assert_allclose(indicators_numpy.sma(close, 3), [nan, nan, 4 / 3, 2.0, 3.0], equal_nan=True)
+
+    # EMA(3): alpha = 0.5, seeded with the SMA of the first 3 closes
+    ema = [nan, nan, 4 / 3, 0.5 * 4 / 3 + 0.5 * 3, 0.5 * (0.5 * 4 / 3 + 0.5 * 3) + 0.5 * 5]
+    np.testing.assert_allclose(indicators_numpy.ema(close, 3), ema, equal_nan=True)
+
+    # RSI(2): deltas +1, -1, +2, +2 with Wilder weights 1, 1/2, 1/4, ...
+    # bar 2: gains 1*0.5 + 0 = 0.5, losses 0 + 1 = 1          -> 100 * 0.5 / 1.5
+    # bar 3: gains 0.25 + 0 + 2 = 2.25, losses 0.5             -> 100 * 2.25 / 2.75
+    # bar 4: gains 1.125 + 2 = 3.125, losses 0.25              -> 100 * 3.125 / 3.375
+    rsi = [nan, nan, 100 * 0.5 / 1.5, 100 * 2.25 / 2.75, 100 * 3.125 / 3.375]
+    np.testing.assert_allclose(indicators_numpy.rsi(close, 2), rsi, equal_nan=True)
+
+    # 2D: a column starting one bar late gives the same values, shifted
+    padded = np.column_stack([close, np.concatenate([[nan], close[:-1]])])
+    for fn, length in ((indicators_numpy.sma, 3), (indicators_numpy.ema, 3), (indicators_numpy.rsi, 2)):
+        out = fn(padded, length)
+        np.testing.assert_allclose(out[:, 0], fn(close, length), equal_nan=True)
+        np.testing.assert_allclose(out[1:, 1], fn(close[:-1], length), equal_nan=True)
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from conftest import RecordingChatModel
+from src.utils import llm_gateway
+from src.utils.llm_cache import MemoryCache, NullCache, set_response_cache
+
+
+class ConcurrencyProbe(RecordingChatModel):
+    """Holds every call for `hold` seconds and records the most calls it saw at once."""
+
+    def __init__(self, hold: float = 0.05, **kwargs):
+        super().__init__(**kwargs)
+        self.hold = hold
+        self.active = 0
+        self.peak = 0
+        self._probe_lock = threading.Lock()
+
+    def _enter(self):
+        with self._probe_lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def _exit(self):
+        with self._probe_lock:
+            self.active -= 1
+
+    def invoke(self, messages, **kwargs):
+        self._enter()
+        try:
+            time.sleep(self.hold)
+            return super().invoke(messages, **kwargs)
+        finally:
+            self._exit()
+
+    async def ainvoke(self, messages, **kwargs):
+        self._enter()
+        try:
+            await asyncio.sleep(self.hold)
+            return await super().ainvoke(messages, **kwargs)
+        finally:
+            self._exit()
+
+
+class ThreadRecordingCache(MemoryCache):
+    """MemoryCache that notes which threads read and wrote it."""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def _get(self, role, key):
+        self.threads.add(threading.get_ident())
+        return super()._get(role, key)
+
+    def _put(self, role, key, model, response):
+        self.threads.add(threading.get_ident())
+        super()._put(role, key, model, response)
+
+
+@pytest.fixture
+def probe():
+    model = ConcurrencyProbe()
+    llm_gateway.set_llm(model)
+    set_response_cache(NullCache())
+    yield model
+    llm_gateway.set_llm(None)
+
+
+class HTTPError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def test_transient_errors_are_recognized_by_status_code():
+    assert llm_gateway.is_transient(HTTPError("Service Unavailable", status_code=503))
+    assert llm_gateway.is_transient(TimeoutError("read timed out"))
+    try:
+        try:
+            raise HTTPError("Bad Gateway", status_code=502)
+        except HTTPError as e:
+            raise RuntimeError("Error calling model") from e
+    except RuntimeError as wrapped:
+        assert llm_gateway.is_transient(wrapped)
+
+    # Status-like numbers in the message are not a status
+    assert not llm_gateway.is_transient(ValueError("invalid prompt: 5003 tokens over the 500 limit"))
+    assert not llm_gateway.is_transient(HTTPError("Bad Request: field 504", status_code=400))
+    assert llm_gateway.is_rate_limit(HTTPError("Too Many Requests", status_code=429))
+    assert not llm_gateway.is_rate_limit(ValueError("prompt has 429 lines"))
+
+
+def test_sync_and_async_callers_share_the_in_flight_cap(probe):
+    callers = llm_gateway.MAX_IN_FLIGHT * 2
+
+    async def async_callers():
+        await asyncio.gather(*(llm_gateway.ainvoke("fundamental", f"async prompt {i}") for i in range(callers)))
+
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        futures = [pool.submit(llm_gateway.invoke, "fundamental", f"sync prompt {i}") for i in range(callers)]
+        asyncio.run(async_callers())
+        for future in futures:
+            future.result()
+
+    assert probe.calls == 2 * callers
+    assert probe.peak == llm_gateway.MAX_IN_FLIGHT
+
+
+def test_async_cache_access_stays_off_the_event_loop(probe):
+    cache = ThreadRecordingCache()
+    set_response_cache(cache)
+
+    async def twice():
+        loop_thread = threading.get_ident()
+        first = await llm_gateway.ainvoke("fundamental", "cached prompt")
+        second = await llm_gateway.ainvoke("fundamental", "cached prompt")
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(twice())
+    assert first == second and probe.calls == 1
+    assert cache.threads and loop_thread not in cache.threads
@@ -0,0 +1,63 @@
+import os
+import sqlite3
+
+from src.data import storage
+from src.data.storage import WriteQueue
+
+INSERT = 'INSERT INTO notes (id, body) VALUES (?, ?)'
+
+
+def _journal(tmp_path):
+    path = os.path.join(tmp_path, "journal.db")
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT NOT NULL)')
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _bodies(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute('SELECT body FROM notes ORDER BY id')]
+    finally:
+        conn.close()
+
+
+def test_a_bad_row_only_loses_itself(tmp_path):
+    path = _journal(tmp_path)
+    writer = WriteQueue(linger=0.05)
+    for i, body in enumerate(["a", None, "c", "d"]):
+        writer.put(INSERT, (i, body), path=path)
+
+    failures = writer.flush()
+
+    assert _bodies(path) == ["a", "c", "d"]
+    assert [f.params for f in failures] == [(1, None)]
+    assert "NOT NULL" in failures[0].error
+    assert writer.flush() == []
+
+
+def test_on_commit_runs_after_the_row_is_committed(tmp_path):
+    path = _journal(tmp_path)
+    writer = WriteQueue(linger=0.05)
+    seen = {}
+
+    def committed(key):
+        def callback():
+            seen[key] = _bodies(path)
+        return callback
+
+    writer.put(INSERT, (1, "kept"), path=path, on_commit=committed("kept"))
+    writer.put(INSERT, (1, "duplicate id"), path=path, on_commit=committed("duplicate"))
+    failures = writer.flush()
+
+    assert seen == {"kept": ["kept"]}
+    assert len(failures) == 1
+
+
+def test_readers_wait_without_taking_the_failures(tmp_path, market):
+    storage._writer.put(INSERT, (1, "x"), path=os.path.join(tmp_path, "missing-table.db"))
+    storage.get_recent_trades(1)
+    failures = storage.flush()
+    assert len(failures) == 1 and "no such table" in failures[0].error
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.data import ohlcv_cache
+from benchmarks.fakes import write_minute_session
+from src.streaming import STREAM_INTERVAL, Bar, FileReplayFeed, StreamRunner, TickerStream, check_triggers
+from src.utils.indicators import IncrementalIndicators
+
+
+def _minute_bars(n, seed=3):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2026-03-02 14:30", periods=n, freq="1min", tz="UTC")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    return pd.DataFrame({"Open": close, "High": close * 1.001, "Low": close * 0.999, "Close": close,
+                         "Volume": rng.integers(1_000, 5_000, n).astype(float)}, index=index)
+
+
+def test_warm_up_resumes_from_saved_indicator_state():
+    bars = _minute_bars(1200)
+    continuous = IncrementalIndicators.from_history(bars)
+
+    # Last session stopped after bar 999; today's cache only holds the last 400 minutes
+    saved_at = 999
+    earlier = IncrementalIndicators.from_history(bars.iloc[:saved_at + 1])
+    frame = bars.iloc[800:]
+    saved = (int(bars.index[saved_at].timestamp()), earlier.to_dict())
+
+    resumed = TickerStream("SYN000")
+    assert resumed.warm_up(frame, saved)
+    cold = TickerStream("SYN000")
+    assert not cold.warm_up(frame)
+
+    assert resumed.indicators.to_dict() == continuous.to_dict()
+    assert list(resumed.bars) == list(cold.bars)
+    assert resumed.latest["RSI"] == pytest.approx(continuous.latest["RSI"])
+    # Cold, the indicators only know the frame
+    assert cold.indicators.bars == len(frame) and resumed.indicators.bars == len(bars)
+
+    # A state from a bar the frame no longer holds can't be continued: cold start
+    stale = (int(bars.index[100].timestamp()), earlier.to_dict())
+    assert not TickerStream("SYN000").warm_up(frame, stale)
+
+
+def test_stream_saves_its_indicator_state_for_the_next_session(market, tmp_path):
+    bars = _minute_bars(300)
+    path = tmp_path / "bars.csv"
+    frame = bars.iloc[200:].reset_index(names="timestamp")
+    frame["ticker"] = "SYN000"
+    frame.columns = [c.lower() for c in frame.columns]
+    frame.to_csv(path, index=False)
+
+    runner = StreamRunner(FileReplayFeed(str(path)), ["SYN000"], triggers={"rsi_low": 0, "rsi_high": 101,
+                                                                         "macd_cross": False, "volume_spike": 0})
+    runner._warm_up = lambda: runner.streams["SYN000"].warm_up(bars.iloc[:200])
+    runner.run()
+
+    ts, state = ohlcv_cache.load_indicator_state("SYN000", STREAM_INTERVAL)
+    assert ts == int(bars.index[-1].timestamp())
+    assert state == IncrementalIndicators.from_history(bars).to_dict()
+
+
+def test_volume_spike_is_measured_against_the_previous_bars():
+    stream = TickerStream("SYN000")
+    bars = _minute_bars(60)
+    bars["Volume"] = 1_000.0
+    stream.warm_up(bars)
+    spike = Bar("SYN000", stream.last_ts + 60, 100.0, 100.0, 100.0, stream.latest["Close"], 3_000.0)
+    assert stream.add(spike)
+
+    assert stream.average_volume() == pytest.approx(1_000.0)
+    reason = check_triggers(stream, {"rsi_low": 0, "rsi_high": 101, "macd_cross": False, "volume_spike": 3.0})
+    assert reason == "volume 3.0x the previous bars' average"
+
+
+def test_file_replay_feeds_the_stream_runner(broker, llm, tmp_path):
+    path = tmp_path / "session.csv"
+    prices = write_minute_session(str(path), n_tickers=4, n_bars=300, spike_every=40, seed=0)
+    broker.set_prices(prices)
+    model = llm()
+
+    feed = FileReplayFeed(str(path))
+    stats = StreamRunner(feed, feed.symbols(), warm_up=False).run()
+
+    assert stats["bars"] == 1200 and stats["out_of_order"] == 0
+    assert stats["triggers"] > stats["runs"] > 0
+    assert stats["errors"] == 0
+    assert model.calls > 0 and broker.stats["orders"] > 0